@@ -0,0 +1,88 @@
+# bench_dates.py - Duration normalization: correctness table and throughput
+# -----------------------------------------------------------------
+# First checks cv_dates.format_duration against CASES, the table of duration
+# formats in tests/test_cv_dates.py; any mismatch is printed and the script
+# exits non-zero before timing anything.
+#
+# Then times normalize_many over the durations of a synthetic corpus (plus
+# the table), cold (memo caches cleared before every record, so only the
+# precompiled patterns help) and warm (the caches kept across the batch,
+# as in a running app).
+#
+#   python benchmarks/bench_dates.py [--cvs 200] [--repeat 5]
+import argparse, json, os, statistics, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_pipeline import git_revision
+from corpus import make_corpus
+from tests.test_cv_dates import CASES
+from cv_dates import format_date, format_duration, normalize_many
+
+def check_cases() -> int:
+    failures = 0
+    for duration, first, expected in CASES:
+        got = format_duration(duration, first)
+        if got != expected:
+            failures += 1
+            print(f"FAIL {duration!r} (first={first}): {got!r}, expected {expected!r}")
+    return failures
+
+def clear_caches():
+    format_date.cache_clear()
+    format_duration.cache_clear()
+
+def main():
+    parser = argparse.ArgumentParser(description="Duration normalization benchmark (offline)")
+    parser.add_argument("--cvs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default=os.path.join(ROOT, "benchmarks", "results", "dates.json"))
+    args = parser.parse_args()
+
+    failures = check_cases()
+    print(f"{len(CASES) - failures}/{len(CASES)} table cases pass")
+    if failures:
+        sys.exit(1)
+
+    corpus = make_corpus(args.cvs, args.seed, formats=("txt",), max_pages=1, max_responsibilities=1)
+    batches = [[exp["duration"] for exp in cv.record["experiences"]] for cv in corpus]
+    batches += [[duration for duration, _, _ in CASES]]
+    total = sum(map(len, batches))
+
+    timings = {}
+    for mode in ("cold", "warm"):
+        runs = []
+        for _ in range(args.repeat):
+            clear_caches()
+            began = time.perf_counter()
+            for durations in batches:
+                if mode == "cold":
+                    clear_caches()
+                normalize_many(durations)
+            runs.append((time.perf_counter() - began) / total)
+        timings[mode] = {"median_us": statistics.median(runs) * 1e6, "min_us": min(runs) * 1e6}
+    info = format_duration.cache_info()
+    distinct = len({d for durations in batches for d in durations})
+
+    results = {
+        "meta": {"revision": git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "args": {k: v for k, v in vars(args).items() if k != "out"}},
+        "cases": len(CASES), "durations": total, "distinct": distinct, "per_duration": timings,
+        "warm_cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize},
+    }
+    print(f"{total} durations ({distinct} distinct) from {len(batches)} records, revision "
+          f"{results['meta']['revision']}\n")
+    print(f"{'mode':6} {'median us':>10} {'min us':>8}")
+    for mode, t in timings.items():
+        print(f"{mode:6} {t['median_us']:10.2f} {t['min_us']:8.2f}")
+    print(f"\nwarm cache: {info.hits} hits, {info.misses} misses, {info.currsize} entries")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+if __name__ == "__main__":
+    main()
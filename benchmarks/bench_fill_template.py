@@ -0,0 +1,150 @@
+# bench_fill_template.py - Placeholder substitution benchmark
+# -----------------------------------------------------------------
+# Compares the old "loop over every placeholder" replacement with the
+# single-pass PlaceholderResolver, using the paragraph texts of the bundled
+# company template.
+#
+# Also times the ways of getting a fresh document per CV: a deep copy of
+# the parsed python-docx Document, re-parsing the template bytes, and
+# TemplatePlan.clone (empty-body package plus a copy of the body element).
+#
+#   python benchmarks/bench_fill_template.py [--experiences 10] [--repeat 5]
+import argparse, copy, os, sys, time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from docx import Document
+import cv_core
+
+TEMPLATE_PATH = os.path.join(ROOT, "CV Template.docx")
+
+def sample_data(n_exp: int, n_resp: int) -> dict:
+    """Build an extracted record shaped like CVExtractor output."""
+    return {
+        "candidate_name": "Jane Doe",
+        "position": "Senior Technical Engineer",
+        "education": "BSc Computer Science",
+        "total_experience_years": "11",
+        "phone": "+971 50 000 0000",
+        "email": "jane.doe@example.com",
+        "intro_paragraph": "Experienced engineer. " * 10,
+        "experiences": [
+            {
+                "company": f"Company {i}, Location: Dubai",
+                "role": "Technical Consultant",
+                "duration": "SEP 2015 - Present",
+                "responsibilities": [f"Responsibility {j} of experience {i}" for j in range(n_resp)],
+            }
+            for i in range(n_exp)
+        ],
+        "technical_skills": ["Python", "SQL", "Oracle"],
+        "certifications": ["AWS Certified Solutions Architect"],
+        "language_skills": ["English - Fluent"],
+    }
+
+def legacy_replacements(d: dict) -> dict:
+    """The replacement dict fill_template used to build for every CV."""
+    repl = {
+        "{{CANDIDATE_NAME}}": str(d.get("candidate_name", "") or ""),
+        "{{POSITION}}": str(d.get("position", "") or ""),
+        "{{EDUCATION}}": str(d.get("education", "") or ""),
+        "{{TOTAL_EXPERIENCE_YEARS}}": str(d.get("total_experience_years", "") or ""),
+        "{{PHONE}}": str(d.get("phone", "") or ""),
+        "{{EMAIL}}": str(d.get("email", "") or ""),
+        "{{INTRO_PARAGRAPH}}": str(d.get("intro_paragraph", "") or ""),
+    }
+    for i in range(1, 21):
+        exps = d.get("experiences", [])
+        exp = exps[i-1] if i <= len(exps) else None
+        if exp and exp.get("company") and exp.get("role"):
+            repl[f"{{{{EXP{i}_COMPANY}}}}"] = f"<<<BOLD>>>{exp['company']}<<<END_BOLD>>>"
+            repl[f"{{{{EXP{i}_ROLE}}}}"] = str(exp.get("role", "") or "")
+            repl[f"{{{{EXP{i}_DURATION}}}}"] = str(exp.get("duration", "") or "")
+            resps = exp.get("responsibilities", [])
+            for j in range(1, 101):
+                repl[f"{{{{EXP{i}_RESP{j}}}}}"] = (
+                    str(resps[j-1] if resps[j-1] is not None else "") if j <= len(resps)
+                    else "<<<REMOVE_THIS_LINE>>>")
+        else:
+            for key in ("COMPANY", "ROLE", "DURATION"):
+                repl[f"{{{{EXP{i}_{key}}}}}"] = "<<<DELETE_EXPERIENCE>>>"
+            for j in range(1, 101):
+                repl[f"{{{{EXP{i}_RESP{j}}}}}"] = "<<<DELETE_EXPERIENCE>>>"
+    techs = d.get("technical_skills", [])
+    certs = d.get("certifications", [])
+    langs = d.get("language_skills", [])
+    repl["{{TECHNICAL_SKILLS_LIST}}"] = "\n".join(f"• {s}" for s in techs) if techs else ""
+    repl["{{CERTIFICATIONS_LIST}}"] = "\n".join(f"• {c}" for c in certs) if certs else "N/A"
+    repl["{{LANGUAGE_SKILLS_LIST}}"] = ", ".join(langs) if langs else "English - Fluent"
+    return repl
+
+def legacy_substitute_all(texts, d):
+    repl = legacy_replacements(d)
+    out = []
+    for text in texts:
+        for placeholder, value in repl.items():
+            if placeholder in text:
+                text = text.replace(placeholder, value)
+        out.append(text)
+    return out
+
+def engine_substitute_all(texts, d):
+    resolver = cv_core.PlaceholderResolver(d)
+    return [resolver.substitute(text) for text in texts]
+
+def template_texts() -> list:
+    """Every paragraph text fill_template visits in the bundled template."""
+    doc = Document(TEMPLATE_PATH)
+    texts = [p.text for p in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                texts.extend(p.text for p in cell.paragraphs)
+    return texts
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Placeholder substitution benchmark")
+    parser.add_argument("--experiences", type=int, default=10)
+    parser.add_argument("--responsibilities", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = template_texts()
+    d = sample_data(args.experiences, args.responsibilities)
+
+    # Both paths must agree before timing them
+    assert legacy_substitute_all(texts, d) == engine_substitute_all(texts, d), "substitution output differs"
+
+    legacy = best_of(lambda: legacy_substitute_all(texts, d), args.repeat)
+    engine = best_of(lambda: engine_substitute_all(texts, d), args.repeat)
+    full = best_of(lambda: cv_core.fill_template(Document(TEMPLATE_PATH), d), args.repeat)
+    with open(TEMPLATE_PATH, "rb") as f:
+        tpl_bytes = f.read()
+    plan = cv_core.load_template_plan(tpl_bytes)
+    planned = best_of(lambda: cv_core.render_cv(plan, d), args.repeat)
+    deepcopied = best_of(lambda: copy.deepcopy(plan.document), args.repeat)
+    reparsed = best_of(lambda: Document(BytesIO(tpl_bytes)), args.repeat)
+    cloned = best_of(plan.clone, args.repeat)
+
+    print(f"paragraph texts scanned : {len(texts)}")
+    print(f"legacy placeholder loop : {legacy * 1000:9.2f} ms")
+    print(f"single-pass engine      : {engine * 1000:9.2f} ms")
+    print(f"speedup                 : {legacy / engine:9.1f}x")
+    print(f"full fill_template      : {full * 1000:9.2f} ms")
+    print(f"render from cached plan : {planned * 1000:9.2f} ms")
+    print(f"deep copy of Document   : {deepcopied * 1000:9.2f} ms")
+    print(f"re-parse template bytes : {reparsed * 1000:9.2f} ms")
+    print(f"TemplatePlan.clone      : {cloned * 1000:9.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+# bench_load.py - Multi-session load test of the Streamlit app
+# -----------------------------------------------------------------
+# Simulates concurrent recruiters against one app process. Each virtual user
+# runs the real cv_converter.py script (via Streamlit's AppTest) through
+#
+#   login_page -> login -> upload -> submit -> convert -> download -> logout
+#
+# while Gemini is replaced by benchmarks/fake_gemini.py, started as a
+# separate process with the requested latency distribution, error rate and
+# 429 behaviour, and reached through the app's gemini_api_endpoint setting.
+# CVs come from the synthetic corpus (benchmarks/corpus.py).
+#
+# Reported:
+#   - throughput: CVs converted and sessions completed per minute
+#   - per-stage latency percentiles: each user-facing step above ("convert"
+#     is submit to results shown, polled like the page does), and the
+#     server-side stages of every CV (extract_text, preprocess, extract,
+#     gemini, render, save) taken from the metrics in the job results
+#   - error rates: CVs without a document, CVs whose Gemini call failed,
+#     script exceptions, and the fake server's own counters
+#   - process memory (RSS) over time
+#
+# AppTest keeps some global state while a script runs, so script runs are
+# serialized by the harness; conversions still run concurrently on the
+# app's job queue, as in production. Script-run stages exclude the time
+# spent waiting for another session's run, which is reported separately.
+#
+#   python benchmarks/bench_load.py [--users 4] [--sessions 1] [--cvs-per-session 3]
+#                                   [--latency lognormal:2:0.4] [--error-rate 0.02]
+#                                   [--throttle-rate 0.05] [--rpm 0] [--workers 4]
+import argparse, json, os, shutil, statistics, subprocess, sys, tempfile, threading, time, traceback
+from urllib.request import urlopen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_pipeline import git_revision, percentile
+from corpus import make_corpus
+
+TEMPLATE_PATH = os.path.join(ROOT, "CV Template.docx")
+DOMAIN, PASSWORD = "@example.com", "load-test"
+CV_STAGES = ("extract_text", "preprocess", "extract", "gemini", "render", "save", "total")
+
+# Runs the app unchanged; only the uploader is replaced, since AppTest
+# cannot upload files. The harness names the files in session state.
+APP_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import streamlit as st
+from cv_core import SourceFile
+
+def file_uploader(label, type=None, accept_multiple_files=False, **kwargs):
+    if accept_multiple_files:
+        return [SourceFile.from_path(p) for p in st.session_state.get("load_cvs", [])] or None
+    path = st.session_state.get("load_template")
+    return SourceFile.from_path(path) if path else None
+
+st.file_uploader = file_uploader
+import cv_converter
+try:
+    cv_converter.main()
+finally:
+    st.session_state["load_job"] = cv_converter.get_job_queue().get(st.session_state.get("job_id"))
+"""
+
+class LoadRun:
+    """Samples and counters shared by the virtual users."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.script_lock = threading.Lock()
+        self.stages = {}
+        self.cv_stages = {}
+        self.counts = {"sessions": 0, "sessions_failed": 0, "cvs": 0, "cvs_converted": 0,
+                       "cvs_failed": 0, "gemini_failures": 0, "script_exceptions": 0,
+                       "input_tokens": 0, "output_tokens": 0, "retries": 0}
+        self.errors = []
+        self.active = 0
+
+    def record(self, stage: str, seconds: float):
+        with self.lock:
+            self.stages.setdefault(stage, []).append(seconds)
+
+    def count(self, key: str, n: int = 1):
+        with self.lock:
+            self.counts[key] += n
+
+    def run_script(self, at, timeout: float):
+        """One script run; returns its duration, excluding the wait for other sessions."""
+        began = time.perf_counter()
+        with self.script_lock:
+            started = time.perf_counter()
+            self.record("script_wait", started - began)
+            at.run(timeout=timeout)
+            elapsed = time.perf_counter() - started
+        if at.exception:
+            self.count("script_exceptions", len(at.exception))
+            raise RuntimeError(at.exception[0].value)
+        return elapsed
+
+def new_session(args, secrets):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_string(APP_SCRIPT.format(root=ROOT), default_timeout=args.timeout)
+    for key, value in secrets.items():
+        at.secrets[key] = value
+    return at
+
+def button(at, text: str):
+    matches = [b for b in at.button if text in b.label]
+    if not matches:
+        raise RuntimeError(f"No '{text}' button on the page")
+    return matches[0]
+
+def run_session(run: LoadRun, args, secrets, user: int, session: int, cv_paths):
+    at = new_session(args, secrets)
+    step = lambda stage: run.record(stage, run.run_script(at, args.timeout))
+    think = lambda: time.sleep(args.think)
+
+    step("login_page")
+    think()
+    at.text_input[0].input(f"user{user}{DOMAIN}")
+    at.text_input[1].input(PASSWORD)
+    button(at, "Access CV Converter").click()
+    step("login")
+    think()
+
+    at.session_state["load_template"] = TEMPLATE_PATH
+    at.session_state["load_cvs"] = cv_paths
+    step("upload")
+    think()
+
+    if not args.use_cache:
+        [c for c in at.checkbox if "Bypass" in c.label][0].check()
+    button(at, "Convert CVs").click()
+    submitted = time.perf_counter()
+    step("submit")
+
+    # Poll like the page's progress fragment until the results are shown
+    deadline = submitted + args.timeout
+    while True:
+        job = at.session_state["load_job"]
+        if job is not None and job.finished and not at.get("progress"):
+            break
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"job not finished after {args.timeout}s")
+        time.sleep(args.poll)
+        run.run_script(at, args.timeout)
+    run.record("convert", time.perf_counter() - submitted)
+
+    run.count("cvs", len(job.items))
+    for item in job.items:
+        result = item["result"]
+        if result is None:
+            run.count("cvs_failed")
+            continue
+        run.count("cvs_converted")
+        if not result["extracted"]:
+            run.count("gemini_failures")
+        with run.lock:
+            for stage, seconds in result["metrics"]["seconds"].items():
+                run.cv_stages.setdefault(stage, []).append(seconds)
+            for key in ("input_tokens", "output_tokens", "retries"):
+                run.counts[key] += result["metrics"].get(key, 0)
+    think()
+
+    downloads = len(at.get("download_button"))
+    if len(job.results()) > 1:
+        button(at, "Download All as ZIP").click()
+        step("download")
+        downloads = len(at.get("download_button"))
+    if downloads < len(job.results()):
+        raise RuntimeError(f"{downloads} download(s) for {len(job.results())} converted CV(s)")
+    think()
+
+    button(at, "Logout").click()
+    step("logout")
+
+def virtual_user(run: LoadRun, args, secrets, user: int, corpus_paths):
+    time.sleep(args.ramp_up * user / max(1, args.users))
+    for session in range(args.sessions):
+        # Each session takes the next CVs of the corpus, wrapping around
+        first = (user * args.sessions + session) * args.cvs_per_session
+        paths = [corpus_paths[(first + i) % len(corpus_paths)] for i in range(args.cvs_per_session)]
+        with run.lock:
+            run.active += 1
+        try:
+            run_session(run, args, secrets, user, session, paths)
+            run.count("sessions")
+        except Exception as e:
+            run.count("sessions_failed")
+            with run.lock:
+                run.errors.append(f"user {user} session {session}: {e!r}")
+            if args.verbose:
+                traceback.print_exc()
+        finally:
+            with run.lock:
+                run.active -= 1
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current RSS where /proc is unavailable (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def sample_memory(run: LoadRun, interval: float, stop: threading.Event, started: float, timeline):
+    while True:
+        with run.lock:
+            timeline.append({"t": round(time.perf_counter() - started, 2), "rss_mb": rss_bytes() / 2 ** 20,
+                             "active_sessions": run.active, "cvs_converted": run.counts["cvs_converted"]})
+        if stop.wait(interval):
+            return
+
+def start_fake_gemini(args, records_path: str):
+    command = [sys.executable, os.path.join(ROOT, "benchmarks", "fake_gemini.py"), records_path,
+               "--port", "0", "--latency", args.latency, "--error-rate", str(args.error_rate),
+               "--error-status", str(args.error_status), "--throttle-rate", str(args.throttle_rate),
+               "--rpm", str(args.rpm), "--seed", str(args.seed)]
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline().strip()
+    if not line.startswith("Listening on "):
+        proc.kill()
+        sys.exit(f"Fake Gemini server did not start: {line!r}")
+    return proc, line[len("Listening on "):]
+
+def summarize(samples) -> dict:
+    return {"n": len(samples), "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000, "p99_ms": percentile(samples, 99) * 1000,
+            "max_ms": max(samples) * 1000, "mean_ms": statistics.mean(samples) * 1000}
+
+def print_stages(title: str, stages: dict):
+    print(f"\n{title:22} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for stage, s in stages.items():
+        print(f"{stage:22} {s['n']:5d} {s['p50_ms']:10.1f} {s['p95_ms']:10.1f} {s['p99_ms']:10.1f} {s['max_ms']:10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-session load test against a fake Gemini")
+    parser.add_argument("--users", type=int, default=4, help="concurrent virtual users")
+    parser.add_argument("--sessions", type=int, default=1, help="login-to-logout sessions per user")
+    parser.add_argument("--cvs-per-session", type=int, default=3)
+    parser.add_argument("--corpus", type=int, default=12, help="distinct CVs to draw from")
+    parser.add_argument("--max-pages", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", default="lognormal:2:0.4",
+                        help="fake Gemini latency: fixed:S, uniform:A:B, exp:MEAN or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of Gemini calls failing")
+    parser.add_argument("--error-status", type=int, default=500, choices=[500, 503])
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of Gemini calls getting 429")
+    parser.add_argument("--rpm", type=float, default=0.0, help="Gemini requests per minute before 429 (0 = unlimited)")
+    parser.add_argument("--workers", type=int, default=4, help="the app's conversion_workers setting")
+    parser.add_argument("--use-cache", action="store_true", help="leave the extraction cache on")
+    parser.add_argument("--think", type=float, default=0.5, help="seconds between user actions")
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between progress refreshes")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="seconds over which users start")
+    parser.add_argument("--timeout", type=float, default=300.0, help="per script run and per job")
+    parser.add_argument("--sample-seconds", type=float, default=0.5, help="memory sampling interval")
+    parser.add_argument("--out", default=os.path.join(ROOT, "benchmarks", "results", "load.json"))
+    parser.add_argument("--verbose", action="store_true", help="print tracebacks of failed sessions")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cv_load_")
+    server = None
+    try:
+        corpus_dir = os.path.join(workdir, "corpus")
+        os.makedirs(corpus_dir)
+        records, corpus_paths = {}, []
+        for cv in make_corpus(args.corpus, args.seed, max_pages=args.max_pages):
+            path = os.path.join(corpus_dir, cv.source.name)
+            with open(path, "wb") as f:
+                f.write(cv.source.getvalue())
+            records[cv.source.name] = cv.record
+            corpus_paths.append(path)
+        records_path = os.path.join(workdir, "records.json")
+        with open(records_path, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+
+        server, endpoint = start_fake_gemini(args, records_path)
+        secrets = {
+            "company_domain": DOMAIN, "app_password": PASSWORD, "GEMINI_API_KEY": "load-test",
+            "gemini_api_endpoint": endpoint, "conversion_workers": args.workers,
+            "job_poll_seconds": args.poll,
+            "extraction_cache_path": os.path.join(workdir, "extractions.sqlite3"),
+            "artifact_dir": os.path.join(workdir, "artifacts"),
+            "export_dir": os.path.join(workdir, "exports"),
+            "audit_log_path": os.path.join(workdir, "audit", "access.jsonl"),
+        }
+
+        run, timeline, stop = LoadRun(), [], threading.Event()
+        started = time.perf_counter()
+        sampler = threading.Thread(target=sample_memory, args=(run, args.sample_seconds, stop, started, timeline),
+                                   daemon=True)
+        sampler.start()
+        users = [threading.Thread(target=virtual_user, args=(run, args, secrets, user, corpus_paths),
+                                  name=f"user-{user}") for user in range(args.users)]
+        for thread in users:
+            thread.start()
+        for thread in users:
+            thread.join()
+        wall = time.perf_counter() - started
+        stop.set()
+        sampler.join()
+        with urlopen(endpoint + "/stats") as response:
+            gemini = json.load(response)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    counts = run.counts
+    rss = [sample["rss_mb"] for sample in timeline]
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": {key: value for key, value in vars(args).items() if key not in ("out", "verbose")},
+        },
+        "wall_seconds": wall,
+        "throughput": {"cvs_per_minute": counts["cvs_converted"] / wall * 60,
+                       "sessions_per_minute": counts["sessions"] / wall * 60},
+        "counts": counts,
+        "error_rates": {
+            "sessions_failed": counts["sessions_failed"] / max(1, args.users * args.sessions),
+            "cvs_failed": counts["cvs_failed"] / max(1, counts["cvs"]),
+            "gemini_failures": counts["gemini_failures"] / max(1, counts["cvs"]),
+        },
+        "fake_gemini": gemini,
+        "session_stages": {stage: summarize(s) for stage, s in run.stages.items()},
+        "cv_stages": {stage: summarize(run.cv_stages[stage])
+                      for stage in CV_STAGES if stage in run.cv_stages},
+        "memory": {"start_mb": rss[0], "peak_mb": max(rss), "end_mb": rss[-1], "timeline": timeline},
+        "errors": run.errors,
+    }
+
+    print(f"{args.users} user(s) x {args.sessions} session(s) x {args.cvs_per_session} CV(s), "
+          f"{args.workers} worker(s), Gemini latency {args.latency}, revision {results['meta']['revision']}")
+    print(f"wall {wall:.1f}s: {results['throughput']['cvs_per_minute']:.1f} CVs/min, "
+          f"{results['throughput']['sessions_per_minute']:.1f} sessions/min")
+    print(f"sessions {counts['sessions']} ok / {counts['sessions_failed']} failed; CVs {counts['cvs_converted']} "
+          f"converted / {counts['cvs_failed']} failed, {counts['gemini_failures']} with a failed Gemini call")
+    print(f"fake Gemini: {gemini['requests']} requests, {gemini['errors']} errors, {gemini['throttled']} throttled (429); "
+          f"{counts['input_tokens']:,} input / {counts['output_tokens']:,} output tokens, {counts['retries']} retries")
+    print_stages("session stage", results["session_stages"])
+    print_stages("per-CV stage", results["cv_stages"])
+    print(f"\nRSS: {rss[0]:.0f} MB at start, {max(rss):.0f} MB peak, {rss[-1]:.0f} MB at end "
+          f"({len(timeline)} samples)")
+    for error in run.errors[:10]:
+        print(f"  {error}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.out}")
+    if counts["sessions_failed"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
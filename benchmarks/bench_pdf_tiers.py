@@ -0,0 +1,63 @@
+# bench_pdf_tiers.py - Tiered PDF extraction benchmark
+# -----------------------------------------------------------------
+# Runs a folder of real CV PDFs through the tiered extractor and through
+# pdfplumber alone, and reports which tier handled each page and how much
+# time the fast text pass saves on that mix.
+#
+#   python benchmarks/bench_pdf_tiers.py path/to/cv_pdfs [--verbose]
+import argparse, glob, os, sys, time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pdfplumber
+import cv_pdf
+
+def pdfplumber_only(pdf_bytes: bytes) -> float:
+    start = time.perf_counter()
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        for page in pdf.pages:
+            page.extract_text()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiered PDF extraction benchmark")
+    parser.add_argument("folder", help="directory containing CV PDFs")
+    parser.add_argument("--verbose", action="store_true", help="print the tier of every page")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.folder, "**", "*.pdf"), recursive=True))
+    if not paths:
+        sys.exit(f"No PDFs found under {args.folder}")
+
+    total_tiered = total_plumber = 0.0
+    for path in paths:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+
+        start = time.perf_counter()
+        # workers=1 keeps the comparison about tiers, not process parallelism
+        pages = cv_pdf.extract_pdf_pages(pdf_bytes, workers=1)
+        tiered = time.perf_counter() - start
+        plumber = pdfplumber_only(pdf_bytes)
+        total_tiered += tiered
+        total_plumber += plumber
+
+        fast = sum(1 for page in pages if page.tier == cv_pdf.FAST_TIER)
+        print(f"{os.path.basename(path):40.40} pages={len(pages):3d} fast={fast:3d} "
+              f"tiered={tiered * 1000:8.1f} ms  pdfplumber={plumber * 1000:8.1f} ms")
+        if args.verbose:
+            for number, page in enumerate(pages, start=1):
+                print(f"    page {number:3d}: {page.tier:6} score={cv_pdf.score_page_text(page.text):.2f}")
+
+    stats = cv_pdf.TIER_STATS.snapshot()
+    print()
+    print(f"pages via fast pass      : {stats['fast_pages']}")
+    print(f"pages via layout fallback: {stats['layout_pages']}")
+    print(f"tiered total             : {total_tiered:8.2f} s")
+    print(f"pdfplumber-only total    : {total_plumber:8.2f} s")
+    print(f"speedup                  : {total_plumber / total_tiered:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# bench_pipeline.py - Per-stage benchmark of the local conversion pipeline
+# -----------------------------------------------------------------
+# Runs a synthetic corpus (benchmarks/corpus.py) through every local stage
+# with a stubbed Gemini model, so it needs no network or API key:
+#
+#   extract_text    PDF/DOCX/TXT text extraction (per format and overall)
+#   preprocess      preprocess_cv_text
+#   extract         CVExtractor.extract: streamed JSON parsing + validation
+#   validate        CVExtractor._validate_data alone
+#   format_duration format_duration over every duration in the corpus
+#   render          fill_template into a clone of the compiled template
+#   save            Document.save
+#
+# Each stage reports p50/p95/mean wall time. Peak Python heap use per stage
+# is measured in a separate tracemalloc pass over the first few CVs, so it
+# does not distort the timings. Results are written as JSON; pass an earlier
+# results file with --compare to print the change per stage.
+#
+#   python benchmarks/bench_pipeline.py [--cvs 60] [--seed 7] [--out results.json]
+#                                       [--compare baseline.json]
+import argparse, copy, json, os, platform, statistics, subprocess, sys, time, tracemalloc
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv_pdf
+from cv_core import extract_text, load_template_plan, preprocess_cv_text, render_cv
+from cv_dates import format_duration
+from corpus import FakeCVExtractor, make_corpus
+
+TEMPLATE_PATH = os.path.join(ROOT, "CV Template.docx")
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class StageTimer:
+    """Collects wall time and (optionally) tracemalloc peaks per stage."""
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.samples = {}
+        self.peaks = {}
+
+    def run(self, stages, fn, *args):
+        """Call fn(*args), recording it under one stage name or a tuple of them."""
+        stages = (stages,) if isinstance(stages, str) else stages
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        for stage in stages:
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] - base
+                self.peaks[stage] = max(self.peaks.get(stage, 0), peak)
+            else:
+                self.samples.setdefault(stage, []).append(elapsed)
+        return result
+
+def run_corpus(corpus, plan, timer: StageTimer):
+    extractor = FakeCVExtractor(corpus, stream=True)
+    for cv in corpus:
+        fmt = cv.source.name.rsplit(".", 1)[1]
+        text = timer.run(("extract_text", f"extract_text[{fmt}]"), extract_text, cv.source)
+        text, _ = timer.run("preprocess", preprocess_cv_text, text)
+        data = timer.run("extract", extractor.extract, text)
+        timer.run("validate", extractor._validate_data, copy.deepcopy(cv.record))
+        durations = [exp["duration"] for exp in cv.record["experiences"]]
+        timer.run("format_duration", lambda: [format_duration(d, i == 0) for i, d in enumerate(durations)])
+        doc = timer.run("render", render_cv, plan, data)
+        timer.run("save", doc.save, BytesIO())
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmark (offline)")
+    parser.add_argument("--cvs", type=int, default=60, help="CVs in the synthetic corpus")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--max-pages", type=int, default=40)
+    parser.add_argument("--memory-cvs", type=int, default=6, help="CVs in the tracemalloc pass (0 to skip)")
+    parser.add_argument("--out", default=os.path.join(ROOT, "benchmarks", "results", "pipeline.json"))
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    # Page-range parallelism would measure process startup, not extraction
+    cv_pdf.configure(parallel_min_pages=10 ** 6, workers=1)
+    corpus = make_corpus(args.cvs, args.seed, max_pages=args.max_pages)
+    with open(TEMPLATE_PATH, "rb") as f:
+        plan = load_template_plan(f.read())
+
+    # Warm-up so lazy imports and first-call costs are not measured
+    run_corpus(corpus[:3], plan, StageTimer())
+    timer = StageTimer()
+    run_corpus(corpus, plan, timer)
+    memory = StageTimer(trace_memory=True)
+    if args.memory_cvs:
+        tracemalloc.start()
+        run_corpus(corpus[:args.memory_cvs], plan, memory)
+        tracemalloc.stop()
+
+    stages = {}
+    for stage, samples in timer.samples.items():
+        stages[stage] = {
+            "n": len(samples),
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "mean_ms": statistics.mean(samples) * 1000,
+            "peak_kb": memory.peaks[stage] / 1024 if stage in memory.peaks else None,
+        }
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "cvs": args.cvs, "seed": args.seed, "max_pages": args.max_pages,
+            "pages": sum(cv.pages for cv in corpus),
+            "experiences": sum(len(cv.record["experiences"]) for cv in corpus),
+        },
+        "stages": stages,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["stages"]
+
+    print(f"{len(corpus)} CVs, {results['meta']['pages']} pages, revision {results['meta']['revision']}")
+    print(f"{'stage':22} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10} {'peak KB':>10}"
+          + ("   p50 vs baseline" if baseline else ""))
+    for stage in sorted(stages):
+        s = stages[stage]
+        peak = f"{s['peak_kb']:10.0f}" if s["peak_kb"] is not None else f"{'-':>10}"
+        line = f"{stage:22} {s['n']:5d} {s['p50_ms']:10.2f} {s['p95_ms']:10.2f} {s['mean_ms']:10.2f} {peak}"
+        if baseline and stage in baseline:
+            line += f"   {s['p50_ms'] / baseline[stage]['p50_ms'] - 1:+7.1%}"
+        print(line)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+if __name__ == "__main__":
+    main()
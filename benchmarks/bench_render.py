@@ -0,0 +1,145 @@
+# bench_render.py - Run rendering: prototype XML runs vs python-docx font properties
+# -----------------------------------------------------------------
+# fill_template writes its runs through cv_core.RunWriter, which clones
+# prebuilt `w:r` elements. LegacyRunWriter below makes the python-docx
+# proxy calls fill_template used to make instead (add_run, then font name,
+# size, bold and colour one by one, then paragraph_format.line_spacing).
+#
+# Both fill clones of the bundled template with the same synthetic
+# records, and the fill time per CV is compared. Before that, the document
+# XML of the prototype writer is checked against the fill_template that
+# shipped before any of this (cv_converter.py at --baseline, read with
+# `git show`), so the check does not rest on LegacyRunWriter being a
+# faithful copy. Any difference, from either writer, makes the script
+# exit non-zero.
+#
+#   python benchmarks/bench_render.py [--cvs 40] [--repeat 3] [--baseline fcf20f5]
+import argparse, copy, json, os, statistics, subprocess, sys, time, types
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lxml import etree
+from bench_pipeline import git_revision, percentile
+from corpus import make_corpus
+import cv_core
+from cv_core import BOLD, LINE_SPACING, PLAIN, RECORD_VALIDATOR, RUN_FONT, RUN_SIZE_PT, load_template_plan
+
+TEMPLATE_PATH = os.path.join(ROOT, "CV Template.docx")
+BASELINE_REVISION = "fcf20f5"  # the single-file app, before compiled plans and run prototypes
+
+def load_baseline(revision: str):
+    """The baseline module's fill_template(doc, d), from cv_converter.py at revision."""
+    source = subprocess.run(["git", "-C", ROOT, "show", f"{revision}:cv_converter.py"],
+                            capture_output=True, text=True, check=True).stdout
+    module = types.ModuleType("baseline_cv_converter")
+    # Importing it outside `streamlit run` only warns (set_page_config, no session)
+    exec(compile(source, f"{revision}:cv_converter.py", "exec"), module.__dict__)
+    return module.fill_template
+
+def baseline_xml(fill, tpl_bytes: bytes, records):
+    from docx import Document
+    return [etree.tostring(fill(Document(BytesIO(tpl_bytes)), copy.deepcopy(d)).element) for d in records]
+
+class LegacyRunWriter(cv_core.RunWriter):
+    """Sets every run and paragraph property through python-docx proxies."""
+
+    def __init__(self):
+        pass
+
+    def clear(self, p):
+        from docx.text.paragraph import Paragraph
+        Paragraph(p, None).clear()
+
+    def add_run(self, p, text, kind=cv_core.NORMAL):
+        from docx.shared import Pt, RGBColor
+        from docx.text.paragraph import Paragraph
+        run = Paragraph(p, None).add_run(text)
+        run.font.name = RUN_FONT
+        run.font.size = Pt(RUN_SIZE_PT)
+        if kind != PLAIN:
+            run.font.bold = kind == BOLD
+        run.font.color.rgb = RGBColor(0, 0, 0)
+
+    def add_paragraph(self, tc):
+        from docx.table import _Cell
+        return _Cell(tc, None).add_paragraph()._p
+
+    def set_line_spacing(self, p):
+        from docx.text.paragraph import Paragraph
+        Paragraph(p, None).paragraph_format.line_spacing = LINE_SPACING
+
+def fill_all(plan, records, writer_class):
+    """(document XML per record, fill seconds per record) with the given writer."""
+    cv_core.RunWriter = writer_class
+    docs = [plan.clone() for _ in records]
+    xml, seconds = [], []
+    for doc, d in zip(docs, records):
+        began = time.perf_counter()
+        cv_core.fill_template(doc, copy.deepcopy(d), plan)
+        seconds.append(time.perf_counter() - began)
+        xml.append(etree.tostring(doc.element))
+    return xml, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Run rendering benchmark (offline)")
+    parser.add_argument("--cvs", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_REVISION, help="git revision to check the output against")
+    parser.add_argument("--out", default=os.path.join(ROOT, "benchmarks", "results", "render.json"))
+    args = parser.parse_args()
+
+    with open(TEMPLATE_PATH, "rb") as f:
+        tpl_bytes = f.read()
+    plan = load_template_plan(tpl_bytes)
+    corpus = make_corpus(args.cvs, args.seed, formats=("txt",), max_pages=1)
+    records = [RECORD_VALIDATOR.validate(copy.deepcopy(cv.record))[0] for cv in corpus]
+    try:
+        expected = baseline_xml(load_baseline(args.baseline), tpl_bytes, records)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"FAIL: cannot load fill_template at {args.baseline}: {e}")
+        sys.exit(1)
+
+    writers = {"legacy": LegacyRunWriter, "prototype": cv_core.RunWriter}
+    samples = {name: [] for name in writers}
+    outputs = {}
+    try:
+        fill_all(plan, records[:2], cv_core.RunWriter)  # warm-up: lazy imports, prototypes
+        for _ in range(args.repeat):
+            for name, writer_class in writers.items():
+                outputs[name], seconds = fill_all(plan, records, writer_class)
+                samples[name].extend(seconds)
+    finally:
+        cv_core.RunWriter = writers["prototype"]
+
+    for name, xml in outputs.items():
+        mismatched = sum(a != b for a, b in zip(xml, expected))
+        if mismatched:
+            print(f"FAIL: {mismatched}/{len(records)} {name} documents differ from {args.baseline}")
+            sys.exit(1)
+
+    stats = {name: {"p50_ms": percentile(s, 50) * 1000, "p95_ms": percentile(s, 95) * 1000,
+                    "mean_ms": statistics.mean(s) * 1000} for name, s in samples.items()}
+    speedup = stats["legacy"]["mean_ms"] / stats["prototype"]["mean_ms"]
+    results = {
+        "meta": {"revision": git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "args": {k: v for k, v in vars(args).items() if k != "out"},
+                 "experiences": sum(len(d["experiences"]) for d in records)},
+        "fill_template": stats, "speedup": speedup, "identical": len(records), "baseline": args.baseline,
+    }
+    print(f"{len(records)} CVs, {results['meta']['experiences']} experiences, revision "
+          f"{results['meta']['revision']}; document XML identical to {args.baseline} for all\n")
+    print(f"{'writer':10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for name, s in stats.items():
+        print(f"{name:10} {s['p50_ms']:8.2f} {s['p95_ms']:8.2f} {s['mean_ms']:8.2f}")
+    print(f"\nspeedup {speedup:.2f}x")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# bench_resilience.py - Gemini call resilience against a misbehaving fake
+# -----------------------------------------------------------------
+# Runs the same batch of extractions through CVExtractor against the local
+# fake Gemini (benchmarks/fake_gemini.py) with a long-tailed latency and a
+# mix of 5xx, 429 and malformed answers, once per caller configuration:
+#
+#   single     one attempt, no hedging (the behaviour before cv_resilience)
+#   retries    deadlines plus backoff-with-jitter retries
+#   hedged     retries plus a hedged request past the --hedge-percentile
+#
+# For each it reports blank CVs (extractions that still failed), latency
+# percentiles and the requests sent. A final outage phase (every request
+# fails) shows the circuit breaker turning calls away instead of sending them.
+#
+#   python benchmarks/bench_resilience.py [--calls 80] [--concurrency 8]
+#                                         [--latency lognormal:1:0.6] [--error-rate 0.05]
+import argparse, json, os, statistics, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_pipeline import git_revision, percentile
+from corpus import make_corpus
+from cv_core import CVExtractor, extract_text
+from cv_resilience import CircuitBreaker, ResilientCaller
+from fake_gemini import FakeGemini, parse_latency, start_server
+
+def run_batch(extractor, texts, concurrency: int):
+    """Extract every text; returns (latencies, blank count)."""
+    def one(text):
+        errors = []
+        began = time.perf_counter()
+        extractor.extract(text, report=errors.append, use_cache=False)
+        return time.perf_counter() - began, bool(errors)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, texts))
+    return [seconds for seconds, _ in outcomes], sum(blank for _, blank in outcomes)
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini resilience benchmark against a local fake")
+    parser.add_argument("--calls", type=int, default=80)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", default="lognormal:1:0.6")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--throttle-rate", type=float, default=0.05)
+    parser.add_argument("--malformed-rate", type=float, default=0.03)
+    parser.add_argument("--attempts", type=int, default=3)
+    parser.add_argument("--attempt-timeout", type=float, default=10.0)
+    parser.add_argument("--base-delay", type=float, default=0.5, help="first retry backoff (seconds)")
+    parser.add_argument("--hedge-percentile", type=float, default=90.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=os.path.join(ROOT, "benchmarks", "results", "resilience.json"))
+    args = parser.parse_args()
+
+    # Small records keep the client-side parsing from dominating on small machines
+    corpus = make_corpus(min(args.calls, 40), args.seed, formats=("txt",), max_pages=2,
+                         max_experiences=4, max_responsibilities=12)
+    records = {os.path.splitext(cv.source.name)[0]: cv.record for cv in corpus}
+    texts = [extract_text(corpus[i % len(corpus)].source) for i in range(args.calls)]
+    latency = parse_latency(args.latency)
+
+    configs = {
+        "single": dict(attempts=1),
+        "retries": dict(attempts=args.attempts),
+        "hedged": dict(attempts=args.attempts, hedge_percentile=args.hedge_percentile),
+    }
+    results = {"meta": {"revision": git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "args": {k: v for k, v in vars(args).items() if k != "out"}}, "configs": {}}
+    print(f"{args.calls} extractions, {args.concurrency} at a time; latency {args.latency}, "
+          f"{args.error_rate:.0%} 5xx, {args.throttle_rate:.0%} 429, {args.malformed_rate:.0%} malformed\n")
+    print(f"{'config':10} {'blank':>6} {'p50 s':>8} {'p95 s':>8} {'max s':>8} {'requests':>9}")
+    for name, options in configs.items():
+        # Same seed per config, so every configuration faces the same failures
+        fake = FakeGemini(records, latency, args.error_rate, 500, args.throttle_rate, seed=args.seed,
+                          malformed_rate=args.malformed_rate)
+        server = start_server(fake)
+        caller = ResilientCaller(attempt_timeout=args.attempt_timeout, base_delay=args.base_delay,
+                                 breaker=CircuitBreaker(failure_threshold=10 ** 6), **options)
+        extractor = CVExtractor("benchmark", stream=True, caller=caller,
+                                api_endpoint=f"http://127.0.0.1:{server.server_port}")
+        latencies, blank = run_batch(extractor, texts, args.concurrency)
+        server.shutdown()
+        stats = fake.stats()
+        results["configs"][name] = {
+            "blank": blank, "blank_rate": blank / len(texts),
+            "p50_s": percentile(latencies, 50), "p95_s": percentile(latencies, 95),
+            "max_s": max(latencies), "mean_s": statistics.mean(latencies), "fake_gemini": stats,
+        }
+        r = results["configs"][name]
+        print(f"{name:10} {blank:6d} {r['p50_s']:8.2f} {r['p95_s']:8.2f} {r['max_s']:8.2f} {stats['requests']:9d}")
+
+    # Outage: every request fails; the breaker should stop sending them
+    fake = FakeGemini(records, parse_latency("fixed:0.05"), error_rate=1.0, error_status=503, seed=args.seed)
+    server = start_server(fake)
+    caller = ResilientCaller(attempts=args.attempts, attempt_timeout=args.attempt_timeout,
+                             base_delay=0.05, breaker=CircuitBreaker(failure_threshold=5, reset_seconds=60))
+    extractor = CVExtractor("benchmark", stream=True, caller=caller,
+                            api_endpoint=f"http://127.0.0.1:{server.server_port}")
+    began = time.perf_counter()
+    _, blank = run_batch(extractor, texts, args.concurrency)
+    outage_seconds = time.perf_counter() - began
+    server.shutdown()
+    results["outage"] = {"calls": len(texts), "blank": blank, "requests_sent": fake.stats()["requests"],
+                         "seconds": outage_seconds, "breaker": caller.breaker.state}
+    print(f"\noutage: {len(texts)} calls failed in {outage_seconds:.1f}s after "
+          f"{results['outage']['requests_sent']} requests; breaker {caller.breaker.state}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+if __name__ == "__main__":
+    main()
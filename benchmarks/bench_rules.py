@@ -0,0 +1,141 @@
+# bench_rules.py - Local pre-extraction: accuracy, output tokens and latency saved
+# -----------------------------------------------------------------
+# Runs cv_rules.pre_extract over the synthetic corpus and reports, per
+# field, how often it found a value, how often it was confident enough to
+# skip asking Gemini, and how often the value matched the record.
+#
+# Each CV is then extracted twice through the real parsing and validation
+# (FakeCVExtractor), with the rules off and at --threshold, counting the
+# output tokens the fake model writes. Gemini latency is modelled as
+# --ttft plus output tokens / --tokens-per-second, since output tokens
+# dominate a real call. A last pass makes every model call fail and counts
+# the fields the rule fallback still fills.
+#
+#   python benchmarks/bench_rules.py [--cvs 40] [--threshold 0.9]
+#                                    [--ttft 0.8] [--tokens-per-second 60]
+import argparse, json, os, statistics, sys, time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_pipeline import git_revision, percentile
+from corpus import FakeCVExtractor, FakeModel, make_corpus
+from cv_core import extract_text, format_name
+from cv_preprocess import estimate_tokens, preprocess_cv_text
+from cv_resilience import ResilientCaller
+from cv_rules import pre_extract
+
+FIELDS = ("candidate_name", "email", "phone", "total_experience_years")
+
+class CountingModel(FakeModel):
+    """FakeModel that counts the output tokens it writes."""
+
+    def __init__(self, model: FakeModel):
+        super().__init__(model.records, model.latency, model.chunk_size)
+        self.output_tokens = 0
+
+    def _answer(self, prompt: str) -> str:
+        text = super()._answer(prompt)
+        self.output_tokens += estimate_tokens(text)
+        return text
+
+class FailingModel(FakeModel):
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        raise ConnectionError("Gemini unavailable")
+
+def matches(field: str, value: str, record) -> bool:
+    expected = str(record.get(field, ""))
+    if field == "candidate_name":
+        return format_name(value) == format_name(expected)
+    if field == "total_experience_years":
+        # The corpus counts experience up to 2024; the rules count up to today
+        return int(value) - (date.today().year - 2024) == int(expected)
+    return value == expected
+
+def main():
+    parser = argparse.ArgumentParser(description="Rule-based pre-extraction benchmark (offline)")
+    parser.add_argument("--cvs", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--threshold", type=float, default=0.9, help="rule_skip_confidence to test")
+    parser.add_argument("--ttft", type=float, default=0.8, help="modelled seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=60.0, help="modelled output rate")
+    parser.add_argument("--repeat", type=int, default=20, help="pre_extract timing runs per CV")
+    parser.add_argument("--out", default=os.path.join(ROOT, "benchmarks", "results", "rules.json"))
+    args = parser.parse_args()
+
+    # Typical one-to-two page CVs: long ones are dominated by experiences either way
+    corpus = make_corpus(args.cvs, args.seed, max_pages=2, max_experiences=4, max_responsibilities=12)
+    texts = [preprocess_cv_text(extract_text(cv.source))[0] for cv in corpus]
+
+    counts = {field: {"found": 0, "correct": 0, "skipped": 0, "skipped_correct": 0} for field in FIELDS}
+    seconds = []
+    for cv, text in zip(corpus, texts):
+        began = time.perf_counter()
+        for _ in range(args.repeat):
+            found = pre_extract(text)
+        seconds.append((time.perf_counter() - began) / args.repeat)
+        for field, rule in found.items():
+            right = matches(field, rule.value, cv.record)
+            counts[field]["found"] += 1
+            counts[field]["correct"] += right
+            if rule.confidence >= args.threshold:
+                counts[field]["skipped"] += 1
+                counts[field]["skipped_correct"] += right
+
+    runs = {}
+    records = {}
+    for name, threshold in (("rules_off", float("inf")), ("rules_on", args.threshold)):
+        extractor = FakeCVExtractor(corpus, rule_confidence=threshold)
+        extractor.model = CountingModel(extractor.model)
+        tokens, latencies, records[name] = [], [], []
+        for text in texts:
+            before = extractor.model.output_tokens
+            records[name].append(extractor.extract(text, report=lambda message: None, use_cache=False))
+            tokens.append(extractor.model.output_tokens - before)
+            latencies.append(args.ttft + tokens[-1] / args.tokens_per_second)
+        runs[name] = {"output_tokens": sum(tokens), "mean_output_tokens": statistics.mean(tokens),
+                      "p50_s": percentile(latencies, 50), "p95_s": percentile(latencies, 95),
+                      "mean_s": statistics.mean(latencies)}
+    same = sum(a == b for a, b in zip(records["rules_off"], records["rules_on"]))
+
+    extractor = FakeCVExtractor(corpus, rule_confidence=args.threshold)
+    extractor.model = FailingModel(extractor.model.records)
+    extractor.caller = ResilientCaller(attempts=1)
+    filled = {field: 0 for field in FIELDS}
+    for text in texts:
+        record = extractor.extract(text, report=lambda message: None, use_cache=False)
+        for field in FIELDS:
+            filled[field] += bool(record.get(field))
+
+    off, on = runs["rules_off"], runs["rules_on"]
+    results = {
+        "meta": {"revision": git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "args": {k: v for k, v in vars(args).items() if k != "out"}},
+        "pre_extract": {"p50_ms": percentile(seconds, 50) * 1000, "p95_ms": percentile(seconds, 95) * 1000,
+                        "fields": counts},
+        "extraction": runs, "identical_records": same, "fallback_filled": filled,
+    }
+
+    n = len(texts)
+    print(f"{n} CVs, revision {results['meta']['revision']}; pre_extract p50 "
+          f"{results['pre_extract']['p50_ms']:.2f} ms, p95 {results['pre_extract']['p95_ms']:.2f} ms\n")
+    print(f"{'field':24} {'found':>6} {'correct':>8} {'skipped':>8} {'skip ok':>8} {'fallback':>9}")
+    for field in FIELDS:
+        c = counts[field]
+        print(f"{field:24} {c['found']:6d} {c['correct']:8d} {c['skipped']:8d} {c['skipped_correct']:8d} "
+              f"{filled[field]:9d}")
+    print(f"\n{'run':10} {'out tokens':>11} {'p50 s':>8} {'p95 s':>8} {'mean s':>8}")
+    for name, r in runs.items():
+        print(f"{name:10} {r['output_tokens']:11d} {r['p50_s']:8.2f} {r['p95_s']:8.2f} {r['mean_s']:8.2f}")
+    saved = off["output_tokens"] - on["output_tokens"]
+    print(f"\nSaved {saved} output tokens ({saved / max(1, off['output_tokens']):.1%}), "
+          f"{off['mean_s'] - on['mean_s']:.2f}s per CV modelled; {same}/{n} records identical")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# bench_startup.py - Cold-start benchmark for the Streamlit app
+# -----------------------------------------------------------------
+# Every measurement runs in a fresh interpreter, as a new container would:
+#   - import time of each heavy dependency and of the app's own modules
+#   - time to the login page: interpreter start, app imports and the first
+#     script run (via Streamlit's AppTest, with placeholder secrets)
+# It also checks that rendering the login page loaded none of the engines
+# that should only load on first use, and exits non-zero if one did.
+#
+#   python benchmarks/bench_startup.py [--repeat 5] [--json results.json]
+import argparse, json, os, statistics, subprocess, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTS = ["streamlit", "docx", "google.generativeai", "pdfplumber", "PyPDF2", "cv_pdf", "cv_core"]
+
+# Engines that must not be loaded just to show the login page
+LAZY_MODULES = ["docx", "google.generativeai", "pdfplumber", "PyPDF2", "pandas"]
+
+IMPORT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+LOGIN_SNIPPET = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({script!r}, default_timeout=60)
+app.secrets["company_domain"] = "@example.com"
+app.secrets["app_password"] = "benchmark"
+app.secrets["GEMINI_API_KEY"] = "benchmark"
+app.run()
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "in_process_seconds": elapsed,
+    "login_shown": any("Login" in md.value for md in app.markdown),
+    "exceptions": [str(e.value) for e in app.exception],
+    "loaded": [m for m in {lazy!r} if m in sys.modules],
+}}))
+"""
+
+def run_python(code: str):
+    """Run code in a fresh interpreter; returns (wall seconds, last stdout line)."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+    return wall, proc.stdout.strip().splitlines()[-1]
+
+def summarize(samples) -> dict:
+    return {"median": statistics.median(samples), "min": min(samples), "max": max(samples)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {"python": sys.version.split()[0], "repeat": args.repeat, "imports": {}}
+    print(f"{'import':24} {'median':>10} {'min':>10}")
+    for module in IMPORTS:
+        samples = [float(run_python(IMPORT_SNIPPET.format(root=ROOT, module=module))[1])
+                   for _ in range(args.repeat)]
+        results["imports"][module] = summarize(samples)
+        print(f"{module:24} {statistics.median(samples) * 1000:8.1f}ms {min(samples) * 1000:8.1f}ms")
+
+    walls, in_process, loaded = [], [], set()
+    script = os.path.join(ROOT, "cv_converter.py")
+    for _ in range(args.repeat):
+        wall, line = run_python(LOGIN_SNIPPET.format(root=ROOT, script=script, lazy=LAZY_MODULES))
+        run = json.loads(line)
+        if run["exceptions"] or not run["login_shown"]:
+            sys.exit(f"Login page did not render: {run['exceptions']}")
+        walls.append(wall)
+        in_process.append(run["in_process_seconds"])
+        loaded.update(run["loaded"])
+    results["login_page"] = {"process_wall": summarize(walls), "in_process": summarize(in_process),
+                             "eagerly_loaded": sorted(loaded)}
+
+    print()
+    print(f"time to login page      : {statistics.median(walls) * 1000:8.1f}ms median wall "
+          f"(interpreter start included), {statistics.median(in_process) * 1000:8.1f}ms in process")
+    print(f"engines loaded at login : {', '.join(sorted(loaded)) or 'none'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if loaded:
+        sys.exit(f"Loaded before first use: {', '.join(sorted(loaded))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# corpus.py - Synthetic CV corpus for offline benchmarks
+# -----------------------------------------------------------------
+# Generates deterministic (seeded) CVs as PDF, DOCX and TXT files together
+# with the record a perfect extraction would return for each of them, and a
+# FakeCVExtractor that answers with those records instead of calling Gemini.
+# Records use up to 20 experiences and 100 responsibilities so rendering
+# exercises every experience row of the bundled "CV Template.docx".
+#
+#   python benchmarks/corpus.py out_dir [--cvs 50] [--seed 7]
+#
+# Other benchmarks import make_corpus() / FakeCVExtractor from here.
+import argparse, json, os, random, re, sys, time
+from io import BytesIO
+from typing import Any, Dict, List, NamedTuple, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cv_core import CVExtractor, DOCX_MIME, PDF_MIME, SourceFile
+from cv_resilience import ResilientCaller
+
+LINES_PER_PAGE = 48
+FORMATS = ("pdf", "docx", "txt")
+CV_ID_RE = re.compile(r"Candidate reference: (CV-\d+)")
+FIELDS_RE = re.compile(r"WITH ONLY THESE FIELDS: ([\w, ]+):")
+
+FIRST_NAMES = ["AHMED", "Maria", "John", "PRIYA", "Omar", "Elena", "Chen", "Fatima", "David", "Aisha"]
+LAST_NAMES = ["KHAN", "Garcia", "Smith", "Sharma", "Haddad", "Petrova", "Wei", "Al Mansoori", "Brown", "Okafor"]
+ROLES = ["Technical Consultant", "SENIOR SOFTWARE ENGINEER", "Project Manager", "Oracle DBA",
+         "Data Analyst", "Network Engineer", "QA Lead", "Solutions Architect"]
+COMPANIES = ["Seertree Global Services", "Emirates Systems", "Acme Consulting", "Gulf Data Corp",
+             "Northwind Technologies", "Contoso Middle East", "Globex Solutions", "Initech"]
+CITIES = ["Dubai", "Abu Dhabi", "Riyadh", "Doha", "Bangalore", "Cairo", "London"]
+VERBS = ["Designed", "Implemented", "Led", "Migrated", "Automated", "Optimized", "Maintained", "Reviewed"]
+OBJECTS = ["the billing platform", "Oracle E-Business Suite upgrades", "CI/CD pipelines",
+           "data warehouse ETL jobs", "a team of six engineers", "REST integrations with SAP",
+           "disaster recovery drills", "customer onboarding workflows"]
+SKILLS = ["Python", "SQL", "Oracle", "Java", "Kubernetes", "AWS", "Power BI", "Linux", "SAP", "Terraform"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+FULL_MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August",
+               "September", "October", "November", "December"]
+
+class CorpusCV(NamedTuple):
+    source: SourceFile
+    record: Dict[str, Any]
+    pages: int
+
+def _duration(rng: random.Random, start_year: int, first: bool) -> str:
+    """Durations in the mix of formats the extractor sees in real CVs."""
+    end_year = start_year + rng.randint(1, 4)
+    m1, m2 = rng.randint(1, 12), rng.randint(1, 12)
+    styles = [
+        lambda: f"{MONTHS[m1 - 1]}-{start_year} - {MONTHS[m2 - 1]}-{end_year}",
+        lambda: f"{m1:02d}/{start_year} - {m2:02d}/{end_year}",
+        lambda: f"{FULL_MONTHS[m1 - 1]} {start_year} – {MONTHS[m2 - 1]} {end_year}",
+        lambda: f"{start_year} - {end_year}",
+    ]
+    if first:
+        return rng.choice([f"{MONTHS[m1 - 1]}-{start_year} - Present", f"{m1:02d}/{start_year} - Present"])
+    return rng.choice(styles)()
+
+def make_record(rng: random.Random, cv_id: str, experiences: int, max_responsibilities: int) -> Dict[str, Any]:
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    year = 2024
+    exps = []
+    for i in range(experiences):
+        year -= rng.randint(1, 3)
+        company = rng.choice(COMPANIES)
+        exps.append({
+            "company": f"{company}, Location: {rng.choice(CITIES)}",
+            "role": rng.choice(ROLES),
+            "duration": _duration(rng, year, first=(i == 0)),
+            "responsibilities": [
+                f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} for {company} ({cv_id} item {j + 1})"
+                for j in range(rng.randint(1, max_responsibilities))
+            ],
+        })
+    return {
+        "candidate_name": name,
+        "position": exps[0]["role"] if exps else rng.choice(ROLES),
+        "education": "BSc Computer Science",
+        "total_experience_years": str(2024 - year),
+        "phone": f"+971 50 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+        "email": f"{name.split()[0].lower()}.{cv_id.lower()}@example.com",
+        "intro_paragraph": f"{name} is an experienced {exps[0]['role'] if exps else 'engineer'} "
+                           f"with {2024 - year} years across {len({e['company'] for e in exps})} employers.",
+        "experiences": exps,
+        "technical_skills": rng.sample(SKILLS, rng.randint(3, 8)),
+        "certifications": ["AWS Certified Solutions Architect"] if rng.random() < 0.5 else [],
+        "language_skills": ["English - Fluent", "Arabic - Native"] if rng.random() < 0.5 else [],
+    }
+
+def job_heading(exp: Dict[str, Any]) -> str:
+    """The lines record_lines starts a job with."""
+    return f"{exp['company']}\n{exp['role']} | {exp['duration']}"
+
+def index_jobs(records: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    # make_pdf writes en dashes as hyphens
+    return {job_heading(exp).replace("–", "-"): exp for record in records.values() for exp in record["experiences"]}
+
+def record_for_prompt(records: Dict[str, Dict[str, Any]], jobs: Dict[str, Dict[str, Any]],
+                      prompt: str) -> Optional[Dict[str, Any]]:
+    """The record a prompt is about, found by its candidate reference.
+    
+    Experience chunks of a long CV carry no reference; they get just the
+    jobs whose headings appear in them, in order. Prompts asking for some
+    fields only (repairs, chunks) get only those, like a schema-bound model.
+    """
+    match = CV_ID_RE.search(prompt)
+    if match:
+        record = records.get(match.group(1))
+    else:
+        text = prompt.replace("–", "-")
+        found = sorted(((text.find(heading), exp) for heading, exp in jobs.items() if heading in text),
+                       key=lambda item: item[0])
+        record = {"experiences": [exp for _, exp in found]} if found else None
+    fields = FIELDS_RE.search(prompt)
+    if record is not None and fields:
+        record = {name: record[name] for name in fields.group(1).split(", ") if name in record}
+    return record
+
+def record_lines(record: Dict[str, Any], cv_id: str) -> List[str]:
+    lines = [record["candidate_name"].upper(), record["position"], record["email"], record["phone"],
+             f"Candidate reference: {cv_id}", "", "PROFESSIONAL SUMMARY", record["intro_paragraph"], "",
+             "WORK EXPERIENCE"]
+    for exp in record["experiences"]:
+        lines += [""] + job_heading(exp).split("\n")
+        lines += [f"• {resp}" for resp in exp["responsibilities"]]
+    lines += ["", "EDUCATION", record["education"], "", "SKILLS", ", ".join(record["technical_skills"])]
+    return lines
+
+def paginate(lines: List[str], pages: int, rng: random.Random) -> List[List[str]]:
+    """Split into pages, padding with project notes to reach the page count."""
+    filler = 0
+    while len(lines) < pages * LINES_PER_PAGE:
+        filler += 1
+        lines.append(f"Project note {filler}: {rng.choice(VERBS).lower()} {rng.choice(OBJECTS)}.")
+    per_page = -(-len(lines) // pages)
+    return [lines[i:i + per_page] for i in range(0, len(lines), per_page)]
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """Minimal text-only PDF (Helvetica, one content stream per page)."""
+    objects = []
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(b"")
+    kids = []
+    for lines in pages:
+        ops = ["BT /F1 9 Tf 40 800 Td 16 TL"]
+        for line in lines:
+            line = line.replace("•", "-").replace("–", "-")
+            line = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({line}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 595 842] "
+                        f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content} 0 R >>".encode()))
+    objects[pages_id - 1] = (f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] "
+                             f"/Count {len(kids)} >>").encode()
+    catalog = add(f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode())
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+def make_docx(pages: List[List[str]]) -> bytes:
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+    doc = Document()
+    for number, lines in enumerate(pages):
+        if number:
+            doc.paragraphs[-1].add_run().add_break(WD_BREAK.PAGE)
+        for line in lines:
+            doc.add_paragraph(line)
+    buf = BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def make_corpus(count: int, seed: int = 7, formats=FORMATS, max_pages: int = 40,
+                max_experiences: int = 20, max_responsibilities: int = 100) -> List[CorpusCV]:
+    """`count` CVs cycling through `formats`, with random sizes up to the limits."""
+    rng = random.Random(seed)
+    corpus = []
+    for n in range(count):
+        cv_id = f"CV-{n + 1:04d}"
+        fmt = formats[n % len(formats)]
+        # Most CVs are short; a few are portfolio-sized
+        pages = min(max_pages, 1 + int(rng.expovariate(1 / 3))) if n % 10 else rng.randint(1, max_pages)
+        record = make_record(rng, cv_id, rng.randint(1, max_experiences), max_responsibilities)
+        laid_out = paginate(record_lines(record, cv_id), pages, rng)
+        if fmt == "pdf":
+            source = SourceFile(f"{cv_id}.pdf", make_pdf(laid_out), PDF_MIME)
+        elif fmt == "docx":
+            source = SourceFile(f"{cv_id}.docx", make_docx(laid_out), DOCX_MIME)
+        else:
+            source = SourceFile(f"{cv_id}.txt", "\f".join("\n".join(p) for p in laid_out).encode("utf-8"), "text/plain")
+        corpus.append(CorpusCV(source, record, len(laid_out)))
+    return corpus
+
+class FakeModel:
+    """Stands in for genai.GenerativeModel, answering from canned records."""
+
+    def __init__(self, records: Dict[str, Dict[str, Any]], latency: float = 0.0, chunk_size: int = 256):
+        self.records = records
+        self.jobs = index_jobs(records)
+        self.latency = latency
+        self.chunk_size = chunk_size
+
+    def _answer(self, prompt: str) -> str:
+        record = record_for_prompt(self.records, self.jobs, prompt)
+        return "```json\n" + json.dumps(record or {}) + "\n```"
+
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        if self.latency:
+            time.sleep(self.latency)
+        text = self._answer(prompt)
+        if not stream:
+            return _Response(text)
+        return [_Response(text[i:i + self.chunk_size]) for i in range(0, len(text), self.chunk_size)]
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeCVExtractor(CVExtractor):
+    """CVExtractor whose model is a FakeModel; parsing and validation are real."""
+
+    def __init__(self, corpus: List[CorpusCV], latency: float = 0.0, cache=None, stream: bool = True,
+                 long_cv_tokens: int = 0, chunk_tokens: int = 4000, rule_confidence: float = 0.9):
+        # Corpus files are named after their candidate reference
+        records = {os.path.splitext(cv.source.name)[0]: cv.record for cv in corpus}
+        self.model_name = "fake-model"
+        self.model = FakeModel(records, latency)
+        self.cfg = {}
+        self.cache = cache
+        self.stream = stream
+        self.caller = ResilientCaller()
+        self.long_cv_tokens = long_cv_tokens
+        self.chunk_tokens = chunk_tokens
+        self.rule_confidence = rule_confidence
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic CV corpus to a folder")
+    parser.add_argument("out_dir")
+    parser.add_argument("--cvs", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    records = {}
+    for cv in make_corpus(args.cvs, args.seed):
+        with open(os.path.join(args.out_dir, cv.source.name), "wb") as f:
+            f.write(cv.source.getvalue())
+        records[cv.source.name] = cv.record
+    with open(os.path.join(args.out_dir, "records.json"), "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=2)
+    print(f"Wrote {len(records)} CVs and records.json to {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# fake_gemini.py - Local stand-in for the Gemini REST API
+# -----------------------------------------------------------------
+# Serves generateContent and streamGenerateContent the way the REST transport
+# of google-generativeai calls them, answering from the records a corpus was
+# generated with (benchmarks/corpus.py), so load tests need no API key and
+# spend no quota. Point the app or the CLI at it with the
+# gemini_api_endpoint setting (GEMINI_API_ENDPOINT in the environment).
+#
+# Latency, server errors and rate limiting are configurable:
+#
+#   --latency fixed:2 | uniform:1:4 | exp:2 | lognormal:MEDIAN:SIGMA
+#       seconds per response; streamed responses spread it over their chunks
+#   --error-rate 0.02 --error-status 500
+#       fraction of requests answered with a server error
+#   --throttle-rate 0.05
+#       fraction of requests answered with 429 RESOURCE_EXHAUSTED
+#   --malformed-rate 0.02
+#       fraction of requests answered 200 with truncated, unparseable JSON
+#   --rpm 60
+#       requests per minute allowed (token bucket); the excess gets 429
+#
+# GET /stats returns the request, error and 429 counters as JSON.
+#
+#   python benchmarks/fake_gemini.py records.json [--port 8765] [--latency lognormal:2:0.4]
+import argparse, json, math, os, random, re, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from corpus import index_jobs, record_for_prompt
+
+ROUTE_RE = re.compile(r"^/v1(?:beta)?/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)")
+PACKED_CV_RE = re.compile(r"=== BEGIN CV ([^\s<>]+) ===(.*?)=== END CV \1 ===", re.S)
+CHUNK_SIZE = 256
+
+def parse_latency(spec: str):
+    """Turn a --latency spec into a function returning seconds."""
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(*values)
+    if kind == "exp" and len(values) == 1:
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] else 0.0
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise argparse.ArgumentTypeError(f"bad latency spec: {spec}")
+
+class FakeGemini:
+    """Answers, failure injection and counters shared by all request threads."""
+
+    def __init__(self, records: Dict[str, Dict[str, Any]], latency, error_rate: float = 0.0,
+                 error_status: int = 500, throttle_rate: float = 0.0, rpm: float = 0.0, seed: int = 7,
+                 malformed_rate: float = 0.0):
+        self.records = records
+        self.jobs = index_jobs(records)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rate = throttle_rate
+        self.rpm = rpm
+        self.malformed_rate = malformed_rate
+        self._rng = random.Random(seed)
+        self._tokens = rpm
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0, "malformed": 0, "unknown_cv": 0}
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.rpm, self._tokens + (now - self._refilled) * self.rpm / 60)
+        self._refilled = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def decide(self):
+        """(HTTP status, latency seconds) for the next request; status None means malformed."""
+        with self._lock:
+            self.counts["requests"] += 1
+            if (self.rpm and not self._take_token()) or self._rng.random() < self.throttle_rate:
+                self.counts["throttled"] += 1
+                return 429, 0.0
+            if self._rng.random() < self.error_rate:
+                self.counts["errors"] += 1
+                return self.error_status, self.latency(self._rng)
+            if self._rng.random() < self.malformed_rate:
+                self.counts["malformed"] += 1
+                return None, self.latency(self._rng)
+            self.counts["ok"] += 1
+            return 200, self.latency(self._rng)
+
+    def _record(self, cv_text: str) -> Optional[Dict[str, Any]]:
+        record = record_for_prompt(self.records, self.jobs, cv_text)
+        if record is None:
+            with self._lock:
+                self.counts["unknown_cv"] += 1
+        return record
+
+    def answer(self, prompt: str) -> str:
+        packed = PACKED_CV_RE.findall(prompt)
+        if packed:
+            return json.dumps([{"cv_id": cv_id, "data": self._record(text) or {}} for cv_id, text in packed])
+        return "```json\n" + json.dumps(self._record(prompt) or {}) + "\n```"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+def _candidate(text: str, usage: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """One response; the last one of a stream carries finishReason and usage."""
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    response = {"candidates": [candidate]}
+    if usage:
+        candidate["finishReason"] = "STOP"
+        response["usageMetadata"] = usage
+    return response
+
+def _usage(prompt: str, text: str) -> Dict[str, int]:
+    # Roughly four characters per token, like cv_preprocess.estimate_tokens
+    prompt_tokens, output_tokens = len(prompt) // 4, len(text) // 4
+    return {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens}
+
+def _error(status: int) -> Dict[str, Any]:
+    if status == 429:
+        return {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED",
+                          "message": "Resource has been exhausted (e.g. check quota)."}}
+    return {"error": {"code": status, "status": "INTERNAL" if status == 500 else "UNAVAILABLE",
+                      "message": "An internal error has occurred."}}
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "FakeGemini/1.0"
+    fake: FakeGemini = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.fake.stats())
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def do_POST(self):
+        route = ROUTE_RE.match(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if route is None:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+        request = json.loads(body or b"{}")
+        prompt = "".join(part.get("text", "") for content in request.get("contents", [])
+                         for part in content.get("parts", []))
+
+        status, latency = self.fake.decide()
+        if status not in (200, None):
+            time.sleep(latency)
+            self._send_json(status, _error(status))
+            return
+
+        text = self.fake.answer(prompt)
+        if status is None:
+            text = text[:len(text) // 2]
+        if route.group("method") == "generateContent":
+            time.sleep(latency)
+            self._send_json(200, _candidate(text, _usage(prompt, text)))
+            return
+
+        # The REST transport streams a JSON array of responses
+        chunks = [text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)] or [""]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for i, chunk in enumerate(chunks):
+                time.sleep(latency / len(chunks))
+                piece = json.dumps(_candidate(chunk, _usage(prompt, text) if i == len(chunks) - 1 else None))
+                self.wfile.write((("[" if i == 0 else ",\r\n") + piece).encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"]")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client stopped reading, e.g. a cancelled hedged request
+
+def start_server(fake: FakeGemini, port: int = 0, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve `fake` on a background thread; the bound port is server.server_port."""
+    handler = type("FakeGeminiHandler", (Handler,), {"fake": fake})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-gemini", daemon=True).start()
+    return server
+
+def load_records(path: str) -> Dict[str, Dict[str, Any]]:
+    """Records written by corpus.py, keyed by candidate reference."""
+    with open(path, encoding="utf-8") as f:
+        return {os.path.splitext(name)[0]: record for name, record in json.load(f).items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini REST API")
+    parser.add_argument("records", help="records.json written by benchmarks/corpus.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--latency", type=parse_latency, default=parse_latency("lognormal:2:0.4"))
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500, choices=[500, 503])
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=float, default=0.0, help="requests per minute (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    fake = FakeGemini(load_records(args.records), args.latency, args.error_rate, args.error_status,
+                      args.throttle_rate, args.rpm, args.seed, args.malformed_rate)
+    server = start_server(fake, args.port, args.host)
+    # Parsed by bench_load.py to find the port
+    print(f"Listening on http://{args.host}:{server.server_port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps(fake.stats()))
+
+if __name__ == "__main__":
+    main()
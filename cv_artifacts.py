@@ -0,0 +1,150 @@
+# cv_artifacts.py - Disk-backed store for converted CVs
+# -----------------------------------------------------------------
+# Rendered documents and their extracted data are written to local disk and
+# referenced from session state by artifact id, so a session only keeps a
+# little metadata in memory however many CVs it converts.
+#
+# The store is shared by all sessions of the process. It is bounded by a
+# total byte budget (least recently used artifacts are evicted first) and by
+# a TTL on last access matched to the login session lifetime; artifacts are
+# also dropped explicitly when their session logs out or times out.
+#
+# The index lives in memory, so each process only evicts what it wrote.
+# Files nobody indexes (left by a previous process, or written by another
+# process sharing the directory) are swept when the store is created and
+# then every few minutes, but only once they have not been written or read
+# for the TTL: another process may still be serving them.
+import json, os, re, threading, time, uuid
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional
+
+ARTIFACT_FILE_RE = re.compile(r"^([0-9a-f]{32})\.(?:docx|json)(?:\.part)?$")
+SWEEP_INTERVAL = 300.0  # seconds between sweeps for unindexed files
+
+class ArtifactStore:
+    """Converted CVs on local disk, with LRU eviction and TTL expiry."""
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: float):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.evicted = 0
+        self._lock = threading.Lock()
+        # id -> {"owner", "name", "bytes", "accessed"}, least recently used first
+        self._index: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._swept = 0.0
+        self._sweep(time.time())
+
+    def _path(self, artifact_id: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{artifact_id}.{ext}")
+
+    def _write(self, path: str, write):
+        # Readers never see a half-written file
+        with open(path + ".part", "wb") as f:
+            write(f)
+        os.replace(path + ".part", path)
+
+    def put(self, owner: str, name: str, document: BinaryIO, data: Dict[str, Any]) -> str:
+        """Store a rendered document and its data; returns the artifact id."""
+        artifact_id = uuid.uuid4().hex
+        document.seek(0)
+        self._write(self._path(artifact_id, "docx"), lambda f: f.write(document.read()))
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self._write(self._path(artifact_id, "json"), lambda f: f.write(payload))
+        size = os.path.getsize(self._path(artifact_id, "docx")) + len(payload)
+
+        with self._lock:
+            self._index[artifact_id] = {"owner": owner, "name": name, "bytes": size, "accessed": time.time()}
+            self._bytes += size
+            self._evict(keep=artifact_id)
+        return artifact_id
+
+    def _touch(self, artifact_id: str) -> bool:
+        with self._lock:
+            self._expire(time.time())
+            entry = self._index.get(artifact_id)
+            if entry is None:
+                return False
+            entry["accessed"] = time.time()
+            self._index.move_to_end(artifact_id)
+            return True
+
+    def _read(self, artifact_id: str, ext: str) -> Optional[bytes]:
+        if not self._touch(artifact_id):
+            return None
+        path = self._path(artifact_id, ext)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            # Reads count as use for other processes' sweeps too
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return content
+
+    def read_document(self, artifact_id: str) -> Optional[bytes]:
+        """The rendered DOCX, or None once the artifact has been evicted."""
+        return self._read(artifact_id, "docx")
+
+    def load_data(self, artifact_id: str) -> Optional[Dict[str, Any]]:
+        """The extracted data, or None once the artifact has been evicted."""
+        payload = self._read(artifact_id, "json")
+        return None if payload is None else json.loads(payload.decode("utf-8"))
+
+    def delete(self, artifact_id: str):
+        """Delete one artifact, e.g. once a re-render has replaced it."""
+        with self._lock:
+            if artifact_id in self._index:
+                self._remove(artifact_id)
+
+    def drop_owner(self, owner: str):
+        """Delete every artifact of one session."""
+        with self._lock:
+            for artifact_id in [i for i, entry in self._index.items() if entry["owner"] == owner]:
+                self._remove(artifact_id)
+
+    def _remove(self, artifact_id: str):
+        entry = self._index.pop(artifact_id)
+        self._bytes -= entry["bytes"]
+        for ext in ("docx", "json"):
+            try:
+                os.remove(self._path(artifact_id, ext))
+            except OSError:
+                pass
+
+    def _expire(self, now: float):
+        for artifact_id in [i for i, entry in self._index.items()
+                            if entry["accessed"] < now - self.ttl_seconds]:
+            self._remove(artifact_id)
+            self.evicted += 1
+        if now - self._swept >= SWEEP_INTERVAL:
+            self._sweep(now)
+
+    def _sweep(self, now: float):
+        """Delete unindexed artifact files not written or read within the TTL."""
+        self._swept = now
+        for name in os.listdir(self.directory):
+            match = ARTIFACT_FILE_RE.match(name)
+            if match is None or match.group(1) in self._index:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < now - self.ttl_seconds:
+                    os.remove(path)
+            except OSError:
+                pass  # already gone, e.g. removed by its own process
+
+    def _evict(self, keep: str):
+        self._expire(time.time())
+        while self._bytes > self.max_bytes:
+            artifact_id = next(iter(self._index))
+            if artifact_id == keep:
+                break
+            self._remove(artifact_id)
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"artifacts": len(self._index), "bytes": self._bytes, "evicted": self.evicted}
@@ -0,0 +1,128 @@
+# cv_audit.py - Buffered, asynchronous audit log
+# -----------------------------------------------------------------
+# Audit entries (logins, conversions, downloads) are put on a bounded
+# in-memory queue and written by a background thread in batches, one JSON
+# object per line, so logging costs the Streamlit thread a dict and a queue
+# put. Files rotate by size (access.jsonl, access.jsonl.1, ...), and the
+# writer fsyncs on a timer rather than per entry.
+#
+# When the queue is full the caller waits briefly for the writer to catch up
+# (backpressure); entries that still do not fit are dropped and counted
+# rather than blocking a page indefinitely.
+#
+# Nothing here imports streamlit.
+import atexit, json, logging, os, queue, threading, time
+from datetime import datetime
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class AuditLog:
+    """Rotating JSONL audit log written by a background thread."""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5,
+                 queue_size: int = 10000, batch_size: int = 500, fsync_seconds: float = 5.0,
+                 put_timeout: float = 0.5):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.fsync_seconds = fsync_seconds
+        self.put_timeout = put_timeout
+        self.written = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._file = open(path, "ab")
+        self._synced = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="cv-audit", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, email: str, action: str, details: str = "", **fields: Any):
+        """Queue one entry; cheap enough to call on the request path."""
+        entry = {"timestamp": datetime.now().astimezone().isoformat(timespec="milliseconds"),
+                 "email": email, "action": action, "details": details}
+        entry.update(fields)
+        try:
+            self._queue.put(entry, timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self):
+        while True:
+            # Wake up at least once per fsync interval so buffered lines reach disk
+            try:
+                first = self._queue.get(timeout=self.fsync_seconds)
+            except queue.Empty:
+                self._sync()
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in batch
+            self._write([entry for entry in batch if entry is not _STOP])
+            if stop:
+                self._sync(force=True)
+                return
+            if time.monotonic() - self._synced >= self.fsync_seconds:
+                self._sync()
+
+    def _write(self, entries: List[Dict[str, Any]]):
+        if not entries:
+            return
+        data = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+                       for entry in entries).encode("utf-8")
+        try:
+            if self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self.written += len(entries)
+        except OSError as e:
+            with self._lock:
+                self.dropped += len(entries)
+            logger.warning("Audit log write failed, %d entries lost: %s", len(entries), e)
+
+    def _sync(self, force: bool = False):
+        if not force and time.monotonic() - self._synced < self.fsync_seconds:
+            return
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except (OSError, ValueError):
+            pass
+        self._synced = time.monotonic()
+
+    def _rotate(self):
+        self._sync(force=True)
+        self._file.close()
+        try:
+            for n in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{n}"):
+                    os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+            if self.backups:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+        finally:
+            # If renaming failed, keep appending to the current file
+            self._file = open(self.path, "ab")
+
+    def close(self):
+        """Write everything queued so far and stop the writer."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
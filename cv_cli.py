@@ -0,0 +1,205 @@
+# cv_cli.py - Batch CV conversion from the command line
+# -----------------------------------------------------------------
+# Converts a folder of CVs (PDF, DOCX, TXT) with the same pipeline as the
+# Streamlit app, without a browser session:
+#
+#   GEMINI_API_KEY=... python cv_cli.py cvs/ --template "CV Template.docx" \
+#       --output-dir converted/ --workers 8
+#
+# Each CV is written to <output dir>/<relative path>/<stem>_Formatted.docx.
+# Outputs that already exist are skipped, so an interrupted run is resumed by
+# running the same command again (--force converts everything). Outputs are
+# written to a temporary file first, so a half-written document is never
+# mistaken for a finished one. CVs whose Gemini extraction fails get no
+# output and are retried on the next run.
+#
+# Settings not given as options are read from the same environment variables
+# as the app (CONVERSION_WORKERS, PDF_WORKERS, EXTRACTION_CACHE_PATH, ...).
+#
+# The summary keeps each CV's stage timings, tokens and cache outcome, and
+# --metrics-file writes the run's totals in the Prometheus text format.
+import argparse, json, logging, os, sys, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List
+import cv_core, cv_metrics, cv_pdf
+from cv_core import (
+    MIME_TYPES, CVExtractor, ExtractionCache, PromptBatcher, SourceFile,
+    convert_cv, load_template_plan, read_setting, safe_filename,
+)
+from cv_resilience import caller_from_settings
+
+logger = logging.getLogger("cv_cli")
+
+OUTPUT_SUFFIX = "_Formatted.docx"
+
+def find_cvs(input_dir: str, recursive: bool) -> List[str]:
+    """CV files under input_dir, relative to it, in a stable order."""
+    found = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in MIME_TYPES and not name.startswith("~$"):
+                found.append(os.path.relpath(os.path.join(root, name), input_dir))
+        if not recursive:
+            break
+    return found
+
+def output_paths(sources: List[str]) -> Dict[str, str]:
+    """Map each relative source path to its relative output path.
+
+    CVs that share a stem in one folder (cv.pdf and cv.docx) keep their
+    extension in the output name so neither overwrites the other.
+    """
+    stems = {}
+    for source in sources:
+        stems.setdefault(os.path.splitext(source)[0].lower(), []).append(source)
+    outputs = {}
+    for source in sources:
+        folder, name = os.path.split(source)
+        stem, ext = os.path.splitext(name)
+        if len(stems[os.path.splitext(source)[0].lower()]) > 1:
+            stem = f"{stem}_{ext.lstrip('.').lower()}"
+        outputs[source] = os.path.join(folder, safe_filename(stem + OUTPUT_SUFFIX))
+    return outputs
+
+def write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial = path + ".part"
+    with open(partial, "wb") as f:
+        f.write(data)
+    os.replace(partial, path)
+
+def convert_file(source: str, output: str, args, extractor, plan) -> Dict[str, Any]:
+    """Convert one CV and write its output; returns its summary record."""
+    record = {"input": source, "output": None, "status": "failed", "candidate_name": None,
+              "seconds": 0.0, "messages": []}
+    began = time.perf_counter()
+    try:
+        cv = SourceFile.from_path(os.path.join(args.input_dir, source))
+        outcome = convert_cv(cv, extractor, plan, use_cache=not args.no_cache)
+        record["messages"] = [f"{level}: {msg}" for level, msg in outcome["messages"]]
+        record["metrics"] = dict(outcome["metrics"], seconds={
+            stage: round(seconds, 3) for stage, seconds in outcome["metrics"]["seconds"].items()})
+        result = outcome["result"]
+        if result and result["extracted"]:
+            write_atomic(os.path.join(args.output_dir, output), result["buffer"].getvalue())
+            record.update(status="converted", output=output,
+                          candidate_name=result["data"].get("candidate_name") or None,
+                          tokens_before=result["text_stats"]["tokens_before"],
+                          tokens_after=result["text_stats"]["tokens_after"])
+    except Exception as e:
+        record["messages"].append(f"error: {e}")
+    record["seconds"] = round(time.perf_counter() - began, 3)
+    return record
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert a folder of CVs into the company template.",
+        epilog="The Gemini API key is read from the GEMINI_API_KEY environment variable.")
+    parser.add_argument("input_dir", help="folder containing the CVs (PDF, DOCX, TXT)")
+    parser.add_argument("--template", required=True, help="company template (DOCX)")
+    parser.add_argument("--output-dir", required=True, help="where converted CVs are written")
+    parser.add_argument("--workers", type=int, default=read_setting("conversion_workers", 4),
+                        help="CVs converted at once (default: %(default)s)")
+    parser.add_argument("--pdf-workers", type=int, default=read_setting("pdf_workers", cv_pdf.DEFAULT_WORKERS),
+                        help="processes used for large PDFs (default: %(default)s)")
+    parser.add_argument("--recursive", action="store_true", help="also convert CVs in subfolders")
+    parser.add_argument("--force", action="store_true", help="convert CVs that already have an output")
+    parser.add_argument("--no-cache", action="store_true", help="re-analyze CVs found in the extraction cache")
+    parser.add_argument("--cache-path", default=read_setting(
+        "extraction_cache_path", os.path.join(".cache", "extractions.sqlite3")),
+        help="extraction cache shared with the app (default: %(default)s)")
+    parser.add_argument("--pack-short-cvs", action="store_true", default=read_setting("pack_short_cvs", False),
+                        help="send several short CVs in one Gemini request")
+    parser.add_argument("--summary", help="JSON summary path (default: <output dir>/summary.json)")
+    parser.add_argument("--metrics-file", default=read_setting("metrics_file", ""),
+                        help="also write the run's metrics here, in the Prometheus text format")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args(argv)
+    api_key = os.environ.get("GEMINI_API_KEY", "")
+    if not api_key:
+        logger.error("GEMINI_API_KEY is not set")
+        return 2
+    if not os.path.isdir(args.input_dir):
+        logger.error("Input folder not found: %s", args.input_dir)
+        return 2
+
+    cv_pdf.configure(read_setting("pdf_parallel_min_pages", cv_pdf.PARALLEL_MIN_PAGES), args.pdf_workers)
+    cv_core.configure_chunks(read_setting("long_cv_chunk_workers", cv_core.CHUNK_WORKERS))
+    with open(args.template, "rb") as f:
+        plan = load_template_plan(f.read())
+    cache = ExtractionCache(
+        args.cache_path,
+        ttl_seconds=read_setting("extraction_cache_ttl_hours", 168.0) * 3600,
+        max_entries=read_setting("extraction_cache_max_entries", 5000),
+    )
+    extractor = CVExtractor(api_key, cache=cache, stream=read_setting("stream_extraction", True),
+                            api_endpoint=read_setting("gemini_api_endpoint", ""),
+                            caller=caller_from_settings(read_setting),
+                            long_cv_tokens=read_setting("long_cv_tokens", 8000),
+                            chunk_tokens=read_setting("long_cv_chunk_tokens", 4000),
+                            rule_confidence=read_setting("rule_skip_confidence", 0.9))
+    if args.pack_short_cvs:
+        extractor = PromptBatcher(extractor, read_setting("pack_token_budget", 6000),
+                                  read_setting("pack_max_cvs", 5), read_setting("pack_max_cv_tokens", 1500))
+
+    sources = find_cvs(args.input_dir, args.recursive)
+    outputs = output_paths(sources)
+    records, todo = [], []
+    for source in sources:
+        if not args.force and os.path.exists(os.path.join(args.output_dir, outputs[source])):
+            records.append({"input": source, "output": outputs[source], "status": "skipped"})
+        else:
+            todo.append(source)
+    logger.info("%d CV(s) found, %d already converted, %d to convert",
+                len(sources), len(sources) - len(todo), len(todo))
+
+    started = datetime.now()
+    interrupted = False
+    pool = ThreadPoolExecutor(max_workers=max(1, args.workers))
+    try:
+        futures = [pool.submit(convert_file, source, outputs[source], args, extractor, plan) for source in todo]
+        for done, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            records.append(record)
+            log = logger.info if record["status"] == "converted" else logger.warning
+            log("[%d/%d] %s %s (%.1fs)", done, len(todo), record["status"], record["input"], record["seconds"])
+            for message in record["messages"]:
+                logger.debug("    %s", message)
+    except KeyboardInterrupt:
+        # CVs already in flight still finish; their outputs are written atomically
+        interrupted = True
+        logger.warning("Interrupted; writing the summary for the CVs finished so far")
+    finally:
+        pool.shutdown(wait=not interrupted, cancel_futures=True)
+
+    counts = {status: sum(1 for r in records if r["status"] == status)
+              for status in ("converted", "skipped", "failed")}
+    summary = {
+        "input_dir": os.path.abspath(args.input_dir),
+        "output_dir": os.path.abspath(args.output_dir),
+        "template": os.path.abspath(args.template),
+        "started": started.isoformat(timespec="seconds"),
+        "finished": datetime.now().isoformat(timespec="seconds"),
+        "interrupted": interrupted,
+        "counts": counts,
+        "extraction_cache": cache.stats(),
+        "gemini_tokens": {direction: sum(r.get("metrics", {}).get(f"{direction}_tokens", 0) for r in records)
+                          for direction in ("input", "output")},
+        "pdf_tiers": cv_pdf.TIER_STATS.snapshot(),
+        "files": sorted(records, key=lambda r: r["input"]),
+    }
+    summary_path = args.summary or os.path.join(args.output_dir, "summary.json")
+    write_atomic(summary_path, json.dumps(summary, indent=2, ensure_ascii=False).encode("utf-8"))
+    if args.metrics_file:
+        cv_metrics.write_textfile(args.metrics_file)
+    logger.info("%d converted, %d skipped, %d failed; summary written to %s",
+                counts["converted"], counts["skipped"], counts["failed"], summary_path)
+    return 1 if counts["failed"] or interrupted else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,21 @@
 # cv_converter.py - Enhanced CV Converter with Authentication
 # -----------------------------------------------------------------
-# pip install streamlit PyPDF2 python-docx google-generativeai
-import os, re, json, time
-from io import BytesIO
-from typing import Dict, Any, List
+# pip install streamlit PyPDF2 pdfplumber python-docx google-generativeai
+#
+# Streamlit front end; the conversion pipeline itself lives in cv_core.py.
+import os, uuid
 from datetime import datetime
 import streamlit as st
-import PyPDF2
-from docx import Document
-from docx.shared import Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import google.generativeai as genai
-import pdfplumber # for better pdf extraction
+import cv_core, cv_pdf
+from cv_artifacts import ArtifactStore
+from cv_audit import AuditLog
+from cv_core import (
+    HEADER_FIELDS, BatchArchive, CVExtractor, ExtractionCache, PromptBatcher, SourceFile,
+    load_template_plan, read_setting, safe_filename,
+)
+from cv_jobs import JobQueue, convert_job_cv, make_job_id, rerender_job_cv
+from cv_metrics import MetricsExporter
+from cv_resilience import ResilientCaller, caller_from_settings
 
 # ────────────────────────────────────────────────────────────────
 #  Page Configuration
@@ -27,6 +31,79 @@ st.set_page_config(
 #  Configuration
 # ────────────────────────────────────────────────────────────────
 DEFAULT_API_KEY = ""  # Remove hardcoded key for production
+SESSION_TIMEOUT_SECONDS = 1800  # 30 minutes
+
+def get_setting(name: str, default):
+    """Read a deployment setting from Streamlit secrets, then the environment."""
+    return read_setting(name, default, st.secrets)
+
+CONVERSION_WORKERS = get_setting("conversion_workers", 4)  # CVs in flight at once, across all sessions
+JOB_POLL_SECONDS = get_setting("job_poll_seconds", 1.0)  # how often the page refreshes job progress
+PDF_PARALLEL_MIN_PAGES = get_setting("pdf_parallel_min_pages", cv_pdf.PARALLEL_MIN_PAGES)
+PDF_WORKERS = get_setting("pdf_workers", cv_pdf.DEFAULT_WORKERS)  # processes for large PDFs
+STREAM_EXTRACTION = get_setting("stream_extraction", True)  # parse Gemini output as it arrives
+PACK_SHORT_CVS = get_setting("pack_short_cvs", False)  # default for the UI toggle
+PACK_TOKEN_BUDGET = get_setting("pack_token_budget", 6000)  # CV text tokens per packed request
+PACK_MAX_CVS = get_setting("pack_max_cvs", 5)
+PACK_MAX_CV_TOKENS = get_setting("pack_max_cv_tokens", 1500)  # longer CVs are never packed
+LONG_CV_TOKENS = get_setting("long_cv_tokens", 8000)  # longer CVs are extracted in chunks; 0 disables
+LONG_CV_CHUNK_TOKENS = get_setting("long_cv_chunk_tokens", 4000)  # experience text per chunk
+LONG_CV_CHUNK_WORKERS = get_setting("long_cv_chunk_workers", cv_core.CHUNK_WORKERS)  # chunks in flight, all CVs
+RULE_SKIP_CONFIDENCE = get_setting("rule_skip_confidence", 0.9)  # locally found fields not asked of Gemini; above 1 disables
+EXPORT_DIR = get_setting("export_dir", "")  # where batch ZIPs are built; empty for the system temp dir
+GEMINI_API_ENDPOINT = get_setting("gemini_api_endpoint", "")  # e.g. a proxy; empty for Google's API
+cv_pdf.configure(PDF_PARALLEL_MIN_PAGES, PDF_WORKERS)
+cv_core.configure_chunks(LONG_CV_CHUNK_WORKERS)
+
+@st.cache_resource(show_spinner=False)
+def get_extraction_cache() -> ExtractionCache:
+    """One cache connection per process, shared by all sessions."""
+    return ExtractionCache(
+        get_setting("extraction_cache_path", os.path.join(".cache", "extractions.sqlite3")),
+        ttl_seconds=get_setting("extraction_cache_ttl_hours", 168.0) * 3600,
+        max_entries=get_setting("extraction_cache_max_entries", 5000),
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue() -> JobQueue:
+    """Conversion workers shared by all sessions; jobs outlive script runs."""
+    return JobQueue(CONVERSION_WORKERS, ttl_seconds=SESSION_TIMEOUT_SECONDS)
+
+@st.cache_resource(show_spinner=False)
+def get_gemini_caller() -> ResilientCaller:
+    """Retries, hedging and the circuit breaker for every session's Gemini calls."""
+    return caller_from_settings(get_setting)
+
+@st.cache_resource(show_spinner=False)
+def get_audit_log() -> AuditLog:
+    """Audit trail of logins, conversions and downloads, written in the background."""
+    return AuditLog(
+        get_setting("audit_log_path", os.path.join(".cache", "audit", "access.jsonl")),
+        max_bytes=get_setting("audit_log_max_mb", 10) * 1024 * 1024,
+        backups=get_setting("audit_log_backups", 5),
+        fsync_seconds=get_setting("audit_log_fsync_seconds", 5.0),
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_exporter() -> MetricsExporter:
+    """Publishes the process's conversion metrics; both outputs are off unless configured."""
+    return MetricsExporter(
+        get_setting("metrics_file", ""),  # e.g. a node_exporter textfile collector directory
+        port=get_setting("metrics_port", 0),  # serves GET /metrics when set
+        host=get_setting("metrics_host", "127.0.0.1"),
+        interval=get_setting("metrics_interval_seconds", 15.0),
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_artifact_store() -> ArtifactStore:
+    """Converted CVs of every session, on disk under one byte budget."""
+    return ArtifactStore(
+        get_setting("artifact_dir", os.path.join(".cache", "artifacts")),
+        max_bytes=get_setting("artifact_store_max_mb", 512) * 1024 * 1024,
+        # Nothing outlives the login session it was converted in
+        ttl_seconds=SESSION_TIMEOUT_SECONDS,
+    )
+
 # ────────────────────────────────────────────────────────────────
 #  Authentication Functions
 # ────────────────────────────────────────────────────────────────
@@ -83,27 +160,17 @@ def check_company_email():
 
 def log_access(email: str, action: str, details: str = ""):
     """Log user actions for audit trail."""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Create log entry
-    log_entry = {
-        "timestamp": timestamp,
-        "email": email,
-        "action": action,
-        "details": details
-    }
-    
-    # In production, you might want to send this to a logging service
-    # For now, we'll just print to console (visible in Streamlit logs)
-    print(f"[ACCESS LOG] {timestamp} - {email} - {action} - {details}")
+    # Queued for the background writer; nothing is written on this thread
+    get_audit_log().log(email, action, details)
 
 def check_session_timeout():
     """Check if session has timed out (30 minutes)."""
     if "login_time" in st.session_state:
         elapsed = datetime.now() - st.session_state.login_time
-        if elapsed.total_seconds() > 1800:  # 30 minutes
+        if elapsed.total_seconds() > SESSION_TIMEOUT_SECONDS:
             st.warning("⏱️ Session expired. Please login again.")
-            for key in ["authenticated", "user_email", "login_time"]:
+            release_job()
+            for key in ["authenticated", "user_email", "login_time", "job_id", "reported_job"]:
                 if key in st.session_state:
                     del st.session_state[key]
             st.rerun()
@@ -117,718 +184,226 @@ def mask_api_key(api_key: str) -> str:
         return api_key
     return f"{api_key[:4]}{'*' * (len(api_key) - 8)}{api_key[-4:]}"
 
-def extract_text(upload) -> str:
-    try:
-        if upload.type == "application/pdf":
-            text_parts = []
-            with pdfplumber.open(upload) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        # Clean the text
-                        text = text.encode('utf-8', errors='ignore').decode('utf-8')
-                        text_parts.append(text)
-            return "\n".join(text_parts)
-            
-        if upload.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            doc = Document(BytesIO(upload.getvalue()))
-            return "\n".join(p.text for p in doc.paragraphs)
-            
-        return upload.read().decode("utf-8", errors="ignore")
-    except Exception as e:
-        st.error(f"Error reading {upload.name}: {e}")
-        return ""
-
-def format_date(date_str: str) -> str:
-    """Convert various date formats to MMM YYYY format."""
-    if not date_str:
-        return ""
-    
-    # Check for present/current/ongoing terms
-    if date_str.lower() in ["present", "current", "ongoing", "till date", "now", "till now"]:
-        return "Present"
-    
-    # Common date patterns
-    patterns = [
-        # Handle Sep-2015, Sep 2015, Sep/2015 formats
-        (r'(\w{3,})[- /](\d{4})', lambda m: f"{m.group(1).upper()[:3]} {m.group(2)}"),
-        # Handle 09/2015, 09-2015 formats  
-        (r'(\d{1,2})[/-](\d{4})', lambda m: f"{get_month_abbr(m.group(1).zfill(2))} {m.group(2)}"),
-        # Handle September 2015, Sep 2015 formats
-        (r'(\w+)\s+(\d{4})', lambda m: f"{m.group(1)[:3].upper()} {m.group(2)}"),
-        # Handle September, 2015 formats
-        (r'(\w+),?\s+(\d{4})', lambda m: f"{m.group(1)[:3].upper()} {m.group(2)}"),
-    ]
-    
-    for pattern, formatter in patterns:
-        match = re.search(pattern, date_str, re.IGNORECASE)
-        if match:
-            return formatter(match)
-    
-    return date_str  # Return as-is if no pattern matches
-
-def get_month_abbr(month_num: str) -> str:
-    """Convert month number to 3-letter abbreviation."""
-    months = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", 
-              "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
-    try:
-        # Handle both "02" and "2" formats
-        month_int = int(month_num.lstrip('0') or '0')
-        if 1 <= month_int <= 12:
-            return months[month_int - 1]
-    except:
-        pass
-    return month_num
-
-def format_duration(duration: str, is_first_experience: bool = False) -> str:
-    """Format duration string to MMM YYYY - MMM YYYY format."""
-    if not duration:
-        return ""
-    
-    # Preserve "Present" for ongoing positions
-    if " - Present" in duration or "- Present" in duration:
-        # Just format the start date part
-        parts = re.split(r'\s*-\s*', duration)
-        if parts:
-            start = parts[0].strip()
-            # Convert month to uppercase
-            start = re.sub(r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)', 
-                          lambda m: m.group(1).upper(), start, flags=re.IGNORECASE)
-            # Ensure space between month and year
-            start = re.sub(r'([A-Z]{3})-?(\d{4})', r'\1 \2', start)
-            return f"{start} - Present"
-    
-    # Split by common separators
-    parts = re.split(r'\s*[-–—]\s*', duration)
-    
-    if len(parts) == 2:
-        start = format_date(parts[0].strip())
-        end = format_date(parts[1].strip())
-        return f"{start} - {end}"
-    elif len(parts) == 1 and is_first_experience:
-        # For first experience, if only start date, add Present
-        start = format_date(parts[0].strip())
-        if start and start != "Present":
-            return f"{start} - Present"
-        return start
-    
-    return duration
-
-def format_name(name: str) -> str:
-    """Convert name from ALL CAPS to Proper Case."""
-    if not name:
-        return ""
-    
-    # Handle common name patterns
-    words = name.split()
-    formatted_words = []
-    
-    for word in words:
-        if word.isupper() and len(word) > 1:
-            # Convert from ALL CAPS to Proper Case
-            formatted_words.append(word.capitalize())
-        else:
-            formatted_words.append(word)
-    
-    return " ".join(formatted_words)
-
 # ────────────────────────────────────────────────────────────────
-#  Enhanced Gemini wrapper for comprehensive extraction
+#  Converted CV storage
 # ────────────────────────────────────────────────────────────────
-class CVExtractor:
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-flash-latest")
-        self.cfg = {"temperature": 0.1, "top_p": 0.1, "top_k": 1}
-
-    def extract(self, cv_text: str) -> Dict[str, Any]:
-        prompt = f"""Extract comprehensive information from this CV and return as JSON.
-
-
-CRITICAL INSTRUCTIONS:
-1. Extract ALL experiences (up to 20, most recent first)
-2. IMPORTANT: If a person has multiple projects at the SAME COMPANY, combine them into ONE experience entry:
-   - Company name should be just the company name (e.g., "Seertree Global Services")
-   - Duration should span from the earliest project start to the latest project end
-   - In responsibilities section, list each project as a subheading followed by its responsibilities
-   - Format: "Project Name: [Name], Location: [Location], Duration: [Project Start - Project End]" as the first line, then responsibilities below
-   - Look for project-specific dates in the CV (these may be different from overall company duration)
-3. For each experience, you MUST include:
-   - Company name: Always include location if mentioned anywhere in the experience
-     * Format: "Company Name, Location: Location"
-     * Look for location in company line, job title line, or anywhere in the experience section
-     * Examples: "ITForce Technology, Location: Dubai", "Vogue International FZE, Location: Sharjah"
-     * Location can be city, country, or both (e.g., "Dubai", "Sharjah", "Dubai, UAE", "Delhi, India")
-   - Job title/role (in proper case, not ALL CAPS)
-   - Duration: Use the date format provided
-   - Responsibilities: 
-     * If multiple projects at same company, structure with project headers including individual project durations
-     * Otherwise, list responsibilities directly
-     * Extract EVERY responsibility mentioned
-     * If there's an "Environment:" or "Technologies:" or "Versions:" section, add it as the LAST bullet point
-     * Format environment info as: "Environment/Technologies: [list all tools, versions, technologies mentioned]"
-     * Do NOT add bullet points - they will be added by the template
-4. Extract ALL technical skills comprehensively
-5. Extract ALL certifications with their FULL names and IDs if mentioned
-6. If no professional summary exists, create one based on the CV content
-7. For candidate name, use proper case (e.g., "Raju Gujar" not "RAJU GUJAR")
-8. For position/role, use proper case (e.g., "Senior Technical Engineer" not "SENIOR TECHNICAL ENGINEER")
-
-Return this exact JSON structure:
-{{
-  "candidate_name": "Full name in proper case",
-  "position": "Current or most recent job title in proper case",
-  "education": "Highest degree with field and university",
-  "total_experience_years": "Number only (e.g., 11)",
-  "phone": "Phone number with country code if present",
-  "email": "Email address",
-  "intro_paragraph": "Professional summary add as many sentences as available in CV in paragraph format, word it in a structured manner, summarize if needed.",
-  "experiences": [
-    {{
-      "company": "Company name only (no project details here)",
-      "role": "Job title in proper case",
-      "duration": "Start date of first project - End date of last project (or Present)",
-      "responsibilities": [
-        "Project Name: Project 1 Name, Location: Location 1, Duration: Sep 2015 - Jun 2018",
-        "First responsibility for project 1",
-        "Second responsibility for project 1",
-        "All other responsibilities for project 1",
-        "Environment: Oracle 19c/12c, SQL * Plus, TOAD, SQL*Loader, SQL Developer, Shell Scripts, UNIX, Windows 10",
-        "Project Name: Project 2 Name, Location: Location 2, Duration: Jul 2018 - Present",
-        "First responsibility for project 2",
-        "Second responsibility for project 2",
-        "Environment: Oracle 19c/12c, SQL * Plus, TOAD, SQL*Loader, SQL Developer, Shell Scripts, UNIX, Windows 10",
-        "Continue for all projects and responsibilities"
-      ]
-    }}
-  ],
-  "technical_skills": ["List ALL technical skills mentioned"],
-  "certifications": ["Full certification names with IDs"],
-  "language_skills": ["Language - Proficiency level"]
-}}
-
-EXAMPLE for someone with multiple projects at same company:
-{{
-  "experiences": [
-    {{
-      "company": "Seertree Global Services",
-      "role": "Technical Consultant",
-      "duration": "Sep-2015 - Present",
-      "responsibilities": [
-        "Project Name: GE Appliances, Location: Offshore, Duration: Nov'23 – Till Now",
-        "Developed the custom packages to create credit card and assigning customer",
-        "Modified the standard package based on the client requirement",
-        "Using form personalization showing the credit card details at Sales order form",
-        "Developed custom reports as per customer requirements",
-        "Project Name: Fine Hygienic Holding (FHH), Location: Offshore, Duration: Sep'22 – Nov'23",
-        "Migrating data from EBS to fusion using payloads, Rest API's and Spread sheets",
-        "Modified standard report data models and layouts in fusion based on client requirements",
-        "Developed custom BI reports in fusion",
-        "Worked in BI bursting for sending email's and sent output to printer in fusion"
-      ]
-    }}
-  ]
-}}
-
-EXAMPLE for someone with single job (no projects):
-{{
-  "experiences": [
-    {{
-      "company": "ITForce Technology, Location: Dubai",
-      "role": "Senior Technical Engineer",
-      "duration": "Feb 2023 - Present",
-      "responsibilities": [
-        "Administered and optimized Office 365 applications",
-        "Enhanced security protocols by managing Barracuda Email Security Gateway",
-        "Led data migration projects with a focus on accuracy and efficiency"
-      ]
-    }}
-  ]
-}}
-
-EXAMPLE of location extraction from actual CV text:
-If CV shows: "Vogue International FZE, Sharjah"
-Extract as: "company": "Vogue International FZE, Location: Sharjah"
-
-If CV shows: "HP (Hewlett Packard) payroll of Metalogic PVT, Delhi, India"  
-Extract as: "company": "HP (Hewlett Packard) payroll of Metalogic PVT, Location: Delhi, India"
-
-CV TEXT:
-{cv_text}
-
-IMPORTANT REMINDERS:
-- Consolidate multiple projects at the same company into ONE experience entry
-- ALWAYS extract location from the CV and include it in company field as: "Company Name, Location: Location"
-- Location appears in various formats - after company name, on separate line, or with country
-- Look for cities like Dubai, Sharjah, Delhi, and countries like UAE, India
-- If location is split (e.g., "Dubai" on one line, "UAE" on another), combine them as "Dubai, UAE"
-- Extract ALL locations mentioned - if multiple cities/countries, include all
-- If multiple projects exist at same company:
-  * List each project as a subheading in responsibilities: "Project Name: [Name], Location: [Location], Duration: [Start - End]"
-  * Extract project-specific durations from the CV when available
-  * Calculate total duration from first project start to last project end
-  * Do NOT create separate experience entries for different projects at the same company
-- Extract ALL responsibilities under their respective companies or project subheadings
-- Do NOT add bullets or special characters to responsibilities - plain text only
-- Ensure responsibilities are correctly attributed to their respective roles/projects
-- If no project names are mentioned, just list responsibilities directly without project headers
-- Look for sections labeled "Environment:", "Technologies:", "Tools:", "Versions:", "Tech Stack:" etc.
-- These should be captured as the last item in the responsibilities list for that experience
-- Preserve the exact format and all items listed
-- Common patterns to look for:
-  * "Environment: Oracle 19c/12c, SQL * Plus..."
-  * "Versions: • Oracle Apps R12.1.1 • Oracle Database 10g..."
-  * "Technologies used: Java, Spring Boot, MySQL..."
-- For overall company duration: if CV says "Sep-2015 to till date" extract as "Sep-2015 - Present"
-- Preserve date formats as they appear but ensure "Present" is used for ongoing positions
-
-RETURN ONLY THE JSON:"""
-
-        try:
-            r = self.model.generate_content(prompt, generation_config=self.cfg)
-            raw = re.sub(r'```(?:json)?', '', r.text).strip('`')
-            
-            # Extract JSON
-            match = re.search(r'\{.*\}', raw, re.DOTALL)
-            if match:
-                data = json.loads(match.group(0))
-                return self._validate_data(data)
-            else:
-                raise ValueError("No JSON found")
-                
-        except Exception as e:
-            st.warning(f"⚠️ Extraction error: {str(e)}")
-            return self._get_empty_data()        
-
-    def _validate_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Ensure data structure is complete and properly formatted."""
-        # Format candidate name and position
-        if "candidate_name" in data:
-            data["candidate_name"] = format_name(data["candidate_name"])
-        
-        if "position" in data:
-            data["position"] = format_name(data["position"])
-        
-        # Default language skills if not found
-        if "language_skills" not in data or not data["language_skills"]:
-            data["language_skills"] = ["English - Fluent"]
-        
-        # Ensure experiences exist and have proper structure
-        if "experiences" not in data:
-            data["experiences"] = []
-        
-        # Format existing experiences
-        for i, exp in enumerate(data["experiences"]):
-            if "role" in exp:
-                exp["role"] = format_name(exp["role"])
-            if "duration" in exp:
-                # Special handling for first experience
-                exp["duration"] = format_duration(exp["duration"], is_first_experience=(i == 0))
-        
-        # IMPORTANT: Don't pad experiences anymore - keep only actual experiences
-        # This allows the fill_template function to handle row deletion
-        
-        # Ensure each experience has all fields
-        for exp in data["experiences"]:
-            if "company" not in exp or not exp["company"]:
-                exp["company"] = ""
-            if "role" not in exp or not exp["role"]:
-                exp["role"] = ""
-            if "duration" not in exp or not exp["duration"]:
-                exp["duration"] = ""
-            if "responsibilities" not in exp or not isinstance(exp["responsibilities"], list):
-                exp["responsibilities"] = []
-        
-        return data
-
-    def _get_empty_data(self) -> Dict[str, Any]:
-        return {
-            "candidate_name": "",
-            "position": "",
-            "education": "",
-            "total_experience_years": "",
-            "phone": "",
-            "email": "",
-            "intro_paragraph": "",
-            "experiences": [],  # Empty list, no padding
-            "technical_skills": [],
-            "certifications": [],
-            "language_skills": ["English - Fluent"]
-        }
-
-# ────────────────────────────────────────────────────────────────
-#  Helper: Check if a table row contains experience placeholders
-# ────────────────────────────────────────────────────────────────
-def contains_experience_placeholder(text: str, exp_num: int) -> bool:
-    """Check if text contains placeholders for a specific experience number."""
-    patterns = [
-        f"{{{{EXP{exp_num}_COMPANY}}}}",
-        f"{{{{EXP{exp_num}_ROLE}}}}",
-        f"{{{{EXP{exp_num}_DURATION}}}}",
-        f"{{{{EXP{exp_num}_RESP"
-    ]
-    return any(pattern in text for pattern in patterns)
-
-def get_row_text(row) -> str:
-    """Get all text from a table row."""
-    text = ""
-    for cell in row.cells:
-        for paragraph in cell.paragraphs:
-            text += paragraph.text + " "
-    return text
-
-def should_delete_row(row, exp_num: int, has_data: bool) -> bool:
-    """Determine if a row should be deleted based on experience data availability."""
-    row_text = get_row_text(row)
-    
-    # Check if this row contains placeholders for this experience number
-    if contains_experience_placeholder(row_text, exp_num):
-        # If no data for this experience, mark for deletion
-        return not has_data
-    
-    return False
+def release_job():
+    """Stop this session's job and delete its converted CVs and archive."""
+    job_id = st.session_state.get("job_id")
+    if job_id:
+        get_job_queue().forget(job_id)
+        # Artifacts are stored under their job's id
+        get_artifact_store().drop_owner(job_id)
 
 # ────────────────────────────────────────────────────────────────
-#  Enhanced template filling with row deletion
+#  Background conversion jobs
 # ────────────────────────────────────────────────────────────────
-def set_paragraph_format(paragraph, text, font_name="Arial", font_size=11, bold=False):
-    """Set consistent formatting for a paragraph."""
-    paragraph.text = text
-    for run in paragraph.runs:
-        run.font.name = font_name
-        run.font.size = Pt(font_size)
-        run.font.bold = bold
-        run.font.color.rgb = RGBColor(0, 0, 0)  # Black
-
-def fill_template(doc: Document, d: Dict[str, Any]) -> Document:
-    """Fill template with proper formatting and delete unused experience rows."""
-    
-    # Basic replacements
-    basic_repl = {
-        "{{CANDIDATE_NAME}}": str(d.get("candidate_name", "") or ""),
-        "{{POSITION}}": str(d.get("position", "") or ""),
-        "{{EDUCATION}}": str(d.get("education", "") or ""),
-        "{{TOTAL_EXPERIENCE_YEARS}}": str(d.get("total_experience_years", "") or ""),
-        "{{PHONE}}": str(d.get("phone", "") or ""),
-        "{{EMAIL}}": str(d.get("email", "") or ""),
-        "{{INTRO_PARAGRAPH}}": str(d.get("intro_paragraph", "") or ""),
-    }
-    
-    # Track which experiences have data
-    experiences_with_data = set()
-    
-    # Process experiences (up to 20)
-    exp_repl = {}
-    for i in range(1, 21):  # 1 to 20
-        if i <= len(d.get("experiences", [])):
-            exp = d["experiences"][i-1]
-            # Check if this experience has meaningful data
-            if exp.get("company") and exp.get("role"):
-                experiences_with_data.add(i)
-                
-                # Mark company placeholders for bold formatting
-                company_text = str(exp.get("company", "") or "")
-                exp_repl[f"{{{{EXP{i}_COMPANY}}}}"] = f"<<<BOLD>>>{company_text}<<<END_BOLD>>>"
-                exp_repl[f"{{{{EXP{i}_ROLE}}}}"] = str(exp.get("role", "") or "")
-                exp_repl[f"{{{{EXP{i}_DURATION}}}}"] = str(exp.get("duration", "") or "")
-                
-                # Handle responsibilities
-                responsibilities = exp.get("responsibilities", [])
-                
-                # Handle all 100 responsibility placeholders
-                for j in range(1, 101):  # 1 to 100
-                    placeholder = f"{{{{EXP{i}_RESP{j}}}}}"
-                    if j <= len(responsibilities):
-                        resp_text = responsibilities[j-1]
-                        if resp_text is None:
-                            resp_text = ""
-                        exp_repl[placeholder] = str(resp_text)
-                    else:
-                        # Mark empty responsibilities for removal
-                        exp_repl[placeholder] = "<<<REMOVE_THIS_LINE>>>"
-            else:
-                # Mark all placeholders for this experience for deletion
-                exp_repl[f"{{{{EXP{i}_COMPANY}}}}"] = "<<<DELETE_EXPERIENCE>>>"
-                exp_repl[f"{{{{EXP{i}_ROLE}}}}"] = "<<<DELETE_EXPERIENCE>>>"
-                exp_repl[f"{{{{EXP{i}_DURATION}}}}"] = "<<<DELETE_EXPERIENCE>>>"
-                for j in range(1, 101):
-                    exp_repl[f"{{{{EXP{i}_RESP{j}}}}}"] = "<<<DELETE_EXPERIENCE>>>"
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_job_progress():
+    """Live progress of the session's job; reruns the page once it is done."""
+    job = get_job_queue().get(st.session_state.get("job_id"))
+    if job is None or job.finished:
+        st.rerun()
+    
+    done, total = job.progress()
+    st.progress(done / total, text=f"Processing {total} CV(s): {done} finished")
+    
+    # Header fields parsed so far, shown while the rest streams in
+    headers = job.streamed_headers()
+    if headers:
+        st.markdown("\n".join(
+            f"- **{name}**: " + " · ".join(str(h[k]) for k in HEADER_FIELDS if k in h)
+            for name, h in headers.items()))
+    for level, msg in job.messages():
+        getattr(st, level)(msg)
+
+# Fields of the extracted record the editor offers, with their labels
+EDIT_FIELDS = (("candidate_name", "Name"), ("position", "Position"), ("total_experience_years", "Years of experience"),
+               ("education", "Education"), ("email", "Email"), ("phone", "Phone"))
+EDIT_LIST_FIELDS = (("technical_skills", "Technical skills"), ("certifications", "Certifications"),
+                    ("language_skills", "Languages"))
+
+def _list_text(items: list) -> str:
+    return "\n".join(item for item in items if item)
+
+def _list_from_text(text: str, items: list) -> list:
+    """A list field edited as one item per line, read back.
+    
+    Text left as shown gives back `items` exactly. Otherwise an original
+    item spanning several lines is kept whole wherever it still appears,
+    lines matching an original item are kept as they are, and any other
+    line becomes a stripped item (blank lines are dropped).
+    """
+    if text == _list_text(items):
+        return list(items)
+    multiline = [item for item in items if item and "\n" in item]
+    lines, result, i = text.split("\n"), [], 0
+    while i < len(lines):
+        for item in multiline:
+            n = item.count("\n") + 1
+            if "\n".join(lines[i:i + n]) == item:
+                result.append(item)
+                i += n
+                break
         else:
-            # No data for this experience - mark for deletion
-            exp_repl[f"{{{{EXP{i}_COMPANY}}}}"] = "<<<DELETE_EXPERIENCE>>>"
-            exp_repl[f"{{{{EXP{i}_ROLE}}}}"] = "<<<DELETE_EXPERIENCE>>>"
-            exp_repl[f"{{{{EXP{i}_DURATION}}}}"] = "<<<DELETE_EXPERIENCE>>>"
-            for j in range(1, 101):
-                exp_repl[f"{{{{EXP{i}_RESP{j}}}}}"] = "<<<DELETE_EXPERIENCE>>>"
-    
-    # Format skills and certifications as bullet points
-    tech_skills = d.get("technical_skills", [])
-    if tech_skills:
-        tech_skills_text = "\n".join([f"• {skill}" for skill in tech_skills])
-    else:
-        tech_skills_text = ""
-    
-    certs = d.get("certifications", [])
-    if certs:
-        certs_text = "\n".join([f"• {cert}" for cert in certs])
-    else:
-        certs_text = "N/A"  # No bullet for N/A
-    
-    langs = d.get("language_skills", [])
-    if langs:
-        langs_text = ", ".join(langs)
-    else:
-        langs_text = "English - Fluent"
-    
-    # Add formatted lists to replacements
-    basic_repl["{{TECHNICAL_SKILLS_LIST}}"] = tech_skills_text
-    basic_repl["{{CERTIFICATIONS_LIST}}"] = certs_text
-    basic_repl["{{LANGUAGE_SKILLS_LIST}}"] = langs_text
-    
-    # Combine all replacements
-    all_repl = {**basic_repl, **exp_repl}
+            line = lines[i]
+            i += 1
+            if line in items and line:
+                result.append(line)
+            elif line.strip():
+                result.append(line.strip())
+    return result
+
+def show_cv_editor(job, conv):
+    """Form to correct one CV's extracted data; saving re-renders only that CV, without Gemini."""
+    store = get_artifact_store()
+    data = store.load_data(conv['id'])
+    if data is None:
+        st.warning("⏳ This CV has been cleared from the server. Convert it again to edit it.")
+        return
     
-    # Process paragraphs
-    paragraphs_to_remove = []
-    for paragraph in doc.paragraphs:
-        original_text = paragraph.text
-        new_text = original_text
-        
-        # Apply replacements
-        for placeholder, value in all_repl.items():
-            if placeholder in new_text:
-                if value is None:
-                    value = ""
-                new_text = new_text.replace(placeholder, str(value))
+    # Keyed by the CV, plus its record's version so the form starts over
+    # from each re-rendered one
+    key = f"{conv['id']}_{conv['digest'][:8]}"
+    with st.form(f"editor_{key}"):
+        edited = dict(data)
+        columns = st.columns(2)
+        for i, (field, label) in enumerate(EDIT_FIELDS):
+            column = columns[i * 2 // len(EDIT_FIELDS)]
+            edited[field] = column.text_input(label, str(data.get(field) or ""), key=f"{key}_{field}")
+        edited["intro_paragraph"] = st.text_area("Introduction", data.get("intro_paragraph") or "",
+                                                 key=f"{key}_intro_paragraph")
         
-        # Check if this paragraph is part of a deleted experience section
-        if "<<<DELETE_EXPERIENCE>>>" in new_text:
-            paragraphs_to_remove.append(paragraph)
-            continue
+        edited["experiences"] = []
+        for n, exp in enumerate(data.get("experiences", [])):
+            st.markdown(f"**Experience {n + 1}**")
+            col1, col2, col3 = st.columns([2, 2, 1])
+            edited["experiences"].append({
+                "company": col1.text_input("Company", exp.get("company") or "", key=f"{key}_exp{n}_company"),
+                "role": col2.text_input("Role", exp.get("role") or "", key=f"{key}_exp{n}_role"),
+                "duration": col3.text_input("Duration", exp.get("duration") or "", key=f"{key}_exp{n}_duration"),
+                "responsibilities": _list_from_text(st.text_area(
+                    "Responsibilities (one per line)", _list_text(exp.get("responsibilities") or []),
+                    key=f"{key}_exp{n}_responsibilities"), exp.get("responsibilities") or []),
+            })
         
-        # Check if this line should be removed (empty responsibility)
-        if "<<<REMOVE_THIS_LINE>>>" in new_text:
-            # For regular paragraphs, only remove if it's just the marker
-            if new_text.strip() in ["<<<REMOVE_THIS_LINE>>>", "- <<<REMOVE_THIS_LINE>>>"]:
-                paragraphs_to_remove.append(paragraph)
-                continue
-            else:
-                # Replace the marker with empty string in the text
-                new_text = new_text.replace("<<<REMOVE_THIS_LINE>>>", "")
-        
-        # If text changed, update with formatting
-        if new_text != original_text:
-            paragraph.clear()
-            # Remove the bullet point if the line only contains "-"
-            if new_text.strip() != "-":
-                # Check for bold markers
-                if "<<<BOLD>>>" in new_text and "<<<END_BOLD>>>" in new_text:
-                    # Extract and apply bold formatting
-                    parts = new_text.split("<<<BOLD>>>")
-                    for i, part in enumerate(parts):
-                        if i == 0 and part:
-                            # Text before first bold marker
-                            run = paragraph.add_run(part)
-                            run.font.name = 'Arial'
-                            run.font.size = Pt(11)
-                            run.font.color.rgb = RGBColor(0, 0, 0)
-                        elif "<<<END_BOLD>>>" in part:
-                            # This part contains bold text
-                            bold_parts = part.split("<<<END_BOLD>>>")
-                            # Add bold text
-                            run = paragraph.add_run(bold_parts[0])
-                            run.font.name = 'Arial'
-                            run.font.size = Pt(11)
-                            run.font.bold = True
-                            run.font.color.rgb = RGBColor(0, 0, 0)
-                            # Add remaining text if any
-                            if len(bold_parts) > 1 and bold_parts[1]:
-                                run = paragraph.add_run(bold_parts[1])
-                                run.font.name = 'Arial'
-                                run.font.size = Pt(11)
-                                run.font.color.rgb = RGBColor(0, 0, 0)
-                else:
-                    # No bold markers, normal text
-                    paragraph.add_run(new_text)
-                    # Apply Arial 11pt black formatting
-                    for run in paragraph.runs:
-                        run.font.name = 'Arial'
-                        run.font.size = Pt(11)
-                        run.font.bold = False
-                        run.font.color.rgb = RGBColor(0, 0, 0)
-                # Set 1.5 line spacing
-                paragraph.paragraph_format.line_spacing = 1.5
+        for field, label in EDIT_LIST_FIELDS:
+            edited[field] = _list_from_text(st.text_area(f"{label} (one per line)", _list_text(data.get(field) or []),
+                                                         key=f"{key}_{field}"), data.get(field) or [])
+        submitted = st.form_submit_button("🔁 Re-render CV")
+    
+    if submitted:
+        seconds = rerender_job_cv(job, conv, edited, store, current=data)
+        if seconds is None:
+            st.info("No changes: the document is already up to date.")
+        else:
+            log_access(st.session_state.user_email, "edit_cv", conv['name'])
+            st.rerun()
+
+def show_job_results(job):
+    """Messages, statistics and downloads of a finished job."""
+    for level, msg in job.messages():
+        getattr(st, level)(msg)
     
-    # Remove empty paragraphs
-    for p in paragraphs_to_remove:
-        p._element.getparent().remove(p._element)
+    converted = job.results()
+    if st.session_state.get("reported_job") != job.id:
+        st.session_state.reported_job = job.id
+        for name, error in job.failures():
+            log_access(st.session_state.user_email, "conversion_error", f"{name}: {error}")
+        if converted:
+            # Log successful conversion
+            log_access(st.session_state.user_email, "conversion_success", f"{len(converted)} CVs converted")
+    if not converted:
+        return
     
-    # Process tables and handle row deletion
-    for table in doc.tables:
-        rows_to_delete = []
-        
-        # First pass: identify rows to delete
-        for row_idx, row in enumerate(table.rows):
-            row_text = get_row_text(row)
+    st.success(f"✅ Successfully converted {len(converted)} CV(s)")
+    stats = get_extraction_cache().stats()
+    st.caption(f"Extraction cache: {stats['hits']} hit(s), {stats['misses']} miss(es), "
+               f"{stats['entries']} stored result(s)")
+    tokens_before = sum(conv["text_stats"]["tokens_before"] for conv in converted)
+    tokens_after = sum(conv["text_stats"]["tokens_after"] for conv in converted)
+    st.caption(f"CV text sent to Gemini: ~{tokens_after:,} tokens after clean-up "
+               f"(~{tokens_before:,} before, {1 - tokens_after / max(1, tokens_before):.0%} saved)")
+    tiers = cv_pdf.TIER_STATS.snapshot()
+    if tiers["fast_pages"] or tiers["layout_pages"]:
+        st.caption(f"PDF pages: {tiers['fast_pages']} fast text pass, "
+                   f"{tiers['layout_pages']} layout fallback "
+                   f"(~{tiers['estimated_seconds_saved']:.1f}s of layout analysis avoided)")
+
+    st.markdown("### Download Converted CVs")
+    
+    # Option to download all as zip
+    if len(converted) > 1 and job.archive is not None:
+        if st.button("📦 Download All as ZIP", type="secondary"):
+            # The archive was written to disk during conversion, so the batch
+            # is never zipped in memory. Serving it is not bounded, though:
+            # download_button reads the whole file into Streamlit's in-memory
+            # media store each time it is rendered (Streamlit cannot stream
+            # a file from disk).
+            with job.archive.open() as zip_file:
+                st.download_button(
+                    "⬇️ Download ZIP Archive",
+                    zip_file,
+                    file_name="converted_cvs.zip",
+                    mime="application/zip"
+                )
             
-            # Check each experience number
-            for exp_num in range(1, 21):
-                if contains_experience_placeholder(row_text, exp_num):
-                    if exp_num not in experiences_with_data:
-                        # This row contains placeholders for an experience we don't have data for
-                        rows_to_delete.append(row_idx)
-                        break
-        
-        # Second pass: process cells in rows we're keeping
-        for row_idx, row in enumerate(table.rows):
-            if row_idx in rows_to_delete:
-                continue  # Skip rows marked for deletion
-                
-            for cell in row.cells:
-                paragraphs_to_remove = []
-                for paragraph in cell.paragraphs:
-                    original_text = paragraph.text
-                    new_text = original_text
-                    
-                    # Apply replacements
-                    for placeholder, value in all_repl.items():
-                        if placeholder in new_text:
-                            new_text = new_text.replace(placeholder, value)
-                    
-                    # Skip if it's marked for deletion
-                    if "<<<DELETE_EXPERIENCE>>>" in new_text:
-                        continue
-                    
-                    # Check if this line should be removed
-                    if "<<<REMOVE_THIS_LINE>>>" in new_text:
-                        # Check if it's a complete line with just the marker and possibly a bullet
-                        if new_text.strip() in ["<<<REMOVE_THIS_LINE>>>", "- <<<REMOVE_THIS_LINE>>>"]:
-                            paragraphs_to_remove.append(paragraph)
-                            continue
-                        else:
-                            # Replace the marker with empty string
-                            new_text = new_text.replace("<<<REMOVE_THIS_LINE>>>", "")
-                    
-                    # If text changed, update with formatting
-                    if new_text != original_text:
-                        paragraph.clear()
-                        
-                        # Skip if it's just a bullet point with no content
-                        if new_text.strip() == "-":
-                            paragraphs_to_remove.append(paragraph)
-                            continue
-                        
-                        # Check for bold markers in table cells
-                        if "<<<BOLD>>>" in new_text and "<<<END_BOLD>>>" in new_text:
-                            # Extract and apply bold formatting
-                            parts = new_text.split("<<<BOLD>>>")
-                            for i, part in enumerate(parts):
-                                if i == 0 and part:
-                                    # Text before first bold marker
-                                    run = paragraph.add_run(part)
-                                    run.font.name = 'Arial'
-                                    run.font.size = Pt(11)
-                                    run.font.color.rgb = RGBColor(0, 0, 0)
-                                elif "<<<END_BOLD>>>" in part:
-                                    # This part contains bold text
-                                    bold_parts = part.split("<<<END_BOLD>>>")
-                                    # Add bold text
-                                    run = paragraph.add_run(bold_parts[0])
-                                    run.font.name = 'Arial'
-                                    run.font.size = Pt(11)
-                                    run.font.bold = True
-                                    run.font.color.rgb = RGBColor(0, 0, 0)
-                                    # Add remaining text if any
-                                    if len(bold_parts) > 1 and bold_parts[1]:
-                                        run = paragraph.add_run(bold_parts[1])
-                                        run.font.name = 'Arial'
-                                        run.font.size = Pt(11)
-                                        run.font.color.rgb = RGBColor(0, 0, 0)
-                        # Handle multi-line content (like skills/certs)
-                        elif '\n' in new_text:
-                            lines = new_text.split('\n')
-                            for idx, line in enumerate(lines):
-                                if idx > 0:
-                                    paragraph = cell.add_paragraph()
-                                
-                                # Check if this is a project header line with Duration
-                                if (line.strip().startswith("Project Name:") and 
-                                    ("Location:" in line.strip() and "Duration:" in line.strip())):
-                                    # Make the entire project header bold (including Duration)
-                                    run = paragraph.add_run(line)
-                                    run.font.name = 'Arial'
-                                    run.font.size = Pt(11)
-                                    run.font.bold = True  # Make entire line bold
-                                    run.font.color.rgb = RGBColor(0, 0, 0)
-                                elif line.strip().startswith("Project Name:") and "Location:" in line.strip():
-                                    # Old format without Duration - still make bold
-                                    run = paragraph.add_run(line)
-                                    run.font.name = 'Arial'
-                                    run.font.size = Pt(11)
-                                    run.font.bold = True
-                                    run.font.color.rgb = RGBColor(0, 0, 0)
-                                else:
-                                    run = paragraph.add_run(line)
-                                    run.font.name = 'Arial'
-                                    run.font.size = Pt(11)
-                                    run.font.bold = False
-                                    run.font.color.rgb = RGBColor(0, 0, 0)
-                                # Set 1.5 line spacing
-                                paragraph.paragraph_format.line_spacing = 1.5
-                        else:
-                            # Single line handling
-                            if (new_text.strip().startswith("Project Name:") and 
-                                ("Location:" in new_text.strip() and "Duration:" in new_text.strip())):
-                                # Project header with Duration - make entire line bold
-                                if new_text.strip().startswith("• "):
-                                    new_text = new_text.replace("• ", "", 1)
-                                run = paragraph.add_run(new_text)
-                                run.font.name = 'Arial'
-                                run.font.size = Pt(11)
-                                run.font.bold = True  # Make entire line bold
-                                run.font.color.rgb = RGBColor(0, 0, 0)
-                            elif new_text.strip().startswith("Project Name:") and "Location:" in new_text.strip():
-                                # Old format without Duration - still make bold
-                                if new_text.strip().startswith("• "):
-                                    new_text = new_text.replace("• ", "", 1)
-                                run = paragraph.add_run(new_text)
-                                run.font.name = 'Arial'
-                                run.font.size = Pt(11)
-                                run.font.bold = True
-                                run.font.color.rgb = RGBColor(0, 0, 0)
-                            else:
-                                run = paragraph.add_run(new_text)
-                                run.font.name = 'Arial'
-                                run.font.size = Pt(11)
-                                run.font.bold = False
-                                run.font.color.rgb = RGBColor(0, 0, 0)
-                            # Set 1.5 line spacing
-                            paragraph.paragraph_format.line_spacing = 1.5                
-                # Remove empty paragraphs from cells
-                for p in paragraphs_to_remove:
-                    try:
-                        p._element.getparent().remove(p._element)
-                    except:
-                        pass  # Some paragraphs might be required by the table structure
-        
-        # Third pass: Actually delete the rows (in reverse order to maintain indices)
-        for row_idx in sorted(rows_to_delete, reverse=True):
-            try:
-                row = table.rows[row_idx]
-                tbl = table._tbl
-                tbl.remove(row._tr)
-            except Exception as e:
-                st.warning(f"Could not delete row {row_idx}: {str(e)}")
-    
-    return doc
-
-def safe_filename(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', "_", name).strip() or "output"
+            # Log download
+            log_access(st.session_state.user_email, "download_zip", f"{len(converted)} CVs")
+    
+    # Individual CV downloads
+    for idx, conv in enumerate(converted):
+        with st.expander(f"📄 {conv['name']}", expanded=True):
+            # Show extracted data summary
+            data = conv['summary']
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.markdown("**Extracted Information:**")
+                st.write(f"- Position: {data.get('position', 'N/A')}")
+                st.write(f"- Experience: {data.get('total_experience_years', 'N/A')} years")
+                st.write(f"- Email: {data.get('email', 'N/A')}")
+                st.write(f"- Phone: {data.get('phone', 'N/A')}")
+            
+            with col2:
+                st.markdown("**Experience Summary:**")
+                st.write(f"Total experiences: {data['experience_count']}")
+                for exp_idx, exp in enumerate(data['experiences']):
+                    st.write(f"{exp_idx+1}. {exp['company']} - {exp['role']}")
+            
+            metrics = conv['metrics']
+            seconds = metrics['seconds']
+            st.caption(f"⏱️ {seconds['total']:.1f}s: Gemini {seconds.get('gemini', 0):.1f}s, "
+                       f"text {seconds.get('extract_text', 0):.1f}s, template {seconds.get('render', 0):.1f}s, "
+                       f"save {seconds.get('save', 0):.1f}s · {metrics.get('input_tokens', 0):,} → "
+                       f"{metrics.get('output_tokens', 0):,} tokens · cache {metrics.get('cache', 'n/a')}")
+            if conv.get('edited'):
+                st.caption(f"✏️ Edited; re-rendered in {conv['rerender_seconds']:.2f}s without calling Gemini")
+            
+            # Download button with unique key
+            fname = safe_filename(f"{conv['name']}_Formatted.docx")
+            document = get_artifact_store().read_document(conv['id'])
+            if document is None:
+                st.warning("⏳ This CV has been cleared from the server. Convert it again to download it.")
+            elif st.download_button(
+                f"⬇️ Download {fname}",
+                document,
+                file_name=fname,
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                key=f"download_{idx}"  # Unique key for each button
+            ):
+                # Log individual download
+                log_access(st.session_state.user_email, "download_cv", fname)
+            
+            if document is not None and st.toggle("✏️ Edit extracted data", key=f"edit_{idx}"):
+                show_cv_editor(job, conv)
 
 # ────────────────────────────────────────────────────────────────
 #  Main Application Function
 # ────────────────────────────────────────────────────────────────
 def main():
+    get_metrics_exporter()
+    
     # Check authentication first
     if not check_company_email():
         return
@@ -848,17 +423,12 @@ def main():
             log_access(st.session_state.user_email, "logout")
             
             # Clear session
-            for key in ["authenticated", "user_email", "login_time", "converted_cvs", "conversion_done"]:
+            release_job()
+            for key in ["authenticated", "user_email", "login_time", "job_id", "reported_job"]:
                 if key in st.session_state:
                     del st.session_state[key]
             st.rerun()
 
-    # Initialize session state for conversion results
-    if 'converted_cvs' not in st.session_state:
-        st.session_state.converted_cvs = []
-    if 'conversion_done' not in st.session_state:
-        st.session_state.conversion_done = False
-
     # Get API key from secrets
     try:
         api_key = st.secrets["GEMINI_API_KEY"]
@@ -884,122 +454,58 @@ def main():
         if cvs:
             st.info(f"📁 {len(cvs)} CV(s) uploaded")
 
+    bypass_cache = st.checkbox("♻️ Bypass extraction cache",
+                               help="Re-analyze every CV with Gemini even if it was converted before")
+    pack_short = st.checkbox("📦 Pack short CVs into shared requests", value=PACK_SHORT_CVS,
+                             help="Send several one-page CVs in a single Gemini call to save on the instruction prompt")
+
+    jobs = get_job_queue()
+
     # Process button
     if st.button("🔄 Convert CVs", type="primary", disabled=not(api_key and tpl_file and cvs)):
-        # Log conversion attempt
-        log_access(st.session_state.user_email, "conversion_started", f"{len(cvs)} CVs")
-        
-        extractor = CVExtractor(api_key)
+        # Snapshot the uploads: the job outlives this script run
+        sources = [SourceFile(cv.name, cv.getvalue(), cv.type) for cv in cvs]
         tpl_bytes = tpl_file.getvalue()
-
-        converted = []
-        prog = st.progress(0.0)
-        status = st.empty()
-
-        for i, cv in enumerate(cvs):
-            status.text(f"Processing {cv.name}...")
-            
-            try:
-                # Extract text
-                text = extract_text(cv)
-                if not text:
-                    st.warning(f"⚠️ Could not extract text from {cv.name}")
-                    continue
-                
-                # Extract structured data
-                with st.spinner(f"Analyzing {cv.name}..."):
-                    data = extractor.extract(text)
-                
-                # Fill template
-                filled = fill_template(Document(BytesIO(tpl_bytes)), data)
-                
-                # Save to buffer
-                buf = BytesIO()
-                filled.save(buf)
-                buf.seek(0)
-
-                converted.append({
-                    "name": data.get("candidate_name", cv.name),
-                    "buffer": buf,
-                    "data": data
-                })
-                
-                prog.progress((i + 1) / len(cvs))
-                
-            except Exception as e:
-                st.error(f"❌ Error processing {cv.name}: {str(e)}")
-                log_access(st.session_state.user_email, "conversion_error", f"{cv.name}: {str(e)}")
-
-        status.empty()
-        prog.empty()
-        
-        if converted:
-            st.session_state.converted_cvs = converted
-            st.session_state.conversion_done = True
-            st.success(f"✅ Successfully converted {len(converted)} CV(s)")
-            
-            # Log successful conversion
-            log_access(st.session_state.user_email, "conversion_success", f"{len(converted)} CVs converted")
-
-    # Display results if conversion is done
-    if st.session_state.conversion_done and st.session_state.converted_cvs:
-        st.markdown("### Download Converted CVs")
-        
-        # Option to download all as zip
-        if len(st.session_state.converted_cvs) > 1:
-            if st.button("📦 Download All as ZIP", type="secondary"):
-                import zipfile
-                zip_buffer = BytesIO()
-                
-                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    for conv in st.session_state.converted_cvs:
-                        fname = safe_filename(f"{conv['name']}_Formatted.docx")
-                        zip_file.writestr(fname, conv['buffer'].getvalue())
-                
-                zip_buffer.seek(0)
-                st.download_button(
-                    "⬇️ Download ZIP Archive",
-                    zip_buffer.getvalue(),
-                    file_name="converted_cvs.zip",
-                    mime="application/zip"
-                )
-                
-                # Log download
-                log_access(st.session_state.user_email, "download_zip", f"{len(st.session_state.converted_cvs)} CVs")
+        options = {"bypass_cache": bypass_cache, "pack_short": pack_short}
+        if bypass_cache:
+            # A forced re-extraction always starts a new job, never the finished one
+            options["run"] = uuid.uuid4().hex
+        job_id = make_job_id(st.session_state.user_email, tpl_bytes, sources, options)
+        if st.session_state.get("job_id") not in (None, job_id):
+            # A different batch replaces this session's previous one
+            release_job()
         
-        # Individual CV downloads
-        for idx, conv in enumerate(st.session_state.converted_cvs):
-            with st.expander(f"📄 {conv['name']}", expanded=True):
-                # Show extracted data summary
-                data = conv['data']
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown("**Extracted Information:**")
-                    st.write(f"- Position: {data.get('position', 'N/A')}")
-                    st.write(f"- Experience: {data.get('total_experience_years', 'N/A')} years")
-                    st.write(f"- Email: {data.get('email', 'N/A')}")
-                    st.write(f"- Phone: {data.get('phone', 'N/A')}")
-                
-                with col2:
-                    st.markdown("**Experience Summary:**")
-                    actual_experiences = [exp for exp in data.get('experiences', []) 
-                                        if exp.get('company') and exp.get('company') != 'N/A']
-                    st.write(f"Total experiences: {len(actual_experiences)}")
-                    for exp_idx, exp in enumerate(actual_experiences[:3]):
-                        st.write(f"{exp_idx+1}. {exp['company']} - {exp.get('role', '')}")
-                
-                # Download button with unique key
-                fname = safe_filename(f"{conv['name']}_Formatted.docx")
-                if st.download_button(
-                    f"⬇️ Download {fname}",
-                    conv['buffer'].getvalue(),
-                    file_name=fname,
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    key=f"download_{idx}"  # Unique key for each button
-                ):
-                    # Log individual download
-                    log_access(st.session_state.user_email, "download_cv", fname)
+        job = jobs.get(job_id)
+        if job is None:
+            extractor = CVExtractor(api_key, cache=get_extraction_cache(), stream=STREAM_EXTRACTION,
+                                    api_endpoint=GEMINI_API_ENDPOINT, caller=get_gemini_caller(),
+                                    long_cv_tokens=LONG_CV_TOKENS, chunk_tokens=LONG_CV_CHUNK_TOKENS,
+                                    rule_confidence=RULE_SKIP_CONFIDENCE)
+            if pack_short:
+                extractor = PromptBatcher(extractor, PACK_TOKEN_BUDGET, PACK_MAX_CVS, PACK_MAX_CV_TOKENS)
+            plan = load_template_plan(tpl_bytes)
+            store = get_artifact_store()
+            job, created = jobs.submit(
+                job_id, st.session_state.user_email, sources,
+                lambda job, cv: convert_job_cv(job, cv, extractor, plan, not bypass_cache, store),
+                archive=BatchArchive(EXPORT_DIR), plan=plan,
+            )
+            if created:
+                # Log conversion attempt
+                log_access(st.session_state.user_email, "conversion_started", f"{len(cvs)} CVs")
+        st.session_state.job_id = job.id
+
+    # After a page refresh, pick up this user's job where it is
+    if "job_id" not in st.session_state:
+        job = jobs.latest(st.session_state.user_email)
+        if job is not None:
+            st.session_state.job_id = job.id
+
+    job = jobs.get(st.session_state.get("job_id"))
+    if job is not None and not job.finished:
+        show_job_progress()
+    elif job is not None:
+        show_job_results(job)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
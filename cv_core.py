@@ -0,0 +1,1773 @@
+# cv_core.py - CV conversion pipeline, independent of any UI
+# -----------------------------------------------------------------
+# Text extraction, Gemini extraction (with its cache and prompt packing),
+# template compilation and rendering. Used by the Streamlit app
+# (cv_converter.py) and the batch command line (cv_cli.py), so nothing here
+# may import streamlit: problems go to a `report` callback, which defaults
+# to this module's logger.
+#
+# python-docx and the Gemini client are imported by the functions that first
+# need them, so importing this module (and showing the app's login page)
+# stays cheap; PDF parsers are loaded the same way in cv_pdf.
+from __future__ import annotations
+import os, re, json, time, copy, hashlib, logging, threading, sqlite3
+import shutil, tempfile, weakref, zipfile
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+import cv_metrics, cv_pdf
+from cv_preprocess import preprocess_cv_text, estimate_tokens, split_cv_sections
+from cv_resilience import STATS_LOCK, AttemptCancelled, ResilientCaller
+from cv_dates import month_number, normalize_many, split_duration
+from cv_rules import confident, pre_extract
+
+if TYPE_CHECKING:
+    from docx.document import Document
+
+logger = logging.getLogger(__name__)
+
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+MIME_TYPES = {".pdf": PDF_MIME, ".docx": DOCX_MIME, ".txt": "text/plain"}
+
+def read_setting(name: str, default, secrets=None):
+    """Read a deployment setting from `secrets` (if given), then the environment.
+
+    The value is cast to the type of `default`; booleans also accept
+    "1"/"true"/"yes"/"on" strings.
+    """
+    try:
+        value = secrets[name]
+    except Exception:
+        value = os.environ.get(name.upper(), default)
+    if isinstance(default, bool) and isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    try:
+        return type(default)(value)
+    except (TypeError, ValueError):
+        return default
+
+# ────────────────────────────────────────────────────────────────
+#  Text extraction and formatting helpers
+# ────────────────────────────────────────────────────────────────
+class SourceFile:
+    """A CV read from disk, shaped like Streamlit's UploadedFile."""
+
+    def __init__(self, name: str, data: bytes, type: str):
+        self.name = name
+        self.type = type
+        self._data = data
+
+    @classmethod
+    def from_path(cls, path: str) -> "SourceFile":
+        with open(path, "rb") as f:
+            data = f.read()
+        ext = os.path.splitext(path)[1].lower()
+        return cls(os.path.basename(path), data, MIME_TYPES.get(ext, "text/plain"))
+
+    def getvalue(self) -> bytes:
+        return self._data
+
+def extract_text(upload, report=logger.error) -> str:
+    try:
+        if upload.type == PDF_MIME:
+            pages = cv_pdf.extract_pdf_pages(upload.getvalue())
+            # Form feeds keep page boundaries for preprocess_cv_text
+            return "\f".join(page.text for page in pages if page.text)
+            
+        if upload.type == DOCX_MIME:
+            from docx import Document
+            doc = Document(BytesIO(upload.getvalue()))
+            return "\n".join(p.text for p in doc.paragraphs)
+            
+        return upload.getvalue().decode("utf-8", errors="ignore")
+    except Exception as e:
+        report(f"Error reading {upload.name}: {e}")
+        return ""
+
+def format_name(name: str) -> str:
+    """Convert name from ALL CAPS to Proper Case."""
+    if not name:
+        return ""
+    
+    # Handle common name patterns
+    words = name.split()
+    formatted_words = []
+    
+    for word in words:
+        if word.isupper() and len(word) > 1:
+            # Convert from ALL CAPS to Proper Case
+            formatted_words.append(word.capitalize())
+        else:
+            formatted_words.append(word)
+    
+    return " ".join(formatted_words)
+
+# ────────────────────────────────────────────────────────────────
+#  Extraction prompt
+# ────────────────────────────────────────────────────────────────
+EXTRACTION_MODEL = "gemini-flash-latest"
+
+EXTRACTION_PROMPT = """Extract comprehensive information from this CV and return as JSON.
+
+
+CRITICAL INSTRUCTIONS:
+1. Extract ALL experiences (up to 20, most recent first)
+2. IMPORTANT: If a person has multiple projects at the SAME COMPANY, combine them into ONE experience entry:
+   - Company name should be just the company name (e.g., "Seertree Global Services")
+   - Duration should span from the earliest project start to the latest project end
+   - In responsibilities section, list each project as a subheading followed by its responsibilities
+   - Format: "Project Name: [Name], Location: [Location], Duration: [Project Start - Project End]" as the first line, then responsibilities below
+   - Look for project-specific dates in the CV (these may be different from overall company duration)
+3. For each experience, you MUST include:
+   - Company name: Always include location if mentioned anywhere in the experience
+     * Format: "Company Name, Location: Location"
+     * Look for location in company line, job title line, or anywhere in the experience section
+     * Examples: "ITForce Technology, Location: Dubai", "Vogue International FZE, Location: Sharjah"
+     * Location can be city, country, or both (e.g., "Dubai", "Sharjah", "Dubai, UAE", "Delhi, India")
+   - Job title/role (in proper case, not ALL CAPS)
+   - Duration: Use the date format provided
+   - Responsibilities: 
+     * If multiple projects at same company, structure with project headers including individual project durations
+     * Otherwise, list responsibilities directly
+     * Extract EVERY responsibility mentioned
+     * If there's an "Environment:" or "Technologies:" or "Versions:" section, add it as the LAST bullet point
+     * Format environment info as: "Environment/Technologies: [list all tools, versions, technologies mentioned]"
+     * Do NOT add bullet points - they will be added by the template
+4. Extract ALL technical skills comprehensively
+5. Extract ALL certifications with their FULL names and IDs if mentioned
+6. If no professional summary exists, create one based on the CV content
+7. For candidate name, use proper case (e.g., "Raju Gujar" not "RAJU GUJAR")
+8. For position/role, use proper case (e.g., "Senior Technical Engineer" not "SENIOR TECHNICAL ENGINEER")
+
+Return this exact JSON structure:
+{{
+  "candidate_name": "Full name in proper case",
+  "position": "Current or most recent job title in proper case",
+  "education": "Highest degree with field and university",
+  "total_experience_years": "Number only (e.g., 11)",
+  "phone": "Phone number with country code if present",
+  "email": "Email address",
+  "intro_paragraph": "Professional summary add as many sentences as available in CV in paragraph format, word it in a structured manner, summarize if needed.",
+  "experiences": [
+    {{
+      "company": "Company name only (no project details here)",
+      "role": "Job title in proper case",
+      "duration": "Start date of first project - End date of last project (or Present)",
+      "responsibilities": [
+        "Project Name: Project 1 Name, Location: Location 1, Duration: Sep 2015 - Jun 2018",
+        "First responsibility for project 1",
+        "Second responsibility for project 1",
+        "All other responsibilities for project 1",
+        "Environment: Oracle 19c/12c, SQL * Plus, TOAD, SQL*Loader, SQL Developer, Shell Scripts, UNIX, Windows 10",
+        "Project Name: Project 2 Name, Location: Location 2, Duration: Jul 2018 - Present",
+        "First responsibility for project 2",
+        "Second responsibility for project 2",
+        "Environment: Oracle 19c/12c, SQL * Plus, TOAD, SQL*Loader, SQL Developer, Shell Scripts, UNIX, Windows 10",
+        "Continue for all projects and responsibilities"
+      ]
+    }}
+  ],
+  "technical_skills": ["List ALL technical skills mentioned"],
+  "certifications": ["Full certification names with IDs"],
+  "language_skills": ["Language - Proficiency level"]
+}}
+
+EXAMPLE for someone with multiple projects at same company:
+{{
+  "experiences": [
+    {{
+      "company": "Seertree Global Services",
+      "role": "Technical Consultant",
+      "duration": "Sep-2015 - Present",
+      "responsibilities": [
+        "Project Name: GE Appliances, Location: Offshore, Duration: Nov'23 – Till Now",
+        "Developed the custom packages to create credit card and assigning customer",
+        "Modified the standard package based on the client requirement",
+        "Using form personalization showing the credit card details at Sales order form",
+        "Developed custom reports as per customer requirements",
+        "Project Name: Fine Hygienic Holding (FHH), Location: Offshore, Duration: Sep'22 – Nov'23",
+        "Migrating data from EBS to fusion using payloads, Rest API's and Spread sheets",
+        "Modified standard report data models and layouts in fusion based on client requirements",
+        "Developed custom BI reports in fusion",
+        "Worked in BI bursting for sending email's and sent output to printer in fusion"
+      ]
+    }}
+  ]
+}}
+
+EXAMPLE for someone with single job (no projects):
+{{
+  "experiences": [
+    {{
+      "company": "ITForce Technology, Location: Dubai",
+      "role": "Senior Technical Engineer",
+      "duration": "Feb 2023 - Present",
+      "responsibilities": [
+        "Administered and optimized Office 365 applications",
+        "Enhanced security protocols by managing Barracuda Email Security Gateway",
+        "Led data migration projects with a focus on accuracy and efficiency"
+      ]
+    }}
+  ]
+}}
+
+EXAMPLE of location extraction from actual CV text:
+If CV shows: "Vogue International FZE, Sharjah"
+Extract as: "company": "Vogue International FZE, Location: Sharjah"
+
+If CV shows: "HP (Hewlett Packard) payroll of Metalogic PVT, Delhi, India"  
+Extract as: "company": "HP (Hewlett Packard) payroll of Metalogic PVT, Location: Delhi, India"
+
+CV TEXT:
+{cv_text}
+
+IMPORTANT REMINDERS:
+- Consolidate multiple projects at the same company into ONE experience entry
+- ALWAYS extract location from the CV and include it in company field as: "Company Name, Location: Location"
+- Location appears in various formats - after company name, on separate line, or with country
+- Look for cities like Dubai, Sharjah, Delhi, and countries like UAE, India
+- If location is split (e.g., "Dubai" on one line, "UAE" on another), combine them as "Dubai, UAE"
+- Extract ALL locations mentioned - if multiple cities/countries, include all
+- If multiple projects exist at same company:
+  * List each project as a subheading in responsibilities: "Project Name: [Name], Location: [Location], Duration: [Start - End]"
+  * Extract project-specific durations from the CV when available
+  * Calculate total duration from first project start to last project end
+  * Do NOT create separate experience entries for different projects at the same company
+- Extract ALL responsibilities under their respective companies or project subheadings
+- Do NOT add bullets or special characters to responsibilities - plain text only
+- Ensure responsibilities are correctly attributed to their respective roles/projects
+- If no project names are mentioned, just list responsibilities directly without project headers
+- Look for sections labeled "Environment:", "Technologies:", "Tools:", "Versions:", "Tech Stack:" etc.
+- These should be captured as the last item in the responsibilities list for that experience
+- Preserve the exact format and all items listed
+- Common patterns to look for:
+  * "Environment: Oracle 19c/12c, SQL * Plus..."
+  * "Versions: • Oracle Apps R12.1.1 • Oracle Database 10g..."
+  * "Technologies used: Java, Spring Boot, MySQL..."
+- For overall company duration: if CV says "Sep-2015 to till date" extract as "Sep-2015 - Present"
+- Preserve date formats as they appear but ensure "Present" is used for ongoing positions
+
+RETURN ONLY THE JSON:"""
+
+# The same structure as a response schema (mirroring CVExtractor._get_empty_data),
+# so Gemini's structured output mode answers with exactly this JSON
+def _strings() -> Dict[str, Any]:
+    return {"type": "array", "items": {"type": "string"}}
+
+EXPERIENCE_SCHEMA = {
+    "type": "object",
+    "properties": {"company": {"type": "string"}, "role": {"type": "string"},
+                   "duration": {"type": "string"}, "responsibilities": _strings()},
+    "required": ["company", "role", "duration", "responsibilities"],
+}
+
+EXTRACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "candidate_name": {"type": "string"},
+        "position": {"type": "string"},
+        "education": {"type": "string"},
+        "total_experience_years": {"type": "string"},
+        "phone": {"type": "string"},
+        "email": {"type": "string"},
+        "intro_paragraph": {"type": "string"},
+        "experiences": {"type": "array", "items": EXPERIENCE_SCHEMA},
+        "technical_skills": _strings(),
+        "certifications": _strings(),
+        "language_skills": _strings(),
+    },
+}
+EXTRACTION_SCHEMA["required"] = list(EXTRACTION_SCHEMA["properties"])
+
+PACKED_SCHEMA = {
+    "type": "array",
+    "items": {"type": "object", "properties": {"cv_id": {"type": "string"}, "data": EXTRACTION_SCHEMA},
+              "required": ["cv_id", "data"]},
+}
+
+def fields_schema(fields: List[str]) -> Dict[str, Any]:
+    """The response schema for extracting only `fields`."""
+    return {"type": "object", "properties": {name: EXTRACTION_SCHEMA["properties"][name] for name in fields},
+            "required": list(fields)}
+
+# Changes whenever the instructions or the schema do, so cached extractions
+# made with an older prompt are never reused
+PROMPT_VERSION = hashlib.sha256(
+    (EXTRACTION_PROMPT + json.dumps(EXTRACTION_SCHEMA, sort_keys=True)).encode("utf-8")).hexdigest()[:16]
+
+# Packed requests reuse the same instructions around several CVs
+_PROMPT_HEAD, _PROMPT_TAIL = (
+    part.replace("{{", "{").replace("}}", "}")
+    for part in EXTRACTION_PROMPT.split("CV TEXT:\n{cv_text}\n")
+)
+
+PACKED_PROMPT_INTRO = """
+MULTIPLE CVs:
+The CVs below belong to different candidates. Each one is enclosed between
+"=== BEGIN CV <id> ===" and "=== END CV <id> ===". Extract every CV on its own,
+never mixing information between them, and return a JSON array with exactly
+one entry per CV id:
+[
+  {"cv_id": "<id>", "data": { ...the JSON structure above for that CV... }}
+]
+
+"""
+
+def build_packed_prompt(cv_texts: Dict[str, str]) -> str:
+    cvs = "".join(f"=== BEGIN CV {cv_id} ===\n{text}\n=== END CV {cv_id} ===\n\n"
+                  for cv_id, text in cv_texts.items())
+    tail = _PROMPT_TAIL.replace("RETURN ONLY THE JSON:", "RETURN ONLY THE JSON ARRAY, ONE ENTRY PER CV ID:")
+    return _PROMPT_HEAD + PACKED_PROMPT_INTRO + cvs + tail
+
+def build_fields_prompt(cv_text: str, fields: List[str]) -> str:
+    """The extraction prompt, asking for only `fields` of the structure."""
+    return EXTRACTION_PROMPT.format(cv_text=cv_text).replace(
+        "RETURN ONLY THE JSON:", f"RETURN ONLY THE JSON, WITH ONLY THESE FIELDS: {', '.join(fields)}:")
+
+# ────────────────────────────────────────────────────────────────
+#  Record validation
+# ────────────────────────────────────────────────────────────────
+MAX_REPAIR_FIELDS = 4  # with more broken fields than this, the extraction fails (not retried)
+
+_STR_TYPE = {str}
+
+class InvalidField(ValueError):
+    """A value that does not fit its schema and cannot be coerced to it."""
+
+def compile_schema(schema: Dict[str, Any]):
+    """A function checking one value against `schema` and coercing it.
+    
+    Missing values (None) become empty strings, lists and objects; numbers
+    are accepted as strings and a lone string as a one-item list of strings.
+    Anything else that does not fit raises InvalidField.
+    """
+    kind = schema["type"]
+    if kind == "string":
+        def check(value):
+            if isinstance(value, str):
+                return value
+            if value is None:
+                return ""
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                # e.g. "total_experience_years": 11
+                return str(value) if isinstance(value, int) else f"{value:g}"
+            raise InvalidField(f"expected a string, got {type(value).__name__}")
+    elif kind == "array":
+        item = compile_schema(schema["items"])
+        wraps_strings = schema["items"]["type"] == "string"
+        def check(value):
+            if value is None:
+                return []
+            if isinstance(value, str) and wraps_strings:
+                return [value] if value.strip() else []
+            if not isinstance(value, list):
+                raise InvalidField(f"expected a list, got {type(value).__name__}")
+            if wraps_strings and set(map(type, value)) <= _STR_TYPE:
+                return value  # the common case needs no copy
+            return [item(v) for v in value if v is not None]
+    elif kind == "object":
+        fields = [(name, compile_schema(sub)) for name, sub in schema["properties"].items()]
+        def check(value):  # fills in the object in place
+            if value is None:
+                value = {}
+            elif not isinstance(value, dict):
+                raise InvalidField(f"expected an object, got {type(value).__name__}")
+            for name, field in fields:
+                value[name] = field(value.get(name))
+            return value
+    else:
+        raise ValueError(f"Unsupported schema type: {kind}")
+    return check
+
+class RecordValidator:
+    """Checks, coerces and normalizes an extracted record in one pass.
+    
+    The schema is compiled once. validate() does not raise: a top-level
+    field that does not fit (or, with `require`, is missing) comes back
+    empty and is listed as a problem, so only that field has to be asked
+    for again. Fields of the record that the schema does not know are kept
+    as they are.
+    """
+
+    def __init__(self, schema: Dict[str, Any], normalizers: Optional[Dict[str, Any]] = None):
+        normalizers = normalizers or {}
+        self.required = set(schema.get("required", ()))
+        self.fields = {name: (compile_schema(sub), normalizers.get(name))
+                       for name, sub in schema["properties"].items()}
+
+    def validate(self, data: Dict[str, Any], only: Optional[List[str]] = None,
+                 require: bool = True) -> tuple:
+        """(record, problem fields); with `only`, just those fields are checked."""
+        record = dict(data) if isinstance(data, dict) else {}
+        problems = []
+        for name in self.fields if only is None else only:
+            check, normalize = self.fields[name]
+            try:
+                value = check(record.get(name))
+                if require and name not in record and name in self.required:
+                    problems.append(name)
+            except InvalidField:
+                value = check(None)
+                problems.append(name)
+            record[name] = normalize(value) if normalize is not None else value
+        return record, problems
+
+def _normalize_experiences(experiences: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Keep only actual experiences (no padding): fill_template deletes unused rows
+    durations = normalize_many([exp["duration"] for exp in experiences])
+    for exp, duration in zip(experiences, durations):
+        exp["role"] = format_name(exp["role"])
+        exp["duration"] = duration
+    return experiences
+
+# Types only: for parts of a record that are normalized once assembled
+SCHEMA_CHECKER = RecordValidator(EXTRACTION_SCHEMA)
+
+RECORD_VALIDATOR = RecordValidator(EXTRACTION_SCHEMA, {
+    "candidate_name": format_name,
+    "position": format_name,
+    "experiences": _normalize_experiences,
+    # Default language skills if not found
+    "language_skills": lambda skills: skills or ["English - Fluent"],
+})
+
+# ────────────────────────────────────────────────────────────────
+#  Merging chunked extractions
+# ────────────────────────────────────────────────────────────────
+HEADER_CHUNK_FIELDS = [name for name in EXTRACTION_SCHEMA["properties"] if name != "experiences"]
+CHUNK_WORKERS = 4  # chunk extractions in flight at once, across all long CVs
+
+_chunk_pool: Optional[ThreadPoolExecutor] = None
+_chunk_pool_lock = threading.Lock()
+
+def _get_chunk_pool() -> ThreadPoolExecutor:
+    """Thread pool shared by every long CV's chunks, so their Gemini calls stay bounded."""
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is None:
+            _chunk_pool = ThreadPoolExecutor(max_workers=CHUNK_WORKERS, thread_name_prefix="cv-chunk")
+        return _chunk_pool
+
+def configure_chunks(workers: int):
+    """Set the size of the shared chunk pool; call before the first long CV."""
+    global CHUNK_WORKERS
+    CHUNK_WORKERS = max(1, workers)
+
+def span_durations(first: str, second: str) -> str:
+    """One duration from the earliest start to the latest end of two.
+    
+    If either cannot be read, the first is kept unchanged.
+    """
+    ends = []
+    for duration in (first, second):
+        parts = split_duration(duration)
+        if len(parts) != 2:
+            return first or second
+        ends.append([(month_number(part), part.strip()) for part in parts])
+    points = [point for pair in ends for point in pair]
+    if any(number is None for number, _ in points):
+        return first
+    start = min((pair[0] for pair in ends), key=lambda point: point[0])
+    end = max((pair[1] for pair in ends), key=lambda point: point[0])
+    return f"{start[1]} - {end[1]}"
+
+def _company_key(company: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", company.split(", Location:")[0].lower()))
+
+def merge_experiences(experiences: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Join consecutive entries for the same company into one, as the prompt asks.
+    
+    Chunks are cut between jobs, so projects at one company can come back
+    as several entries (one per chunk). The joined entry keeps the first
+    role, spans all durations and lists the responsibilities in order.
+    Entries for the same company that are not next to each other (the
+    candidate went back later) stay separate.
+    """
+    merged: List[Dict[str, Any]] = []
+    for exp in experiences:
+        last = merged[-1] if merged else None
+        if last is None or not exp["company"] or _company_key(exp["company"]) != _company_key(last["company"]):
+            merged.append(exp)
+            continue
+        if "Location:" in exp["company"] and "Location:" not in last["company"]:
+            last["company"] = exp["company"]
+        last["role"] = last["role"] or exp["role"]
+        last["duration"] = span_durations(last["duration"], exp["duration"])
+        last["responsibilities"] = last["responsibilities"] + exp["responsibilities"]
+    return merged
+
+# ────────────────────────────────────────────────────────────────
+#  Incremental JSON parsing
+# ────────────────────────────────────────────────────────────────
+HEADER_FIELDS = ("candidate_name", "position", "email", "phone")
+
+class IncrementalJSONObject:
+    """Parse a JSON object from streamed text, one top-level member at a time.
+
+    Each feed() scans only the new chunk, tracking string/nesting state, and
+    returns the (key, value) pairs whose value closed inside it. Text before
+    the first "{" (such as a ```json fence) and after the matching "}" is
+    ignored, and so is a member that is not valid JSON: it is simply missing
+    from the result, for validation to flag.
+    """
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+        self.started = False
+        self.done = False
+        self._pending = ""  # text of the member currently being streamed
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[tuple]:
+        completed = []
+        if self.done or not chunk:
+            return completed
+        i = 0
+        if not self.started:
+            i = chunk.find("{")
+            if i < 0:
+                return completed
+            self.started = True
+            self._depth = 1
+            i += 1
+        segment_start = i
+        
+        while i < len(chunk):
+            ch = chunk[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._pending += chunk[segment_start:i]
+                    self._emit(completed)
+                    self.done = True
+                    return completed
+            elif ch == "," and self._depth == 1:
+                self._pending += chunk[segment_start:i]
+                self._emit(completed)
+                segment_start = i + 1
+            i += 1
+        
+        self._pending += chunk[segment_start:]
+        return completed
+
+    def _emit(self, completed: List[tuple]):
+        member = self._pending.strip()
+        self._pending = ""
+        if not member:
+            return
+        # A single member is a complete object on its own
+        try:
+            key, value = next(iter(json.loads("{" + member + "}").items()))
+        except (ValueError, StopIteration):
+            return
+        self.data[key] = value
+        completed.append((key, value))
+
+    def result(self, partial: bool = False) -> Dict[str, Any]:
+        """The parsed members; with `partial`, also when the object never closed."""
+        if not self.started:
+            raise ValueError("No JSON found")
+        if not self.done and not partial:
+            raise ValueError("Response ended before the JSON object was complete")
+        return self.data
+
+# ────────────────────────────────────────────────────────────────
+#  Extraction cache
+# ────────────────────────────────────────────────────────────────
+class ExtractionCache:
+    """Persistent SQLite cache of CVExtractor.extract results.
+
+    Entries are keyed by the normalized CV text, the prompt version and the
+    model name. They expire after `ttl_seconds`, and once more than
+    `max_entries` are stored the least recently used are dropped.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                " key TEXT PRIMARY KEY, model TEXT, created REAL, accessed REAL, data TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS extractions_accessed ON extractions (accessed)")
+
+    @staticmethod
+    def make_key(cv_text: str, model_name: str) -> str:
+        normalized = re.sub(r"\s+", " ", cv_text).strip()
+        payload = f"{PROMPT_VERSION}\0{model_name}\0{normalized}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT data FROM extractions WHERE key = ? AND created >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE extractions SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, model_name: str, data: Dict[str, Any]):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, model, created, accessed, data) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, now, now, json.dumps(data)),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM extractions WHERE created < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM extractions WHERE key IN ("
+            " SELECT key FROM extractions ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+# ────────────────────────────────────────────────────────────────
+#  Enhanced Gemini wrapper for comprehensive extraction
+# ────────────────────────────────────────────────────────────────
+class CVExtractor:
+    def __init__(self, api_key: str, cache: Optional[ExtractionCache] = None, stream: bool = True,
+                 api_endpoint: str = "", caller: Optional[ResilientCaller] = None,
+                 long_cv_tokens: int = 8000, chunk_tokens: int = 4000, rule_confidence: float = 0.9):
+        import google.generativeai as genai
+        if api_endpoint:
+            # e.g. a proxy, or a local stand-in for load tests ("http://127.0.0.1:8765")
+            genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": api_endpoint})
+        else:
+            genai.configure(api_key=api_key)
+        self.model_name = EXTRACTION_MODEL
+        self.model = genai.GenerativeModel(self.model_name)
+        self.cfg = {"temperature": 0.1, "top_p": 0.1, "top_k": 1}
+        self.cache = cache
+        self.stream = stream
+        # Share one caller between extractors so its circuit breaker sees all traffic
+        self.caller = caller or ResilientCaller()
+        # Longer CVs are extracted in chunks (0 disables)
+        self.long_cv_tokens = long_cv_tokens
+        self.chunk_tokens = chunk_tokens
+        # Fields cv_rules finds with this confidence are not asked for (above 1 disables)
+        self.rule_confidence = rule_confidence
+
+    def extract(self, cv_text: str, report=logger.warning, use_cache: bool = True,
+                on_field=None, stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Extract structured data, reusing a cached result unless use_cache is off.
+        
+        With use_cache=False the model is always called and the fresh result
+        replaces any cached one. on_field(key, value) is called for each
+        top-level field as soon as it has been parsed (values are not yet
+        validated at that point). CVs over `long_cv_tokens` are extracted in
+        chunks (see _extract_chunked). Fields cv_rules finds with at least
+        `rule_confidence` are filled locally instead, and if Gemini fails
+        whatever the rules found is returned. The cache outcome and the
+        Gemini usage (requests, seconds, tokens, retries) are added to `stats`.
+        """
+        stats = {} if stats is None else stats
+        if use_cache:
+            cached = self.cached(cv_text)
+            if cached is not None:
+                stats.setdefault("cache", "hit")
+                emit_header_fields(cached, on_field)
+                return cached
+        stats.setdefault("cache", "miss" if use_cache else "bypass")
+        found = pre_extract(cv_text)
+        known = confident(found, self.rule_confidence)
+        if known:
+            stats["rule_fields"] = len(known)
+            for field, value in known.items():
+                cv_metrics.RULE_FIELDS.inc(field=field, use="skipped")
+                if on_field is not None and field in HEADER_FIELDS:
+                    on_field(field, value)
+        if self.long_cv_tokens and estimate_tokens(cv_text) > self.long_cv_tokens:
+            header, chunks = split_cv_sections(cv_text, self.chunk_tokens)
+            if len(chunks) > 1:
+                return self._extract_chunked(cv_text, header, chunks, found, known, report, on_field, stats)
+        
+        if known:
+            fields = [name for name in EXTRACTION_SCHEMA["properties"] if name not in known]
+            prompt, schema = build_fields_prompt(cv_text, fields), fields_schema(fields)
+        else:
+            prompt, schema = EXTRACTION_PROMPT.format(cv_text=cv_text), EXTRACTION_SCHEMA
+        if self.stream:
+            # A response schema makes Gemini emit keys alphabetically, which
+            # would stream the experiences before the header fields. The
+            # streamed reply follows the prompt's key order instead and is
+            # still checked by RECORD_VALIDATOR.
+            schema = None
+
+        def attempt(cancelled):
+            parser = IncrementalJSONObject()
+            for chunk in self._response_chunks(prompt, stats, cancelled=cancelled, schema=schema):
+                for field, value in parser.feed(chunk):
+                    if on_field is not None:
+                        on_field(field, value)
+                if parser.done:
+                    break
+            # A reply that was cut short or has a few broken fields is kept;
+            # only those fields are asked for again. Fields missing from a
+            # complete reply keep their empty defaults.
+            data, problems = RECORD_VALIDATOR.validate(dict(parser.result(partial=True), **known),
+                                                       require=not parser.done)
+            if len(problems) > MAX_REPAIR_FIELDS:
+                raise ValueError(f"Unusable response: {len(problems)} fields missing or malformed")
+            return data, problems
+
+        try:
+            data, problems = self.caller.call(attempt, stats)
+            if problems:
+                repaired = problems
+                data, problems = self._repair(cv_text, data, problems, stats, report)
+                if on_field is not None:
+                    for field in HEADER_FIELDS:
+                        if field in repaired:
+                            on_field(field, data[field])
+            # Failed and incomplete extractions are never cached
+            if not problems:
+                self._store(cv_text, data)
+            return data
+                
+        except Exception as e:
+            report(f"⚠️ Extraction error: {str(e)}")
+            return self._rule_fallback(found, {})
+
+    def extract_packed(self, cv_texts: Dict[str, str], stats: Optional[Dict[str, Any]] = None,
+                       known: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, Dict[str, Any]]:
+        """Extract several CVs with one request.
+        
+        Returns validated records for the ids the model answered; ids that
+        are missing or malformed are simply absent. A record with a few
+        broken fields has just those re-extracted. `known` maps an id to the
+        fields cv_rules found confidently, which replace the model's answer
+        for them. Raises if the response holds no usable JSON array. The
+        requests' usage is added to `stats`.
+        """
+        prompt = build_packed_prompt(cv_texts)
+        stats = {} if stats is None else stats
+        known = known or {}
+
+        def attempt(cancelled):
+            text = "".join(self._response_chunks(prompt, stats, kind="packed", stream=False,
+                                                 cancelled=cancelled, schema=PACKED_SCHEMA))
+            start = text.find("[")
+            if start < 0:
+                raise ValueError("No JSON array found")
+            return json.JSONDecoder().raw_decode(text, start)[0]
+
+        items = self.caller.call(attempt, stats)
+        
+        results = {}
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            cv_id, data = item.get("cv_id"), item.get("data")
+            if cv_id not in cv_texts or not isinstance(data, dict):
+                continue
+            data, problems = RECORD_VALIDATOR.validate(dict(data, **known.get(cv_id, {})), require=False)
+            if 0 < len(problems) <= MAX_REPAIR_FIELDS:
+                data, problems = self._repair(cv_texts[cv_id], data, problems, stats)
+            if not problems:
+                results[cv_id] = data
+                self._store(cv_texts[cv_id], data)
+        return results
+
+    def cached(self, cv_text: str) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        return self.cache.get(self.cache.make_key(cv_text, self.model_name))
+
+    def _store(self, cv_text: str, data: Dict[str, Any]):
+        if self.cache is not None:
+            self.cache.put(self.cache.make_key(cv_text, self.model_name), self.model_name, data)
+
+    def _extract_chunked(self, cv_text: str, header: str, chunks: List[str], found: Dict[str, Any],
+                         known: Dict[str, str], report, on_field, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Map-reduce extraction of a long CV.
+        
+        The header fields (from the header text) and the experiences of each
+        chunk are asked for concurrently, each a short answer instead of one
+        huge one, on the chunk pool shared by all CVs (CHUNK_WORKERS); the experiences are then joined in order with
+        merge_experiences and the record validated once. A part that fails
+        is reported and leaves its fields empty (or filled by cv_rules), and
+        the record is not cached.
+        """
+        stats["chunks"] = len(chunks)
+        header_fields = [name for name in HEADER_CHUNK_FIELDS if name not in known]
+        parts = [(header, header_fields)] + [(chunk, ["experiences"]) for chunk in chunks]
+        record = {"experiences": []}
+        complete, failed = True, []
+        pool = _get_chunk_pool()
+        futures = [pool.submit(self._extract_fields, text, fields, stats, "chunk") for text, fields in parts]
+        for n, ((_, fields), future) in enumerate(zip(parts, futures)):
+            try:
+                answer, problems = future.result()
+            except Exception as e:
+                answer, problems = {}, list(fields)
+                failed += fields
+                report(f"⚠️ Extraction error in part {n + 1} of {len(parts)}: {str(e)}")
+            else:
+                if problems:
+                    report(f"⚠️ Could not extract {', '.join(problems)}")
+            complete = complete and not problems
+            if n == 0:
+                record.update((name, answer.get(name)) for name in fields)
+                record.update(known)
+                emit_header_fields(RECORD_VALIDATOR.validate(record, only=list(HEADER_FIELDS))[0], on_field)
+            else:
+                record["experiences"] += answer.get("experiences") or []
+        record["experiences"] = merge_experiences(record["experiences"])
+        if failed:
+            return self._rule_fallback(found, record)
+        data = RECORD_VALIDATOR.validate(record, require=False)[0]
+        if complete:
+            self._store(cv_text, data)
+        return data
+
+    def _rule_fallback(self, found: Dict[str, Any], record: Dict[str, Any]) -> Dict[str, Any]:
+        """`record` with its empty fields filled from cv_rules, whatever the confidence.
+        
+        For extractions that failed, so the CV is not rendered blank.
+        """
+        record = dict(record)
+        for name, field in found.items():
+            if not record.get(name):
+                record[name] = field.value
+                cv_metrics.RULE_FIELDS.inc(field=name, use="fallback")
+        return RECORD_VALIDATOR.validate(record, require=False)[0]
+
+    def _extract_fields(self, cv_text: str, fields: List[str], stats: Dict[str, Any],
+                        kind: str = "repair") -> tuple:
+        """Ask for just `fields` of the record: (answer, fields that did not fit).
+        
+        Values are type-checked but not normalized; raises if no attempt
+        returned usable JSON.
+        """
+        prompt = build_fields_prompt(cv_text, fields)
+        schema = fields_schema(fields)
+
+        def attempt(cancelled):
+            text = "".join(self._response_chunks(prompt, stats, kind=kind, stream=False,
+                                                 cancelled=cancelled, schema=schema))
+            start = text.find("{")
+            if start < 0:
+                raise ValueError("No JSON found")
+            return SCHEMA_CHECKER.validate(json.JSONDecoder().raw_decode(text, start)[0], only=fields)
+
+        return self.caller.call(attempt, stats)
+
+    def _repair(self, cv_text: str, data: Dict[str, Any], fields: List[str], stats: Dict[str, Any],
+                report=logger.warning) -> tuple:
+        """Ask again for just the broken `fields` and merge the answer into `data`.
+        
+        Returns (data, fields still broken); those stay empty.
+        """
+        stats["repaired_fields"] = stats.get("repaired_fields", 0) + len(fields)
+        try:
+            answer, problems = self._extract_fields(cv_text, fields, stats)
+        except Exception as e:
+            answer, problems = {}, list(fields)
+            report(f"⚠️ Could not re-extract {', '.join(fields)}: {str(e)}")
+        else:
+            if problems:
+                report(f"⚠️ Could not extract {', '.join(problems)}")
+        repaired = [name for name in fields if name not in problems]
+        data.update((name, answer[name]) for name in repaired)
+        data = RECORD_VALIDATOR.validate(data, only=repaired)[0]
+        for name in fields:
+            cv_metrics.FIELD_REPAIRS.inc(field=name, outcome="failed" if name in problems else "repaired")
+        return data, problems
+
+    def _response_chunks(self, prompt: str, stats: Dict[str, Any], kind: str = "single",
+                         stream: Optional[bool] = None, cancelled: Optional[threading.Event] = None,
+                         schema: Optional[Dict[str, Any]] = EXTRACTION_SCHEMA):
+        """Yield the response text, chunk by chunk when streaming.
+        
+        One request of a ResilientCaller attempt: the client's own retries
+        are off, and reading stops once `cancelled` is set. The reply is
+        JSON, constrained to `schema` unless it is None. The request is
+        counted in cv_metrics and its usage added to `stats` once the
+        response has been read (or abandoned).
+        """
+        stream = self.stream if stream is None else stream
+        config = dict(self.cfg, response_mime_type="application/json")
+        if schema is not None:
+            config["response_schema"] = schema
+        usage = {"gemini_requests": 1, "gemini_seconds": 0.0, "input_tokens": 0, "output_tokens": 0}
+        outcome = "ok"
+        began = time.perf_counter()
+        try:
+            response = self.model.generate_content(
+                prompt, generation_config=config, stream=stream,
+                request_options={"retry": None, "timeout": self.caller.attempt_timeout})
+            for chunk in response if stream else [response]:
+                if cancelled is not None and cancelled.is_set():
+                    raise AttemptCancelled()
+                # Streamed chunks report running totals; the last one is complete
+                meta = getattr(chunk, "usage_metadata", None)
+                usage["input_tokens"] = max(usage["input_tokens"], getattr(meta, "prompt_token_count", 0) or 0)
+                usage["output_tokens"] = max(usage["output_tokens"],
+                                             getattr(meta, "candidates_token_count", 0) or 0)
+                try:
+                    yield chunk.text
+                except ValueError:
+                    # Chunks carrying only finish/safety metadata have no text
+                    continue
+        except AttemptCancelled:
+            outcome = "cancelled"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            usage["gemini_seconds"] = time.perf_counter() - began
+            cv_metrics.record_gemini_request(kind, outcome, usage["gemini_seconds"], usage)
+            add_usage(stats, usage)
+
+    def _validate_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Ensure data structure is complete and properly formatted."""
+        return RECORD_VALIDATOR.validate(data)[0]
+
+    def _get_empty_data(self) -> Dict[str, Any]:
+        return {
+            "candidate_name": "",
+            "position": "",
+            "education": "",
+            "total_experience_years": "",
+            "phone": "",
+            "email": "",
+            "intro_paragraph": "",
+            "experiences": [],  # Empty list, no padding
+            "technical_skills": [],
+            "certifications": [],
+            "language_skills": ["English - Fluent"]
+        }
+
+def emit_header_fields(data: Dict[str, Any], on_field):
+    """Report a finished record's header fields as if they had streamed in."""
+    if on_field is not None:
+        for field in HEADER_FIELDS:
+            on_field(field, data.get(field, ""))
+
+# ────────────────────────────────────────────────────────────────
+#  Multi-CV prompt packing
+# ────────────────────────────────────────────────────────────────
+def add_usage(stats: Dict[str, Any], usage: Dict[str, Any]):
+    """Accumulate Gemini usage counts into a per-CV stats dict.
+    
+    Hedges, chunks and late packed replies may add to one dict at once, so
+    this holds the same lock as ResilientCaller's retry counts.
+    """
+    with STATS_LOCK:
+        for key, value in usage.items():
+            stats[key] = stats.get(key, 0) + value
+
+def packed_share(usage: Dict[str, Any], count: int, first: bool) -> Dict[str, Any]:
+    """One CV's part of a packed request: an even split of its tokens.
+    
+    Requests, seconds and retries are shared experiences and are not split.
+    """
+    share = dict(usage)
+    for key in ("input_tokens", "output_tokens"):
+        total = usage.get(key, 0)
+        share[key] = total // count + (total % count if first else 0)
+    return share
+
+class PromptBatcher:
+    """Packs short CVs from concurrent workers into shared Gemini requests.
+    
+    Drop-in for CVExtractor.extract. A CV at or under `max_cv_tokens` waits
+    (up to `linger` seconds) for others to share its request; a pack is sent
+    once adding another CV would exceed `token_budget` or it holds `max_cvs`.
+    CVs the packed reply misses, or whose pack fails, are retried one at a
+    time through the wrapped extractor.
+
+    The cv_rules pre-extraction runs before a CV is packed. The packed
+    prompt still asks for every field of every CV, so no output tokens are
+    saved, but the fields found confidently replace the model's answer as
+    in a single extraction. A worker waits for its pack at most `linger`
+    plus the caller's deadline, then extracts its CV alone; if the pack was
+    already sent, its late share is still added to the CV's stats.
+    """
+
+    def __init__(self, extractor: CVExtractor, token_budget: int, max_cvs: int,
+                 max_cv_tokens: int, linger: float = 0.5):
+        self.extractor = extractor
+        self.token_budget = token_budget
+        self.max_cvs = max_cvs
+        self.max_cv_tokens = max_cv_tokens
+        self.linger = linger
+        self._lock = threading.Lock()
+        self._pending = []  # [(cv_text, tokens, future, fields known from cv_rules)]
+        self._pending_tokens = 0
+        self._timer = None
+        self._packs = 0
+
+    def extract(self, cv_text: str, report=logger.warning, use_cache: bool = True,
+                on_field=None, stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        stats = {} if stats is None else stats
+        tokens = estimate_tokens(cv_text)
+        if tokens > self.max_cv_tokens:
+            return self.extractor.extract(cv_text, report, use_cache, on_field, stats)
+        if use_cache:
+            cached = self.extractor.cached(cv_text)
+            if cached is not None:
+                stats.setdefault("cache", "hit")
+                emit_header_fields(cached, on_field)
+                return cached
+        stats.setdefault("cache", "miss" if use_cache else "bypass")
+        known = confident(pre_extract(cv_text), self.extractor.rule_confidence)
+        for field, value in known.items():
+            if on_field is not None and field in HEADER_FIELDS:
+                on_field(field, value)
+        
+        future = Future()
+        ready = []
+        with self._lock:
+            if self._pending and self._pending_tokens + tokens > self.token_budget:
+                ready.append(self._take_pending())
+            self._pending.append((cv_text, tokens, future, known))
+            self._pending_tokens += tokens
+            if len(self._pending) >= self.max_cvs:
+                ready.append(self._take_pending())
+            elif self._timer is None:
+                self._timer = threading.Timer(self.linger, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        for pack in ready:
+            self._send(pack)
+        
+        try:
+            data, usage = future.result(timeout=self.linger + self.extractor.caller.deadline)
+        except TimeoutError:
+            if self._withdraw(future):
+                stats["packed_timeout"] = "queued"
+            else:
+                # The pack is in flight and this CV is asked for twice; the
+                # packed request's share is still added when it answers
+                stats["packed_timeout"] = "sent"
+                future.add_done_callback(lambda done: self._late_usage(done, stats))
+            cv_metrics.PACKED_TIMEOUTS.inc(pack=stats["packed_timeout"])
+            report("⚠️ Packed extraction timed out; extracting this CV on its own")
+            data, usage = None, None
+        if usage:
+            stats["packed"] = True
+            add_usage(stats, usage)
+        if data is not None and known:
+            stats["rule_fields"] = len(known)
+            for field in known:
+                cv_metrics.RULE_FIELDS.inc(field=field, use="packed")
+        if data is None:
+            # Not answered in the packed reply: ask again for this CV alone
+            return self.extractor.extract(cv_text, report, use_cache=False, on_field=on_field, stats=stats)
+        emit_header_fields(data, on_field)
+        return data
+
+    def _take_pending(self) -> list:
+        pack = self._pending
+        self._pending, self._pending_tokens = [], 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return pack
+
+    def _withdraw(self, future: Future) -> bool:
+        """Drop a CV from the pending pack; False if it was already sent."""
+        with self._lock:
+            for entry in self._pending:
+                if entry[2] is future:
+                    self._pending.remove(entry)
+                    self._pending_tokens -= entry[1]
+                    return True
+        return False
+
+    @staticmethod
+    def _late_usage(future: Future, stats: Dict[str, Any]):
+        """Add a packed reply's usage to a CV that stopped waiting for it."""
+        usage = future.result()[1]
+        if usage:
+            add_usage(stats, usage)
+
+    def _flush(self):
+        with self._lock:
+            pack = self._take_pending() if self._pending else []
+        if pack:
+            self._send(pack)
+
+    def _send(self, pack: list):
+        if len(pack) == 1:
+            # Nothing to share the request with; the caller asks on its own
+            pack[0][2].set_result((None, None))
+            return
+        with self._lock:
+            self._packs += 1
+            prefix = f"P{self._packs}"
+        cv_ids = {f"{prefix}-{n}": entry for n, entry in enumerate(pack, start=1)}
+        usage = {}
+        try:
+            results = self.extractor.extract_packed({cv_id: entry[0] for cv_id, entry in cv_ids.items()},
+                                                    stats=usage,
+                                                    known={cv_id: entry[3] for cv_id, entry in cv_ids.items()})
+        except Exception:
+            results = {}
+        for n, (cv_id, (_, _, future, _)) in enumerate(cv_ids.items()):
+            future.set_result((results.get(cv_id), packed_share(usage, len(pack), first=n == 0)))
+
+# ────────────────────────────────────────────────────────────────
+#  Helper: text of a table row
+# ────────────────────────────────────────────────────────────────
+def get_row_text(row) -> str:
+    """Get all text from a table row."""
+    text = ""
+    for cell in row.cells:
+        for paragraph in cell.paragraphs:
+            text += paragraph.text + " "
+    return text
+
+# ────────────────────────────────────────────────────────────────
+#  Placeholder substitution engine
+# ────────────────────────────────────────────────────────────────
+MAX_EXPERIENCES = 20
+MAX_RESPONSIBILITIES = 100
+
+PLACEHOLDER_RE = re.compile(r"\{\{([A-Z0-9_]+)\}\}")
+EXP_PLACEHOLDER_RE = re.compile(r"EXP(\d+)_(?:(COMPANY|ROLE|DURATION)|RESP(\d+))")
+
+class PlaceholderResolver:
+    """Resolve {{...}} tokens lazily from extracted CV data.
+
+    Paragraphs are scanned once with PLACEHOLDER_RE and each token found is
+    looked up on demand, so the cost follows the placeholders actually present
+    in the template instead of the 2,000+ possible EXP/RESP combinations.
+    """
+
+    def __init__(self, d: Dict[str, Any]):
+        # Format skills and certifications as bullet points
+        tech_skills = d.get("technical_skills", [])
+        certs = d.get("certifications", [])
+        langs = d.get("language_skills", [])
+
+        self.basic = {
+            "CANDIDATE_NAME": str(d.get("candidate_name", "") or ""),
+            "POSITION": str(d.get("position", "") or ""),
+            "EDUCATION": str(d.get("education", "") or ""),
+            "TOTAL_EXPERIENCE_YEARS": str(d.get("total_experience_years", "") or ""),
+            "PHONE": str(d.get("phone", "") or ""),
+            "EMAIL": str(d.get("email", "") or ""),
+            "INTRO_PARAGRAPH": str(d.get("intro_paragraph", "") or ""),
+            "TECHNICAL_SKILLS_LIST": "\n".join([f"• {skill}" for skill in tech_skills]) if tech_skills else "",
+            "CERTIFICATIONS_LIST": "\n".join([f"• {cert}" for cert in certs]) if certs else "N/A",  # No bullet for N/A
+            "LANGUAGE_SKILLS_LIST": ", ".join(langs) if langs else "English - Fluent",
+        }
+
+        # Track which experiences have data
+        self.experiences = d.get("experiences", [])[:MAX_EXPERIENCES]
+        self.experiences_with_data = {
+            i for i, exp in enumerate(self.experiences, start=1)
+            if exp.get("company") and exp.get("role")
+        }
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Return the replacement for a placeholder name, or None if unknown."""
+        if name in self.basic:
+            return self.basic[name]
+
+        match = EXP_PLACEHOLDER_RE.fullmatch(name)
+        if not match:
+            return None
+        exp_num = int(match.group(1))
+        if not 1 <= exp_num <= MAX_EXPERIENCES:
+            return None
+        field, resp_num = match.group(2), match.group(3)
+        if resp_num is not None and not 1 <= int(resp_num) <= MAX_RESPONSIBILITIES:
+            return None
+
+        if exp_num not in self.experiences_with_data:
+            # No data for this experience - mark for deletion
+            return "<<<DELETE_EXPERIENCE>>>"
+
+        exp = self.experiences[exp_num - 1]
+        if field == "COMPANY":
+            # Mark company placeholders for bold formatting
+            return f"<<<BOLD>>>{str(exp.get('company', '') or '')}<<<END_BOLD>>>"
+        if field == "ROLE":
+            return str(exp.get("role", "") or "")
+        if field == "DURATION":
+            return str(exp.get("duration", "") or "")
+
+        responsibilities = exp.get("responsibilities", [])
+        j = int(resp_num)
+        if j <= len(responsibilities):
+            resp_text = responsibilities[j - 1]
+            return "" if resp_text is None else str(resp_text)
+        # Mark empty responsibilities for removal
+        return "<<<REMOVE_THIS_LINE>>>"
+
+    def _replace(self, match) -> str:
+        value = self.resolve(match.group(1))
+        return match.group(0) if value is None else value
+
+    def substitute(self, text: str) -> str:
+        """Replace every known placeholder in text in a single pass."""
+        if "{{" not in text:
+            return text
+        return PLACEHOLDER_RE.sub(self._replace, text)
+
+# ────────────────────────────────────────────────────────────────
+#  Compiled template plans
+# ────────────────────────────────────────────────────────────────
+TEMPLATE_PLAN_CACHE_SIZE = 8  # distinct templates kept per process
+
+_plan_cache: "OrderedDict[str, TemplatePlan]" = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+EXP_ROW_RE = re.compile(r"\{\{EXP(\d+)_(?:COMPANY\}\}|ROLE\}\}|DURATION\}\}|RESP)")
+
+def _xml_path(root, element) -> tuple:
+    """Child-index path from root down to element."""
+    path = []
+    while element is not root:
+        parent = element.getparent()
+        path.append(parent.index(element))
+        element = parent
+    return tuple(reversed(path))
+
+def _resolve_xml_path(root, path: tuple):
+    for index in path:
+        root = root[index]
+    return root
+
+def _empty_body_package(tpl_bytes: bytes, doc: Document) -> bytes:
+    """The template package with every part as is, except an empty document body."""
+    from docx.opc.oxml import serialize_part_xml
+    root = copy.deepcopy(doc.element)
+    for child in list(root.body):
+        root.body.remove(child)
+    document_xml = serialize_part_xml(root)
+    name = doc.part.partname.lstrip("/")
+    out = BytesIO()
+    with zipfile.ZipFile(BytesIO(tpl_bytes)) as zin, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            zout.writestr(item, document_xml if item.filename == name else zin.read(item.filename))
+    return out.getvalue()
+
+def _needs_filling(text: str) -> bool:
+    """Only paragraphs with placeholders or markers can change when filled."""
+    return "{{" in text or "<<<" in text
+
+class TemplatePlan:
+    """A parsed template plus the location of every placeholder in it.
+
+    The walk over paragraphs, tables, rows and cells (and the experience
+    number each row belongs to) is done once here. Each CV is then rendered
+    into a clone of the parsed document, visiting only the recorded paths.
+
+    Given the template's bytes, a clone is the template package with an
+    empty body (parsed per CV, a few ms) plus a deep copy of the compiled
+    body element, rather than a deep copy of the whole python-docx Document.
+    The plan is read-only once compiled, so clones need no lock.
+    """
+
+    def __init__(self, doc: Document, tpl_bytes: Optional[bytes] = None):
+        self.document = doc
+        body = doc.element.body
+        self._shell = _empty_body_package(tpl_bytes, doc) if tpl_bytes is not None else None
+
+        # [(paragraph path, original text)]
+        self.body_paragraphs = [
+            (_xml_path(body, p._p), p.text)
+            for p in doc.paragraphs if _needs_filling(p.text)
+        ]
+
+        # [(table path, [(row path, experience numbers, [(cell path, [(paragraph path, text)])])])]
+        self.tables = []
+        for table in doc.tables:
+            rows = []
+            for row in table.rows:
+                exp_nums = {
+                    int(n) for n in EXP_ROW_RE.findall(get_row_text(row))
+                    if 1 <= int(n) <= MAX_EXPERIENCES
+                }
+                cells, seen = [], set()
+                for cell in row.cells:
+                    # Merged cells are returned once per grid column
+                    if id(cell._tc) in seen:
+                        continue
+                    seen.add(id(cell._tc))
+                    paragraphs = [
+                        (_xml_path(body, p._p), p.text)
+                        for p in cell.paragraphs if _needs_filling(p.text)
+                    ]
+                    if paragraphs:
+                        cells.append((_xml_path(body, cell._tc), paragraphs))
+                if exp_nums or cells:
+                    rows.append((_xml_path(body, row._tr), exp_nums, cells))
+            self.tables.append((_xml_path(body, table._tbl), rows))
+
+    def clone(self) -> Document:
+        """Fresh copy of the parsed template to render one CV into."""
+        if self._shell is None:
+            return copy.deepcopy(self.document)
+        from docx import Document
+        doc = Document(BytesIO(self._shell))
+        doc.element.replace(doc.element.body, copy.deepcopy(self.document.element.body))
+        return doc
+
+    def locate(self, doc: Document):
+        """Map the recorded paths onto doc's `w:p`, `w:tbl`, `w:tr` and `w:tc` elements."""
+        body = doc.element.body
+        body_targets = [(_resolve_xml_path(body, path), text) for path, text in self.body_paragraphs]
+        table_targets = []
+        for tbl_path, rows in self.tables:
+            located_rows = []
+            for tr_path, exp_nums, cells in rows:
+                located_cells = [
+                    (_resolve_xml_path(body, tc_path),
+                     [(_resolve_xml_path(body, path), text) for path, text in paragraphs])
+                    for tc_path, paragraphs in cells
+                ]
+                located_rows.append((_resolve_xml_path(body, tr_path), exp_nums, located_cells))
+            table_targets.append((_resolve_xml_path(body, tbl_path), located_rows))
+        return body_targets, table_targets
+
+def template_digest(tpl_bytes: bytes) -> str:
+    return hashlib.sha256(tpl_bytes).hexdigest()
+
+def load_template_plan(tpl_bytes: bytes) -> TemplatePlan:
+    """Compile a template once per content hash, shared by all callers.
+
+    The most recently used TEMPLATE_PLAN_CACHE_SIZE plans stay in memory.
+    """
+    digest = template_digest(tpl_bytes)
+    with _plan_cache_lock:
+        if digest in _plan_cache:
+            _plan_cache.move_to_end(digest)
+            return _plan_cache[digest]
+    from docx import Document
+    plan = TemplatePlan(Document(BytesIO(tpl_bytes)), tpl_bytes)
+    with _plan_cache_lock:
+        # Another thread may have compiled the same template meanwhile
+        plan = _plan_cache.setdefault(digest, plan)
+        _plan_cache.move_to_end(digest)
+        while len(_plan_cache) > TEMPLATE_PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return plan
+
+def render_cv(plan: TemplatePlan, d: Dict[str, Any], report=logger.warning) -> Document:
+    """Fill a clone of a compiled template with one CV's data."""
+    return fill_template(plan.clone(), d, plan, report)
+
+# ────────────────────────────────────────────────────────────────
+#  Enhanced template filling with row deletion
+# ────────────────────────────────────────────────────────────────
+# Run formats fill_template writes, as `w:r` prototypes built once with
+# python-docx and deep-copied per run (instead of setting font name, size,
+# weight and colour on every run through python-docx proxies):
+#   PLAIN   Arial 11pt black, weight from the style (text around bold markers)
+#   NORMAL  the same, explicitly not bold
+#   BOLD    bold (company names, project headers)
+PLAIN, NORMAL, BOLD = "plain", "normal", "bold"
+RUN_FONT, RUN_SIZE_PT, LINE_SPACING = "Arial", 11, 1.5
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_RUN_PROTOTYPES: Dict[str, Any] = {}
+_run_prototypes_lock = threading.Lock()
+
+def _run_prototypes() -> Dict[str, Any]:
+    """Private copies of the run prototypes, for one document on one thread."""
+    with _run_prototypes_lock:
+        if not _RUN_PROTOTYPES:
+            from docx.oxml import OxmlElement
+            from docx.shared import Pt, RGBColor
+            from docx.text.run import Run
+            for kind in (PLAIN, NORMAL, BOLD):
+                r = OxmlElement("w:r")
+                font = Run(r, None).font
+                font.name = RUN_FONT
+                font.size = Pt(RUN_SIZE_PT)
+                if kind != PLAIN:
+                    font.bold = kind == BOLD
+                font.color.rgb = RGBColor(0, 0, 0)
+                _RUN_PROTOTYPES[kind] = r
+        return {kind: copy.deepcopy(r) for kind, r in _RUN_PROTOTYPES.items()}
+
+def _is_project_header(line: str) -> bool:
+    line = line.strip()
+    return line.startswith("Project Name:") and "Location:" in line
+
+class RunWriter:
+    """Writes fill_template's runs straight into `w:p` elements."""
+
+    def __init__(self):
+        self.prototypes = _run_prototypes()
+        # What paragraph_format.line_spacing = LINE_SPACING writes: 240ths of a line
+        self.line_spacing = str(round(LINE_SPACING * 240))
+
+    def clear(self, p):
+        """Remove the paragraph's content, keeping its properties (paragraph.clear())."""
+        for child in list(p):
+            if child.tag != W_NS + "pPr" and isinstance(child.tag, str):
+                p.remove(child)
+
+    def add_run(self, p, text: str, kind: str = NORMAL):
+        r = copy.deepcopy(self.prototypes[kind])
+        if text:
+            if "\t" in text or "\n" in text or "\r" in text:
+                r.text = text  # tabs and line breaks become their own elements
+            else:
+                r.add_t(text)
+        p.append(r)
+
+    def add_marked_runs(self, p, text: str):
+        """Runs for text with <<<BOLD>>>...<<<END_BOLD>>> markers."""
+        for i, part in enumerate(text.split("<<<BOLD>>>")):
+            if i == 0 and part:
+                # Text before first bold marker
+                self.add_run(p, part, PLAIN)
+            elif "<<<END_BOLD>>>" in part:
+                bold_parts = part.split("<<<END_BOLD>>>")
+                self.add_run(p, bold_parts[0], BOLD)
+                # Add remaining text if any
+                if len(bold_parts) > 1 and bold_parts[1]:
+                    self.add_run(p, bold_parts[1], PLAIN)
+
+    def add_paragraph(self, tc):
+        """A new paragraph at the end of a table cell."""
+        return tc.add_p()
+
+    def set_line_spacing(self, p):
+        pPr = p[0] if len(p) and p[0].tag == W_NS + "pPr" else p.get_or_add_pPr()
+        spacing = pPr.find(W_NS + "spacing")
+        if spacing is None:
+            spacing = pPr.get_or_add_spacing()  # inserted in schema order
+        spacing.set(W_NS + "line", self.line_spacing)
+        spacing.set(W_NS + "lineRule", "auto")
+
+def fill_template(doc: Document, d: Dict[str, Any], plan: Optional["TemplatePlan"] = None,
+                  report=logger.warning) -> Document:
+    """Fill template with proper formatting and delete unused experience rows.
+    
+    `plan` must have been compiled from `doc` or from the template `doc` was
+    cloned from; without one the document is planned on the spot.
+    """
+    if plan is None:
+        plan = TemplatePlan(doc)
+    
+    # Placeholders are resolved lazily, one regex scan per paragraph
+    resolver = PlaceholderResolver(d)
+    experiences_with_data = resolver.experiences_with_data
+    writer = RunWriter()
+    
+    # Resolve every planned location before anything is removed, since the
+    # recorded paths are child indices into the untouched template body
+    body_targets, table_targets = plan.locate(doc)
+    
+    # Process paragraphs
+    paragraphs_to_remove = []
+    for p, original_text in body_targets:
+        new_text = original_text
+        
+        # Apply replacements
+        new_text = resolver.substitute(new_text)
+        
+        # Check if this paragraph is part of a deleted experience section
+        if "<<<DELETE_EXPERIENCE>>>" in new_text:
+            paragraphs_to_remove.append(p)
+            continue
+        
+        # Check if this line should be removed (empty responsibility)
+        if "<<<REMOVE_THIS_LINE>>>" in new_text:
+            # For regular paragraphs, only remove if it's just the marker
+            if new_text.strip() in ["<<<REMOVE_THIS_LINE>>>", "- <<<REMOVE_THIS_LINE>>>"]:
+                paragraphs_to_remove.append(p)
+                continue
+            else:
+                # Replace the marker with empty string in the text
+                new_text = new_text.replace("<<<REMOVE_THIS_LINE>>>", "")
+        
+        # If text changed, update with formatting
+        if new_text != original_text:
+            writer.clear(p)
+            # Remove the bullet point if the line only contains "-"
+            if new_text.strip() != "-":
+                if "<<<BOLD>>>" in new_text and "<<<END_BOLD>>>" in new_text:
+                    writer.add_marked_runs(p, new_text)
+                else:
+                    # No bold markers, normal text
+                    writer.add_run(p, new_text)
+                writer.set_line_spacing(p)
+    
+    # Remove empty paragraphs
+    for p in paragraphs_to_remove:
+        p.getparent().remove(p)
+    
+    # Process tables and handle row deletion
+    for tbl, rows in table_targets:
+        rows_to_delete = []
+        
+        # First pass: identify rows to delete
+        for row_idx, (tr, exp_nums, cells) in enumerate(rows):
+            if exp_nums - experiences_with_data:
+                # This row contains placeholders for an experience we don't have data for
+                rows_to_delete.append(row_idx)
+        
+        # Second pass: process cells in rows we're keeping
+        for row_idx, (tr, exp_nums, cells) in enumerate(rows):
+            if row_idx in rows_to_delete:
+                continue  # Skip rows marked for deletion
+                
+            for tc, cell_paragraphs in cells:
+                paragraphs_to_remove = []
+                for p, original_text in cell_paragraphs:
+                    new_text = original_text
+                    
+                    # Apply replacements
+                    new_text = resolver.substitute(new_text)
+                    
+                    # Skip if it's marked for deletion
+                    if "<<<DELETE_EXPERIENCE>>>" in new_text:
+                        continue
+                    
+                    # Check if this line should be removed
+                    if "<<<REMOVE_THIS_LINE>>>" in new_text:
+                        # Check if it's a complete line with just the marker and possibly a bullet
+                        if new_text.strip() in ["<<<REMOVE_THIS_LINE>>>", "- <<<REMOVE_THIS_LINE>>>"]:
+                            paragraphs_to_remove.append(p)
+                            continue
+                        else:
+                            # Replace the marker with empty string
+                            new_text = new_text.replace("<<<REMOVE_THIS_LINE>>>", "")
+                    
+                    # If text changed, update with formatting
+                    if new_text != original_text:
+                        writer.clear(p)
+                        
+                        # Skip if it's just a bullet point with no content
+                        if new_text.strip() == "-":
+                            paragraphs_to_remove.append(p)
+                            continue
+                        
+                        if "<<<BOLD>>>" in new_text and "<<<END_BOLD>>>" in new_text:
+                            writer.add_marked_runs(p, new_text)
+                        # Handle multi-line content (like skills/certs)
+                        elif '\n' in new_text:
+                            for idx, line in enumerate(new_text.split('\n')):
+                                if idx > 0:
+                                    p = writer.add_paragraph(tc)
+                                # Project headers (with or without Duration) are bold as a whole
+                                writer.add_run(p, line, BOLD if _is_project_header(line) else NORMAL)
+                                writer.set_line_spacing(p)
+                        else:
+                            writer.add_run(p, new_text, BOLD if _is_project_header(new_text) else NORMAL)
+                            writer.set_line_spacing(p)
+                # Remove empty paragraphs from cells
+                for p in paragraphs_to_remove:
+                    try:
+                        p.getparent().remove(p)
+                    except:
+                        pass  # Some paragraphs might be required by the table structure
+        
+        # Third pass: Actually delete the rows (in reverse order to maintain indices)
+        for row_idx in sorted(rows_to_delete, reverse=True):
+            try:
+                tbl.remove(rows[row_idx][0])
+            except Exception as e:
+                report(f"Could not delete row {row_idx}: {str(e)}")
+    
+    return doc
+
+def safe_filename(name: str) -> str:
+    return re.sub(r'[\\/*?:"<>|]', "_", name).strip() or "output"
+
+# ────────────────────────────────────────────────────────────────
+#  Batch conversion
+# ────────────────────────────────────────────────────────────────
+def record_digest(data: Dict[str, Any]) -> str:
+    """Content hash of an extracted record: equal digests render the same document."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def convert_cv(cv, extractor, plan: TemplatePlan, use_cache: bool = True,
+               on_field=None) -> Dict[str, Any]:
+    """Convert one uploaded CV; safe to run on a worker thread.
+    
+    Warnings and errors are collected as (level, message) pairs for the
+    caller to display or log, and streamed fields are handed to
+    on_field(key, value). A CV whose Gemini extraction failed is still
+    rendered (from empty data), with "extracted" set to False.
+    
+    "metrics" holds the seconds spent in each stage, the extraction cache
+    outcome and the Gemini usage of this CV; it is also recorded in
+    cv_metrics.
+    """
+    began = time.perf_counter()
+    messages = []
+    warn = lambda msg: messages.append(("warning", msg))
+    extraction_errors = []
+    timings = {}
+    usage = {}
+    
+    def metrics(status):
+        record = {key: value for key, value in usage.items() if key != "gemini_seconds"}
+        record["seconds"] = dict(timings)
+        if "gemini_seconds" in usage:
+            record["seconds"]["gemini"] = usage["gemini_seconds"]
+        record["seconds"]["total"] = time.perf_counter() - began
+        cv_metrics.record_conversion(status, record)
+        return record
+    
+    def extraction_report(msg):
+        extraction_errors.append(msg)
+        warn(msg)
+    
+    def timed(stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[stage] = time.perf_counter() - start
+    
+    # Extract text
+    text = timed("extract_text", extract_text, cv, report=lambda msg: messages.append(("error", msg)))
+    if not text:
+        warn(f"⚠️ Could not extract text from {cv.name}")
+        return {"result": None, "messages": messages, "metrics": metrics("no_text")}
+    
+    # Strip headers/footers, page numbers and other noise before prompting
+    text, text_stats = timed("preprocess", preprocess_cv_text, text)
+    
+    # Extract structured data
+    data = timed("extract", extractor.extract, text, report=extraction_report,
+                 use_cache=use_cache, on_field=on_field, stats=usage)
+    
+    # Fill template
+    filled = timed("render", render_cv, plan, data, report=warn)
+    
+    # Save to buffer
+    buf = BytesIO()
+    timed("save", filled.save, buf)
+    buf.seek(0)
+    
+    return {
+        "result": {
+            "name": data.get("candidate_name", cv.name),
+            "buffer": buf,
+            "data": data,
+            "text_stats": text_stats,
+            "extracted": not extraction_errors
+        },
+        "messages": messages,
+        "metrics": metrics("extraction_failed" if extraction_errors else "converted")
+    }
+
+def rerender_cv(plan: TemplatePlan, data: Dict[str, Any], current: Optional[Dict[str, Any]] = None,
+                report=logger.warning) -> tuple:
+    """Render an edited record again, without calling Gemini.
+    
+    The record is normalized as extracted ones are (names, durations,
+    defaults). Returns (record, buffer, seconds); buffer is None when it
+    normalizes to the same record as `current`, the one rendered last time,
+    i.e. that document is still up to date.
+    """
+    began = time.perf_counter()
+    record = RECORD_VALIDATOR.validate(copy.deepcopy(data), require=False)[0]
+    if current is not None:
+        current = RECORD_VALIDATOR.validate(copy.deepcopy(current), require=False)[0]
+        if record_digest(record) == record_digest(current):
+            return record, None, 0.0
+    buf = BytesIO()
+    render_cv(plan, record, report).save(buf)
+    buf.seek(0)
+    seconds = time.perf_counter() - began
+    cv_metrics.STAGE_SECONDS.observe(seconds, stage="rerender")
+    return record, buf, seconds
+
+# ────────────────────────────────────────────────────────────────
+#  Batch export
+# ────────────────────────────────────────────────────────────────
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class BatchArchive:
+    """ZIP of a batch's converted CVs, built in a temporary file.
+
+    Documents are appended as they finish, so the archive is never
+    assembled in memory (whoever serves it may still read it whole). The
+    file is deleted by discard(), when the archive is garbage collected, or
+    at interpreter exit.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix="cv_export_", suffix=".zip", dir=directory or None)
+        os.close(fd)
+        # DOCX files are already deflated; compressing them again gains nothing
+        self._zip = zipfile.ZipFile(self.path, "w", zipfile.ZIP_STORED)
+        self._lock = threading.Lock()
+        self._names = set()
+        self.count = 0
+        self._finalizer = weakref.finalize(self, _remove_file, self.path)
+
+    def add(self, filename: str, document):
+        """Append a rendered document (a binary file object) as filename."""
+        stem, ext = os.path.splitext(filename)
+        with self._lock:
+            name, n = filename, 1
+            while name in self._names:
+                n += 1
+                name = f"{stem} ({n}){ext}"
+            self._names.add(name)
+            document.seek(0)
+            with self._zip.open(name, "w") as entry:
+                shutil.copyfileobj(document, entry)
+            document.seek(0)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._zip.close()
+
+    def open(self):
+        """Binary file object for reading the finished archive."""
+        return open(self.path, "rb")
+
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def discard(self):
+        self.close()
+        self._finalizer()
@@ -0,0 +1,102 @@
+# cv_dates.py - Date and duration normalization
+# -----------------------------------------------------------------
+# Experience durations come back from Gemini in whatever form the CV used:
+# "Sep-2015 - Present", "09/2015 – 06/2018", "Nov'23 to till date",
+# "2015-2018". format_duration() turns them into the template's
+# "MMM YYYY - MMM YYYY" (or "MMM YYYY - Present"); format_date() does the
+# same for one end. month_number() reads one end as a number of months, for
+# comparing and spanning durations (cv_core.span_durations, cv_rules).
+#
+# The patterns are compiled once at import. The same few dozen durations
+# recur across a batch, so both formatters are memoized in bounded LRU
+# caches (DATE_CACHE_SIZE entries each). normalize_many() formats the
+# durations of a whole record at once.
+#
+# Standard library only; nothing here imports streamlit.
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+PRESENT_WORDS = frozenset(("present", "current", "ongoing", "till date", "now", "till now", "to date",
+                           "date", "today"))
+PRESENT = 10 ** 6  # month number of "Present", later than any real date
+DATE_CACHE_SIZE = 4096
+
+# Between the two ends: a spaced dash, "to", "till", or an en/em dash
+RANGE_SEPARATOR_RE = re.compile(r"\s+(?:[-–—~]|to|till|until)\s+|\s*[–—]\s*", re.IGNORECASE)
+# Otherwise an unspaced hyphen right after a year: "2015-2018", "Sep-2015-Present", "Nov'23-Present"
+YEAR_HYPHEN_RE = re.compile(r"(?<=\d{4})\s*-\s*|(?<=['’]\d{2})\s*-\s*")
+MONTH_YEAR_RE = re.compile(r"([A-Za-z]{3,})[\s.,'’/-]*(\d{4})")
+NUMERIC_MONTH_YEAR_RE = re.compile(r"(\d{1,2})[/.-](\d{4})")
+SHORT_YEAR_RE = re.compile(r"([A-Za-z]{3,})\.?\s*['’](\d{2})\b")  # Nov'23
+YEAR_RE = re.compile(r"\d{4}")
+
+def split_duration(duration: str) -> List[str]:
+    """The start and end of a duration, or just the one date when there is no separator."""
+    duration = duration.strip()
+    parts = RANGE_SEPARATOR_RE.split(duration, maxsplit=1)
+    if len(parts) == 1:
+        parts = YEAR_HYPHEN_RE.split(duration, maxsplit=1)
+    return [part.strip() for part in parts]
+
+def _is_present(text: str) -> bool:
+    return text.lower().rstrip(".") in PRESENT_WORDS
+
+def _month_year(text: str) -> Optional[Tuple[int, Optional[int]]]:
+    """(year, month index or None) of one date; None when it has no year."""
+    match = MONTH_YEAR_RE.search(text)
+    if match and match.group(1)[:3].lower() in MONTHS:
+        return int(match.group(2)), MONTHS.index(match.group(1)[:3].lower())
+    match = NUMERIC_MONTH_YEAR_RE.search(text)
+    if match and 1 <= int(match.group(1)) <= 12:
+        return int(match.group(2)), int(match.group(1)) - 1
+    match = SHORT_YEAR_RE.search(text)
+    if match and match.group(1)[:3].lower() in MONTHS:
+        year = int(match.group(2))
+        return year + (2000 if year < 50 else 1900), MONTHS.index(match.group(1)[:3].lower())
+    match = YEAR_RE.search(text)
+    return (int(match.group(0)), None) if match else None
+
+def month_number(text: str) -> Optional[int]:
+    """Months since year 0 for one end of a duration (PRESENT for "Present"); None when unreadable."""
+    text = text.strip()
+    if _is_present(text):
+        return PRESENT
+    found = _month_year(text)
+    if found is None:
+        return None
+    year, month = found
+    return year * 12 + (month or 0)
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def format_date(date_str: str) -> str:
+    """Convert various date formats to MMM YYYY format."""
+    date_str = date_str.strip()
+    if not date_str:
+        return ""
+    if _is_present(date_str):
+        return "Present"
+    found = _month_year(date_str)
+    if found is None or found[1] is None:
+        return date_str  # a bare year, or nothing readable: as written
+    year, month = found
+    return f"{MONTHS[month].upper()} {year}"
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def format_duration(duration: str, is_first_experience: bool = False) -> str:
+    """Format duration string to MMM YYYY - MMM YYYY format."""
+    if not duration or not duration.strip():
+        return ""
+    parts = split_duration(duration)
+    if len(parts) == 2:
+        return f"{format_date(parts[0])} - {format_date(parts[1])}"
+    start = format_date(parts[0])
+    # The first (current) experience with only a start date is still ongoing
+    if is_first_experience and start != "Present" and _month_year(parts[0]) is not None:
+        return f"{start} - Present"
+    return start
+
+def normalize_many(durations: List[str]) -> List[str]:
+    """format_duration for a record's experiences, in order; the first is the current one."""
+    return [format_duration(duration, i == 0) for i, duration in enumerate(durations)]
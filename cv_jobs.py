@@ -0,0 +1,263 @@
+# cv_jobs.py - Background conversion jobs
+# -----------------------------------------------------------------
+# A batch of CVs is submitted as a job to a worker pool that belongs to the
+# process, not to a Streamlit script run, so reruns, widget interactions and
+# browser refreshes no longer throw work away. The page polls the job and
+# shows per-CV status; results are recorded on the job as each CV finishes.
+#
+# Job ids are a hash of the owner, the template, the CVs and the options, so
+# submitting the same batch again returns the existing job instead of
+# starting duplicate work (callers that want fresh work, such as a cache
+# bypass, add a unique option).
+#
+# Nothing here imports streamlit; workers only update job objects.
+import hashlib, json, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from cv_core import BatchArchive, HEADER_FIELDS, convert_cv, record_digest, rerender_cv, safe_filename
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+def make_job_id(owner: str, template: bytes, sources: List[Any], options: Dict[str, Any]) -> str:
+    """Content hash identifying a batch; sources are objects with .name and .getvalue()."""
+    h = hashlib.sha256()
+    h.update(owner.encode("utf-8") + b"\0")
+    h.update(hashlib.sha256(template).digest())
+    for source in sorted(sources, key=lambda s: s.name):
+        h.update(source.name.encode("utf-8") + b"\0")
+        h.update(hashlib.sha256(source.getvalue()).digest())
+    h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+class ConversionJob:
+    """Status and results of one batch, updated by worker threads.
+
+    Each item is {"name", "status", "messages", "result", "seconds"};
+    `completed` lists item indexes in the order they finished.
+    """
+
+    def __init__(self, job_id: str, owner: str, sources: List[Any], archive=None, plan=None):
+        self.id = job_id
+        self.owner = owner
+        self.archive = archive
+        self.plan = plan  # the compiled template, for re-rendering edited CVs
+        self.created = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancelled = False
+        self.items = [{"name": s.name, "status": QUEUED, "messages": [], "result": None, "seconds": 0.0}
+                      for s in sources]
+        self.completed: List[int] = []
+        self.headers: Dict[str, Dict[str, Any]] = {}  # fields streamed in so far, per CV
+        self._sources = list(sources)
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def progress(self) -> Tuple[int, int]:
+        with self._lock:
+            return len(self.completed), len(self.items)
+
+    def results(self) -> List[Dict[str, Any]]:
+        """Results of the converted CVs, in the order they finished."""
+        with self._lock:
+            return [self.items[i]["result"] for i in self.completed if self.items[i]["result"]]
+
+    def messages(self) -> List[Tuple[str, str]]:
+        """(level, message) pairs of the finished CVs, in the order they finished."""
+        with self._lock:
+            return [message for i in self.completed for message in self.items[i]["messages"]]
+
+    def failures(self) -> List[Tuple[str, str]]:
+        """(CV name, error text) of the CVs that produced no document, in the order they finished."""
+        with self._lock:
+            failed = [self.items[i] for i in self.completed if self.items[i]["status"] == FAILED]
+        failures = []
+        for item in failed:
+            errors = [msg for level, msg in item["messages"] if level == "error"]
+            messages = errors or [msg for _, msg in item["messages"]] or ["no document produced"]
+            failures.append((item["name"], "; ".join(messages)))
+        return failures
+
+    def update_result(self, result: Dict[str, Any], **changes):
+        """Change a finished CV's result (one returned by results()) in place."""
+        with self._lock:
+            result.update(changes)
+
+    def replace_archive(self, archive):
+        """Swap in a rebuilt archive and delete the old one's file."""
+        with self._lock:
+            old, self.archive = self.archive, archive
+        if old is not None:
+            old.discard()
+
+    def record_field(self, name: str, key: str, value):
+        with self._lock:
+            self.headers.setdefault(name, {})[key] = value
+
+    def streamed_headers(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(fields) for name, fields in self.headers.items()}
+
+    def _start(self, index: int):
+        with self._lock:
+            if self.cancelled:
+                return None
+            self.items[index]["status"] = RUNNING
+            return self._sources[index]
+
+    def _finish(self, index: int, status: str, result, messages, seconds: float):
+        with self._lock:
+            item = self.items[index]
+            item.update(status=status, result=result, messages=list(messages), seconds=seconds)
+            self._sources[index] = None  # the uploaded bytes are no longer needed
+            self.completed.append(index)
+            last = len(self.completed) == len(self.items)
+        if last:
+            if self.archive is not None:
+                self.archive.close()
+            self.finished_at = time.time()
+
+class JobQueue:
+    """Process-wide worker pool running conversion jobs, one CV per task.
+
+    `work(job, source)` converts one CV and returns (result, messages),
+    where result is None for a CV that produced no document.
+    """
+
+    def __init__(self, workers: int, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cv-job")
+        self._jobs: Dict[str, ConversionJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job_id: str, owner: str, sources: List[Any],
+               work: Callable[[ConversionJob, Any], Tuple[Optional[Dict[str, Any]], list]],
+               archive=None, plan=None) -> Tuple[ConversionJob, bool]:
+        """Start a job, or return the existing one with that id; the flag says which."""
+        with self._lock:
+            self._expire(time.time())
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job, False
+            job = ConversionJob(job_id, owner, sources, archive, plan)
+            self._jobs[job_id] = job
+        if not sources:
+            job.finished_at = time.time()
+        for index in range(len(sources)):
+            self._pool.submit(self._run, job, index, work)
+        return job, True
+
+    def _run(self, job: ConversionJob, index: int, work):
+        source = job._start(index)
+        if source is None:
+            job._finish(index, CANCELLED, None, [], 0.0)
+            return
+        began = time.perf_counter()
+        try:
+            result, messages = work(job, source)
+            status = DONE if result else FAILED
+        except Exception as e:
+            result, messages, status = None, [("error", f"❌ Error processing {source.name}: {e}")], FAILED
+        job._finish(index, status, result, messages, time.perf_counter() - began)
+
+    def get(self, job_id: Optional[str]) -> Optional[ConversionJob]:
+        with self._lock:
+            return self._jobs.get(job_id) if job_id else None
+
+    def latest(self, owner: str) -> Optional[ConversionJob]:
+        """The owner's most recent job, e.g. to pick it up again after a page refresh."""
+        with self._lock:
+            self._expire(time.time())
+            jobs = [job for job in self._jobs.values() if job.owner == owner]
+            return max(jobs, key=lambda job: job.created) if jobs else None
+
+    def forget(self, job_id: str):
+        """Drop a job; CVs not yet started are skipped."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job.cancelled = True
+
+    def _expire(self, now: float):
+        for job_id in [i for i, job in self._jobs.items()
+                       if job.finished and job.finished_at < now - self.ttl_seconds]:
+            del self._jobs[job_id]
+
+# ────────────────────────────────────────────────────────────────
+#  Converting one CV of a job
+# ────────────────────────────────────────────────────────────────
+SUMMARY_FIELDS = ("position", "total_experience_years", "email", "phone")
+
+def result_summary(data: dict) -> dict:
+    """The extracted fields the results list shows; the full data stays on disk."""
+    experiences = [exp for exp in data.get('experiences', [])
+                   if exp.get('company') and exp.get('company') != 'N/A']
+    summary = {key: data[key] for key in SUMMARY_FIELDS if key in data}
+    summary["experience_count"] = len(experiences)
+    summary["experiences"] = [{"company": exp["company"], "role": exp.get("role", "")}
+                              for exp in experiences[:3]]
+    return summary
+
+def convert_job_cv(job: ConversionJob, cv, extractor, plan, use_cache: bool, store):
+    """Convert one CV of a job on a worker thread and put the document in `store`."""
+    def on_field(key, value):
+        if key in HEADER_FIELDS and value:
+            job.record_field(cv.name, key, value)
+    
+    outcome = convert_cv(cv, extractor, plan, use_cache, on_field)
+    result = outcome["result"]
+    if not result:
+        return None, outcome["messages"]
+    
+    job.archive.add(safe_filename(f"{result['name']}_Formatted.docx"), result["buffer"])
+    # Only small metadata stays in memory; the document and data go to disk
+    return {
+        "id": store.put(job.id, result["name"], result["buffer"], result["data"]),
+        "name": result["name"],
+        "summary": result_summary(result["data"]),
+        "digest": record_digest(result["data"]),
+        "text_stats": result["text_stats"],
+        "extracted": result["extracted"],
+        "metrics": outcome["metrics"],
+    }, outcome["messages"]
+
+def rerender_job_cv(job: ConversionJob, conv: Dict[str, Any], data: Dict[str, Any], store,
+                    current: Optional[Dict[str, Any]] = None) -> Optional[float]:
+    """Render an edited record of a finished CV again, without calling Gemini.
+    
+    `current` is the record stored for the CV (read from `store` if not
+    given). The new document replaces the old one in `store`. Returns the
+    seconds it took, or None when the edited record normalizes to the
+    current one and nothing was rendered.
+    """
+    if current is None:
+        current = store.load_data(conv["id"])
+    data, buffer, seconds = rerender_cv(job.plan, data, current)
+    if buffer is None:
+        return None
+    name = data.get("candidate_name") or conv["name"]
+    old_id = conv["id"]
+    job.update_result(conv, id=store.put(job.id, name, buffer, data), name=name,
+                      summary=result_summary(data), digest=record_digest(data), edited=True,
+                      rerender_seconds=seconds)
+    store.delete(old_id)
+    rebuild_archive(job, store)
+    return seconds
+
+def rebuild_archive(job: ConversionJob, store):
+    """Write the job's ZIP again from the documents now in `store`, e.g. after a re-render.
+    
+    Entries are added in the order the CVs finished, as during conversion.
+    """
+    if job.archive is None:
+        return
+    archive = BatchArchive(os.path.dirname(job.archive.path))
+    for result in job.results():
+        document = store.read_document(result["id"])
+        if document is not None:
+            archive.add(safe_filename(f"{result['name']}_Formatted.docx"), BytesIO(document))
+    archive.close()
+    job.replace_archive(archive)
@@ -0,0 +1,235 @@
+# cv_metrics.py - Conversion metrics in the Prometheus text format
+# -----------------------------------------------------------------
+# Counters and histograms for the conversion pipeline: seconds per stage
+# (text extraction, Gemini, template fill, DOCX save, ...), Gemini requests,
+# retries, field repairs and tokens, extraction cache outcomes and
+# conversion results.
+#
+# The process-wide METRICS registry can be exported two ways, both off by
+# default:
+#   - a text file rewritten every few seconds, for node_exporter's textfile
+#     collector or any agent that tails files (metrics_file setting)
+#   - a small HTTP endpoint serving GET /metrics (metrics_port setting)
+#
+# The same numbers are kept per CV in the "metrics" record convert_cv
+# returns, so slow or token-hungry CVs can be found individually.
+#
+# Standard library only; nothing here imports streamlit.
+import os, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(tuple(str(labels[name]) for name in self.labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labels, key)} {_number(value)}"
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, list(entry)) for key, entry in self._values.items())
+        for key, entry in items:
+            bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, entry[:-2] + [entry[-1]]):
+                yield f"{self.name}_bucket{_labels(self.labels + ('le',), key + (bound,))} {count}"
+            yield f"{self.name}_sum{_labels(self.labels, key)} {_number(entry[-2])}"
+            yield f"{self.name}_count{_labels(self.labels, key)} {entry[-1]}"
+
+class Registry:
+    """A set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = STAGE_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+# ────────────────────────────────────────────────────────────────
+#  Conversion metrics
+# ────────────────────────────────────────────────────────────────
+METRICS = Registry()
+
+STAGE_SECONDS = METRICS.histogram(
+    "cv_stage_seconds", "Seconds spent per CV in each conversion stage.", ("stage",))
+GEMINI_SECONDS = METRICS.histogram(
+    "cv_gemini_request_seconds", "Seconds per Gemini request, including streaming.", ("kind",))
+GEMINI_REQUESTS = METRICS.counter(
+    "cv_gemini_requests_total",
+    "Gemini requests by kind (single, packed, chunk or repair) and outcome (ok, error or cancelled).",
+    ("kind", "outcome"))
+GEMINI_RETRIES = METRICS.counter(
+    "cv_gemini_retries_total", "Gemini calls retried after a transient transport error.")
+GEMINI_HEDGES = METRICS.counter(
+    "cv_gemini_hedges_total", "Hedged Gemini requests, by whether the hedge answered first.", ("outcome",))
+GEMINI_REJECTED = METRICS.counter(
+    "cv_gemini_rejected_total", "Gemini calls failed fast because the circuit breaker was open.")
+FIELD_REPAIRS = METRICS.counter(
+    "cv_field_repairs_total", "Extracted fields asked for again after a missing or malformed answer, "
+    "by field and outcome (repaired or failed).", ("field", "outcome"))
+RULE_FIELDS = METRICS.counter(
+    "cv_rule_fields_total", "Fields filled by the local pre-extractor, by field and use "
+    "(skipped: not asked of Gemini; packed: kept over a packed answer; fallback: Gemini failed).",
+    ("field", "use"))
+PACKED_TIMEOUTS = METRICS.counter(
+    "cv_packed_timeouts_total", "CVs extracted alone after their packed request timed out, by whether "
+    "the pack had been sent (sent: the CV was asked for twice) or was still queued.", ("pack",))
+GEMINI_TOKENS = METRICS.counter(
+    "cv_gemini_tokens_total", "Gemini tokens reported by the API, by direction.", ("direction",))
+CV_TOKENS = METRICS.histogram(
+    "cv_tokens", "Gemini tokens per converted CV, by direction.", ("direction",), TOKEN_BUCKETS)
+CACHE_OUTCOMES = METRICS.counter(
+    "cv_extraction_cache_total", "Extraction cache outcome per CV (hit, miss or bypass).", ("outcome",))
+CONVERSIONS = METRICS.counter(
+    "cv_conversions_total", "CVs processed by result (converted, extraction_failed or no_text).", ("status",))
+
+def record_gemini_request(kind: str, outcome: str, seconds: float, usage: Dict[str, int]):
+    """Count one Gemini request; called once per request, packed or not."""
+    GEMINI_REQUESTS.inc(kind=kind, outcome=outcome)
+    GEMINI_SECONDS.observe(seconds, kind=kind)
+    for direction in ("input", "output"):
+        if usage.get(f"{direction}_tokens"):
+            GEMINI_TOKENS.inc(usage[f"{direction}_tokens"], direction=direction)
+
+def record_conversion(status: str, metrics: Dict[str, Any]):
+    """Observe the per-CV metrics record built by convert_cv."""
+    CONVERSIONS.inc(status=status)
+    for stage, seconds in metrics.get("seconds", {}).items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    if metrics.get("cache"):
+        CACHE_OUTCOMES.inc(outcome=metrics["cache"])
+    for direction in ("input", "output"):
+        if metrics.get(f"{direction}_tokens"):
+            CV_TOKENS.observe(metrics[f"{direction}_tokens"], direction=direction)
+
+# ────────────────────────────────────────────────────────────────
+#  Export
+# ────────────────────────────────────────────────────────────────
+def write_textfile(path: str, registry: Registry = METRICS):
+    """Write the metrics atomically, as textfile collectors expect."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(path + ".tmp", path)
+
+def serve(port: int, host: str = "127.0.0.1", registry: Registry = METRICS) -> ThreadingHTTPServer:
+    """Serve GET /metrics on a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="cv-metrics", daemon=True).start()
+    return server
+
+class MetricsExporter:
+    """Publishes a registry as a periodically rewritten file and/or over HTTP."""
+
+    def __init__(self, path: str = "", port: int = 0, host: str = "127.0.0.1",
+                 interval: float = 15.0, registry: Registry = METRICS):
+        self.path = path
+        self.registry = registry
+        self.server: Optional[ThreadingHTTPServer] = serve(port, host, registry) if port else None
+        self._stop = threading.Event()
+        if path:
+            threading.Thread(target=self._write_every, args=(interval,), name="cv-metrics-file",
+                             daemon=True).start()
+
+    def _write_every(self, interval: float):
+        while True:
+            try:
+                write_textfile(self.path, self.registry)
+            except OSError:
+                pass  # a full or read-only disk must not stop conversions; retried next time
+            if self._stop.wait(interval):
+                return
+
+    def close(self):
+        self._stop.set()
+        if self.path:
+            write_textfile(self.path, self.registry)
+        if self.server is not None:
+            self.server.shutdown()
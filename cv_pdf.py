@@ -0,0 +1,208 @@
+# cv_pdf.py - PDF text extraction for the CV converter
+# -----------------------------------------------------------------
+# Extraction is tiered: every page first goes through PyPDF2's plain
+# text-stream pass ("fast" tier). Pages whose text scores badly (too sparse,
+# letters spaced apart, words run together, fragmented lines) are re-read
+# with pdfplumber's layout analysis ("layout" tier).
+#
+# Small PDFs are read in-process. Large ones (portfolio-style CVs) are split
+# into page ranges and extracted on a shared process pool, then stitched back
+# together in page order.
+#
+# This lives outside cv_converter.py because pool workers have to import the
+# task function, and Streamlit runs the app script as a synthetic __main__.
+# PyPDF2 and pdfplumber are imported on the first PDF, not at app start.
+import os, re, threading, time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    import PyPDF2
+
+PARALLEL_MIN_PAGES = 12  # below this, pool overhead outweighs the gain
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+FAST_TIER = "fast"      # PyPDF2 text-stream extraction
+LAYOUT_TIER = "layout"  # pdfplumber layout analysis
+
+FAST_MIN_SCORE = 0.6    # fast-tier pages scoring below this are re-read
+MIN_PAGE_CHARS = 200    # pages with less text than this score proportionally lower
+
+WORD_RE = re.compile(r"\S+")
+
+class PageText(NamedTuple):
+    text: str
+    tier: str
+    fast_seconds: float    # time spent in the fast pass (also on fallback pages)
+    layout_seconds: float  # time spent in pdfplumber, 0 for fast-tier pages
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _clean(text: Optional[str]) -> str:
+    if not text:
+        return ""
+    return text.encode('utf-8', errors='ignore').decode('utf-8')
+
+def score_page_text(text: str) -> float:
+    """Rate fast-tier output from 0 (unusable) to 1 (clean)."""
+    words = WORD_RE.findall(text)
+    if not words:
+        return 0.0
+    lines = [line for line in text.splitlines() if line.strip()]
+
+    density = min(1.0, len(text.strip()) / MIN_PAGE_CHARS)
+    # "E x p e r i e n c e": glyphs emitted one by one
+    spaced_letters = sum(1 for w in words if len(w) == 1 and w.isalpha()) / len(words)
+    # "ManagedteamofengineersacrossDubai": missing inter-word spacing
+    run_together = sum(1 for w in words if len(w) > 25 and w.isalpha()) / len(words)
+    # Lines of one or two characters: content stream out of reading order
+    fragmented = sum(1 for line in lines if len(line.strip()) <= 2) / max(1, len(lines))
+
+    score = density - 2 * spaced_letters - 4 * run_together - fragmented
+    return max(0.0, min(1.0, score))
+
+def _fast_reader(pdf_bytes: bytes) -> Optional["PyPDF2.PdfReader"]:
+    """PyPDF2 reader, or None for files only pdfplumber can open."""
+    import PyPDF2
+    try:
+        return PyPDF2.PdfReader(BytesIO(pdf_bytes))
+    except Exception:
+        return None
+
+def _page_count(pdf_bytes: bytes) -> int:
+    reader = _fast_reader(pdf_bytes)
+    if reader is not None:
+        return len(reader.pages)
+    import pdfplumber
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        return len(pdf.pages)
+
+def extract_page_range(pdf_bytes: bytes, start: int, end: int) -> List[PageText]:
+    """Tiered text of pages [start, end); also runs inside pool workers."""
+    reader = _fast_reader(pdf_bytes)
+    plumber = None
+    pages = []
+    try:
+        for i in range(start, end):
+            began = time.perf_counter()
+            try:
+                text = _clean(reader.pages[i].extract_text()) if reader else ""
+            except Exception:
+                text = ""
+            fast_seconds = time.perf_counter() - began
+
+            if score_page_text(text) >= FAST_MIN_SCORE:
+                pages.append(PageText(text, FAST_TIER, fast_seconds, 0.0))
+                continue
+
+            began = time.perf_counter()
+            if plumber is None:
+                import pdfplumber
+                plumber = pdfplumber.open(BytesIO(pdf_bytes))
+            text = _clean(plumber.pages[i].extract_text())
+            pages.append(PageText(text, LAYOUT_TIER, fast_seconds, time.perf_counter() - began))
+    finally:
+        if plumber is not None:
+            plumber.close()
+    return pages
+
+class TierStats:
+    """Process-wide page counts and timings per extraction tier."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = {FAST_TIER: 0, LAYOUT_TIER: 0}
+        self.fast_seconds = 0.0
+        self.layout_seconds = 0.0
+
+    def record(self, pages: List[PageText]):
+        with self._lock:
+            for page in pages:
+                self.pages[page.tier] += 1
+                self.fast_seconds += page.fast_seconds
+                self.layout_seconds += page.layout_seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        """Counts plus an estimate of the layout-analysis time avoided.
+
+        The saving prices every fast-tier page at the mean pdfplumber cost of
+        the pages that did fall back, minus all time spent in the fast pass.
+        """
+        with self._lock:
+            fast, layout = self.pages[FAST_TIER], self.pages[LAYOUT_TIER]
+            saved = 0.0
+            if layout:
+                saved = fast * (self.layout_seconds / layout) - self.fast_seconds
+            return {
+                "fast_pages": fast,
+                "layout_pages": layout,
+                "fast_seconds": self.fast_seconds,
+                "layout_seconds": self.layout_seconds,
+                "estimated_seconds_saved": saved,
+            }
+
+TIER_STATS = TierStats()
+
+def page_ranges(page_count: int, workers: int) -> List[tuple]:
+    """Split page_count pages into at most `workers` contiguous ranges."""
+    size = -(-page_count // workers)  # ceil division
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool shared by every session; rebuilt if the size changes."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: forking the multi-threaded Streamlit server is unsafe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+def _extract_pages(pdf_bytes: bytes, parallel_min_pages: int, workers: int) -> List[PageText]:
+    page_count = _page_count(pdf_bytes)
+    if workers <= 1 or page_count < parallel_min_pages:
+        return extract_page_range(pdf_bytes, 0, page_count)
+
+    pool = _get_pool(workers)
+    try:
+        futures = [pool.submit(extract_page_range, pdf_bytes, start, end)
+                   for start, end in page_ranges(page_count, workers)]
+        pages = []
+        for future in futures:
+            pages.extend(future.result())
+        return pages
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); start over in-process
+        _reset_pool()
+        return extract_page_range(pdf_bytes, 0, page_count)
+
+def configure(parallel_min_pages: int, workers: int):
+    """Set the process-wide defaults used by extract_pdf_pages."""
+    global PARALLEL_MIN_PAGES, DEFAULT_WORKERS
+    PARALLEL_MIN_PAGES = parallel_min_pages
+    DEFAULT_WORKERS = workers
+
+def extract_pdf_pages(pdf_bytes: bytes, parallel_min_pages: Optional[int] = None,
+                      workers: Optional[int] = None) -> List[PageText]:
+    """Return every page's text and the tier that produced it, in page order."""
+    if parallel_min_pages is None:
+        parallel_min_pages = PARALLEL_MIN_PAGES
+    if workers is None:
+        workers = DEFAULT_WORKERS
+    pages = _extract_pages(pdf_bytes, parallel_min_pages, workers)
+    TIER_STATS.record(pages)
+    return pages
@@ -0,0 +1,184 @@
+# cv_preprocess.py - CV text clean-up before prompting
+# -----------------------------------------------------------------
+# Everything extract_text returns is sent to Gemini, so noise costs input
+# tokens and latency. This stage sits between extraction and prompting and
+# removes what carries no information for the extractor:
+#   - header/footer lines repeated across pages (first occurrence kept, since
+#     it often carries the candidate's name and contact details)
+#   - page numbers, decorative separator lines and boilerplate
+#   - consecutive duplicate lines produced by multi-column layouts
+# and normalizes whitespace and bullet glyphs.
+#
+# Pages are separated by form feeds ("\f"), as produced by extract_text.
+#
+# split_cv_sections cuts a long, cleaned CV into its header (everything but
+# work experience) and experience chunks of bounded size, for extracting
+# very long CVs piece by piece.
+import re, unicodedata
+from typing import Any, Dict, List, Tuple
+
+EDGE_LINES = 3            # lines at the top/bottom of a page checked for headers/footers
+REPEATED_PAGE_SHARE = 0.5  # a line on at least this share of pages is a header/footer
+
+# Bullet glyphs, including the Wingdings private-use bullets Word exports;
+# ASCII look-alikes only count when followed by a space
+BULLET_RE = re.compile(r"^(?:[\u2022\u2023\u2043\u2219\u25aa\u25ab\u25cf\u25cb\u25a0\u25a1\u25c6\u25c7"
+                       r"\u25ba\u25b8\u27a2\u27a4\u2794\u2713\u2714\u00b7\uf0a7\uf0b7\uf0d8\uf076]+|[o*>](?=\s))\s*")
+SPACES_RE = re.compile(r"[ \t\u00a0\u2000-\u200b\u202f\u3000]+")
+PAGE_LABEL_RE = re.compile(r"^page\s*\d{1,3}(?:\s*(?:of|/)\s*\d{1,3})?$", re.IGNORECASE)
+# Bare numbers ("3", "- 3 -", "3/5") only count as page numbers when they are
+# the very first or last line of a page
+PAGE_NUMBER_RE = re.compile(r"^-?\s*\d{1,3}\s*-?(?:\s*(?:of|/)\s*\d{1,3})?$", re.IGNORECASE)
+DECORATIVE_RE = re.compile(r"^[\W_]{3,}$")
+DIGITS_RE = re.compile(r"\d+")
+BOILERPLATE_RE = re.compile(
+    r"^(?:curriculum\s+vitae|resume|r[ée]sum[ée]|cv|confidential|"
+    r"references?\s*(?::|are)?\s*(?:will\s+be\s+)?(?:available|provided|furnished)\b.*|"
+    r"i\s+hereby\s+declare\b.*|declaration:?|"
+    r"(?:place|date)\s*:\s*_*)$",
+    re.IGNORECASE,
+)
+
+# Section headings: a short line on its own, optionally followed by a colon
+EXPERIENCE_HEADING_RE = re.compile(
+    r"^(?:(?:work|professional|employment|career|project|relevant)\s+)?"
+    r"(?:experience|history|background)(?:\s+(?:details|summary))?\s*:?$", re.IGNORECASE)
+OTHER_HEADING_RE = re.compile(
+    r"^(?:education(?:al)?(?:\s+\w+)?|academic\s+\w+|qualifications?|(?:technical\s+|key\s+|core\s+)?skills"
+    r"(?:\s+\w+)?|certifications?|certificates|languages?(?:\s+skills)?|personal\s+(?:details|information)"
+    r"|training|awards?|achievements|hobbies|interests|references?)\s*:?$", re.IGNORECASE)
+# A date range such as "Sep 2015 - Present", "09/2015 – 06/2018" or "2015 to till date"
+DATE_RANGE_RE = re.compile(
+    r"(?:[A-Za-z]{3,9}[\s.,'/-]*)?(?:\d{1,2}[/-])?(?:\d{4}|'\d{2})\s*(?:-|–|—|to|till)\s*"
+    r"(?:(?:[A-Za-z]{3,9}[\s.,'/-]*)?(?:\d{1,2}[/-])?(?:\d{4}|'\d{2})|present|current|now|date|till\s+\w+)",
+    re.IGNORECASE)
+JOB_START_LINES = 3  # a job's date range appears within its first few lines
+HEADING_LINE_CHARS = 100
+# Normalized bullets start with "- "; project headings stay inside their job
+PROJECT_LINE_RE = re.compile(r"^\W*(?:project|client|duration)\b", re.IGNORECASE)
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+def normalize_line(line: str) -> str:
+    line = unicodedata.normalize("NFKC", line)
+    line = SPACES_RE.sub(" ", line).strip()
+    if BULLET_RE.match(line):
+        line = BULLET_RE.sub("- ", line, count=1)
+    return line
+
+def _edge_indexes(lines: List[str], depth: int = EDGE_LINES) -> set:
+    """Positions of the first and last `depth` non-blank lines of a page."""
+    filled = [i for i, line in enumerate(lines) if line]
+    return set(filled[:depth] + filled[-depth:])
+
+def _repeated_edge_lines(pages: List[List[str]]) -> set:
+    """Header/footer candidates: edge lines seen on many pages (digits masked)."""
+    if len(pages) < 2:
+        return set()
+    seen_on = {}
+    for lines in pages:
+        for key in {DIGITS_RE.sub("#", lines[i].lower()) for i in _edge_indexes(lines)}:
+            seen_on[key] = seen_on.get(key, 0) + 1
+    threshold = max(2, REPEATED_PAGE_SHARE * len(pages))
+    return {key for key, count in seen_on.items() if count >= threshold}
+
+def preprocess_cv_text(text: str) -> Tuple[str, Dict[str, Any]]:
+    """Return the cleaned CV text and what was removed from it."""
+    pages = [[normalize_line(line) for line in page.splitlines()] for page in text.split("\f")]
+    repeated = _repeated_edge_lines(pages)
+
+    removed = {"repeated": 0, "page_number": 0, "decorative": 0, "boilerplate": 0, "duplicate": 0}
+    kept_repeated = set()
+    out: List[str] = []
+    for lines in pages:
+        edges = _edge_indexes(lines)
+        outermost = _edge_indexes(lines, 1)
+        for i, line in enumerate(lines):
+            if not line:
+                # Keep single blank lines as section breaks
+                if out and out[-1]:
+                    out.append("")
+                continue
+            key = DIGITS_RE.sub("#", line.lower())
+            if key in repeated and i in edges:
+                if key in kept_repeated:
+                    removed["repeated"] += 1
+                    continue
+                kept_repeated.add(key)
+            if PAGE_LABEL_RE.match(line) or (i in outermost and PAGE_NUMBER_RE.match(line)):
+                removed["page_number"] += 1
+            elif DECORATIVE_RE.match(line):
+                removed["decorative"] += 1
+            elif BOILERPLATE_RE.match(line):
+                removed["boilerplate"] += 1
+            elif out and line == out[-1]:
+                removed["duplicate"] += 1
+            else:
+                out.append(line)
+
+    cleaned = "\n".join(out).strip()
+    stats = {
+        "chars_before": len(text),
+        "chars_after": len(cleaned),
+        "tokens_before": estimate_tokens(text),
+        "tokens_after": estimate_tokens(cleaned),
+        "lines_removed": removed,
+    }
+    return cleaned, stats
+
+def _heading_line(line: str) -> bool:
+    """Whether a line could be part of a job's heading (company, role, dates)."""
+    return bool(line) and len(line) <= HEADING_LINE_CHARS and not line.startswith("- ") \
+        and not PROJECT_LINE_RE.match(line)
+
+def _job_blocks(lines: List[str]) -> List[List[str]]:
+    """Split experience lines into blocks that each start a job.
+    
+    A job starts at a heading line with a date range, or up to
+    JOB_START_LINES - 1 heading lines above it (the company line above
+    "Role | Sep 2015 - Present"). Project lines inside a job never start one.
+    """
+    starts, last_dates = [0], -1
+    for i, line in enumerate(lines):
+        if not (_heading_line(line) and DATE_RANGE_RE.search(line)):
+            continue
+        start = i
+        while start - 1 > last_dates and i - start < JOB_START_LINES - 1 and _heading_line(lines[start - 1]):
+            start -= 1
+        if start > starts[-1]:
+            starts.append(start)
+        last_dates = i
+    bounds = starts + [len(lines)]
+    return [block for block in (lines[a:b] for a, b in zip(bounds, bounds[1:])) if any(block)]
+
+def split_cv_sections(text: str, chunk_tokens: int) -> Tuple[str, List[str]]:
+    """Split a cleaned CV into (header, experience chunks).
+    
+    The header is every section except work experience (contact details,
+    summary, education, skills, ...) plus the first lines of every job, so
+    the current position and total experience can still be read from it.
+    The experience section is cut between jobs into chunks of about
+    `chunk_tokens`; a single job longer than that stays whole. Returns the
+    text unchanged and no chunks if no experience section is found.
+    """
+    lines = text.split("\n")
+    start = next((i for i, line in enumerate(lines) if EXPERIENCE_HEADING_RE.match(line)), None)
+    if start is None:
+        return text, []
+    end = next((i for i in range(start + 1, len(lines)) if OTHER_HEADING_RE.match(lines[i])), len(lines))
+    blocks = _job_blocks(lines[start + 1:end])
+    outline = [line for block in blocks for line in [""] + [l for l in block if l][:JOB_START_LINES]]
+    header = "\n".join(lines[:start + 1] + outline + [""] + lines[end:]).strip()
+
+    chunks: List[str] = []
+    current: List[str] = []
+    for block in blocks:
+        if current and estimate_tokens("\n".join(current + block)) > chunk_tokens:
+            chunks.append("\n".join(current).strip())
+            current = []
+        current += block
+    if any(current):
+        chunks.append("\n".join(current).strip())
+    return header, chunks
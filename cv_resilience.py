@@ -0,0 +1,258 @@
+# cv_resilience.py - Deadlines, retries, hedging and a circuit breaker for Gemini
+# -----------------------------------------------------------------
+# ResilientCaller runs one logical model call as a series of attempts:
+#
+#   - every attempt has a deadline, counted from when it starts running
+#     (not while it waits for a worker), and the call as a whole has one
+#   - transient service errors (429, 5xx, timeouts, connection errors) are
+#     retried with exponential backoff and full jitter; malformed or
+#     incomplete output is not, nor is any other error
+#   - optionally, an attempt still running past a latency percentile of
+#     recent successful attempts gets a hedged twin; the first answer wins
+#     and the other is cancelled
+#   - a circuit breaker shared by all calls fails fast while Gemini is down
+#     and lets a single trial call through once the reset time has passed
+#
+# An attempt is a function taking a threading.Event that is set once its
+# result is no longer wanted; streaming attempts check it between chunks.
+# Attempts run on the caller's own thread pool so a stuck one can be
+# abandoned at its deadline.
+#
+# Nothing here imports streamlit or the Gemini client.
+import random, threading, time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+import cv_metrics
+
+class DeadlineExceeded(Exception):
+    """An attempt, or the whole call, ran out of time."""
+
+class CallDeadlineExceeded(DeadlineExceeded):
+    """The whole call ran out of time before an attempt had its full timeout."""
+
+class CircuitOpenError(Exception):
+    """Gemini has been failing; calls fail fast until the breaker resets."""
+
+class AttemptCancelled(Exception):
+    """Raised inside an attempt whose result is no longer wanted."""
+
+class WorkersBusy(Exception):
+    """No worker was free to start an attempt before the call's deadline (local overload)."""
+
+def is_retryable(error: Exception) -> bool:
+    """Whether another attempt could succeed: transient transport and service errors only."""
+    if isinstance(error, (DeadlineExceeded, TimeoutError, ConnectionError)):
+        return True
+    from google.api_core import exceptions
+    if isinstance(error, (exceptions.TooManyRequests, exceptions.InternalServerError,
+                          exceptions.BadGateway, exceptions.ServiceUnavailable,
+                          exceptions.GatewayTimeout)):
+        return True
+    if isinstance(error, exceptions.GoogleAPICallError):
+        return False  # bad request, permission denied, ...: the same request fails again
+    import requests
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+def is_outage(error: Exception) -> bool:
+    """Errors that say the service is unhealthy; these count towards the breaker.
+
+    Running out of the call's deadline is not one: the time may have gone
+    on earlier attempts, backoff or waiting for a worker.
+    """
+    return is_retryable(error) and not isinstance(error, CallDeadlineExceeded)
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive outage errors.
+
+    While open, calls are rejected; after `reset_seconds` one trial call is
+    let through (half-open) and its outcome closes or reopens the breaker.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """End a trial call whose error said nothing about the service's health."""
+        with self._lock:
+            self._trial_running = False
+
+class LatencyWindow:
+    """Durations of recent successful attempts."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+# Per-CV stats dicts are updated from concurrent attempts, hedges, chunks
+# and late packed replies; every update to one holds this lock, including
+# cv_core.add_usage.
+STATS_LOCK = threading.Lock()
+
+class ResilientCaller:
+    """Runs model calls with deadlines, retries, optional hedging and a circuit breaker.
+
+    One caller is meant to be shared by every extraction in the process, so
+    the breaker and the latency window see all traffic.
+    """
+
+    def __init__(self, attempts: int = 3, attempt_timeout: float = 120.0, deadline: float = 300.0,
+                 base_delay: float = 1.0, max_delay: float = 20.0, hedge_percentile: float = 0.0,
+                 hedge_min_samples: int = 20, breaker: Optional[CircuitBreaker] = None,
+                 max_workers: int = 16):
+        self.attempts = max(1, attempts)
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_percentile = hedge_percentile  # 0 disables hedging
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyWindow()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini")
+        self._rng = random.Random()
+
+    def _count(self, stats: Dict[str, Any], key: str):
+        with STATS_LOCK:
+            stats[key] = stats.get(key, 0) + 1
+
+    def call(self, attempt: Callable[[threading.Event], Any], stats: Optional[Dict[str, Any]] = None):
+        """Run attempt(cancelled) until one succeeds; raises the last error otherwise.
+
+        Retries and hedges are added to `stats`.
+        """
+        stats = {} if stats is None else stats
+        give_up_at = time.monotonic() + self.deadline
+        for number in range(self.attempts):
+            if not self.breaker.allow():
+                cv_metrics.GEMINI_REJECTED.inc()
+                raise CircuitOpenError("Gemini is failing; not calling it for now")
+            try:
+                result = self._run_attempt(attempt, give_up_at, stats)
+            except Exception as e:
+                if is_outage(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release()
+                if not is_retryable(e) or number == self.attempts - 1:
+                    raise
+                # Full jitter: spreads out the retries of CVs that failed together
+                delay = self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** number))
+                if time.monotonic() + delay >= give_up_at:
+                    raise
+                self._count(stats, "retries")
+                cv_metrics.GEMINI_RETRIES.inc()
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _run_attempt(self, attempt, give_up_at: float, stats: Dict[str, Any]):
+        """One attempt, plus its hedged twin if it runs long; the first success wins.
+
+        The attempt's timeout starts once a worker picks it up; waiting for
+        a worker only counts against the call's deadline.
+        """
+        if give_up_at <= time.monotonic():
+            raise CallDeadlineExceeded("Gemini call deadline exceeded")
+        cancelled = threading.Event()
+        running = threading.Event()
+
+        def run():
+            running.set()
+            if cancelled.is_set():
+                raise AttemptCancelled()
+            return attempt(cancelled)
+
+        hedge_after = (self.latency.percentile(self.hedge_percentile, self.hedge_min_samples)
+                       if self.hedge_percentile else None)
+        primary = self._pool.submit(run)
+        try:
+            if not running.wait(timeout=give_up_at - time.monotonic()):
+                primary.cancel()
+                raise WorkersBusy("No Gemini worker free before the call deadline")
+            started = time.monotonic()
+            timeout = min(self.attempt_timeout, give_up_at - started)
+            pending, hedge, error = {primary}, None, None
+            while pending:
+                remaining = started + timeout - time.monotonic()
+                if remaining <= 0:
+                    if timeout < self.attempt_timeout:
+                        raise CallDeadlineExceeded(f"No Gemini response within the call deadline ({timeout:.0f}s left)")
+                    raise DeadlineExceeded(f"No Gemini response within {timeout:.0f}s")
+                wait_for = remaining
+                if hedge_after is not None and hedge is None:
+                    wait_for = min(remaining, max(0.0, started + hedge_after - time.monotonic()))
+                done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        self.latency.add(time.monotonic() - started)
+                        if hedge is not None:
+                            cv_metrics.GEMINI_HEDGES.inc(outcome="won" if future is hedge else "lost")
+                        return future.result()
+                    error = future.exception()
+                if (not done and hedge is None and hedge_after is not None
+                        and time.monotonic() >= started + hedge_after):
+                    hedge = self._pool.submit(attempt, cancelled)
+                    pending.add(hedge)
+                    self._count(stats, "hedges")
+            raise error
+        finally:
+            cancelled.set()
+
+def caller_from_settings(get_setting: Callable[[str, Any], Any]) -> ResilientCaller:
+    """A ResilientCaller configured from the gemini_* deployment settings."""
+    return ResilientCaller(
+        attempts=get_setting("gemini_attempts", 3),
+        attempt_timeout=get_setting("gemini_attempt_timeout_seconds", 120.0),
+        deadline=get_setting("gemini_deadline_seconds", 300.0),
+        base_delay=get_setting("gemini_retry_base_seconds", 1.0),
+        max_delay=get_setting("gemini_retry_max_seconds", 20.0),
+        hedge_percentile=get_setting("gemini_hedge_percentile", 0.0),  # e.g. 95; 0 disables hedging
+        breaker=CircuitBreaker(get_setting("gemini_breaker_failures", 5),
+                               get_setting("gemini_breaker_reset_seconds", 30.0)),
+    )
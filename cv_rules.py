@@ -0,0 +1,133 @@
+# cv_rules.py - Local rule-based pre-extraction
+# -----------------------------------------------------------------
+# Some fields can be read from CV text with patterns alone: the email
+# address, the phone number, the candidate's name on the first lines, and
+# the date ranges of the work history. pre_extract() finds them before
+# Gemini is called, each with a confidence between 0 and 1:
+#
+#   - fields found with high confidence are left out of the prompt (and of
+#     the response schema), so Gemini writes fewer output tokens
+#   - if Gemini fails altogether, the fields found are returned as a
+#     partial record instead of an empty one
+#
+# total_experience_years is estimated from the date ranges, but only ever
+# with a medium confidence: CVs list overlapping and part-time roles, so it
+# is used when Gemini fails, never to skip asking.
+#
+# The patterns are compiled once at import. Nothing here imports streamlit
+# or the Gemini client.
+import re
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from cv_dates import PRESENT, month_number, split_duration
+from cv_preprocess import DATE_RANGE_RE
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+PHONE_RE = re.compile(r"(?<![\w+])\+?\(?\d[\d ().-]{6,}\d(?!\w)")
+PHONE_LABEL_RE = re.compile(r"\b(?:phone|mobile|mob|tel|telephone|cell|contact|whatsapp)\b", re.IGNORECASE)
+NAME_LABEL_RE = re.compile(r"^\s*(?:full\s+)?name\s*[:\-]\s*(.+)$", re.IGNORECASE)
+NAME_RE = re.compile(r"^(?:(?:mr|mrs|ms|miss|dr)\.?\s+)?([A-Za-z][A-Za-z'’.-]*(?:\s+[A-Za-z][A-Za-z'’.-]*){1,3})$",
+                     re.IGNORECASE)
+# Lines near the top that look like names but are not
+NOT_NAME_RE = re.compile(
+    r"\b(?:curriculum|vitae|resume|profile|summary|objective|experience|education|skills|contact|"
+    r"engineer|developer|manager|consultant|analyst|architect|lead|director|officer|administrator|"
+    r"specialist|dba|designer|technician|intern|assistant|executive|senior|junior)\b", re.IGNORECASE)
+NAME_LINES = 5  # the name is expected among the first lines
+
+RANGE_HINT_RE = re.compile(r"(?:\d{4}|'\d{2})\s*(?:[-–—]|to|till)", re.IGNORECASE)
+
+HIGH, MEDIUM, LOW = 0.95, 0.7, 0.4
+
+class RuleField(NamedTuple):
+    value: str
+    confidence: float
+
+def parse_range(duration: str) -> Optional[Tuple[int, int]]:
+    """(start, end) month numbers of a "start - end" duration, or None."""
+    parts = split_duration(duration)
+    if len(parts) != 2:
+        return None
+    start, end = month_number(parts[0]), month_number(parts[1])
+    if start is None or end is None or start == PRESENT or (end != PRESENT and end < start):
+        return None
+    return start, end
+
+def date_ranges(text: str) -> List[Tuple[int, int]]:
+    """Every readable date range in the text, in order."""
+    # DATE_RANGE_RE tries a match at every letter; only lines with a year
+    # followed by a range separator can hold one
+    lines = (line for line in text.split("\n") if RANGE_HINT_RE.search(line))
+    matches = (m.group(0) for line in lines for m in DATE_RANGE_RE.finditer(line))
+    return [span for span in map(parse_range, matches) if span]
+
+def _email(lines: List[str]) -> Optional[RuleField]:
+    matches = (m.group(0).strip(".") for line in lines if "@" in line for m in EMAIL_RE.finditer(line))
+    found = list(dict.fromkeys(matches))
+    if not found:
+        return None
+    # Several addresses: the one in the contact block at the top is the candidate's
+    top = "\n".join(lines[:15])
+    if len(found) == 1:
+        return RuleField(found[0], HIGH)
+    return RuleField(next((e for e in found if e in top), found[0]), MEDIUM)
+
+def _phone(lines: List[str]) -> Optional[RuleField]:
+    best = None
+    for i, line in enumerate(lines):
+        for match in PHONE_RE.finditer(line):
+            candidate = match.group(0).strip(" .-")
+            digits = sum(ch.isdigit() for ch in candidate)
+            if not 8 <= digits <= 15 or DATE_RANGE_RE.search(candidate):
+                continue
+            if candidate.startswith("+") or PHONE_LABEL_RE.search(line):
+                confidence = HIGH if i < 15 else MEDIUM
+            else:
+                confidence = MEDIUM if digits >= 9 and i < 15 else LOW
+            if best is None or confidence > best.confidence:
+                best = RuleField(candidate, confidence)
+    return best
+
+def _name(lines: List[str], email: Optional[RuleField]) -> Optional[RuleField]:
+    best = None
+    for i, line in enumerate(line for line in lines if line.strip()):
+        if i >= NAME_LINES:
+            break
+        labelled = NAME_LABEL_RE.match(line)
+        match = NAME_RE.match((labelled.group(1) if labelled else line).strip())
+        if not match or NOT_NAME_RE.search(match.group(1)):
+            continue
+        name = match.group(1)
+        confidence = HIGH if labelled else MEDIUM if i == 0 else LOW
+        # A first line could also be an agency or company banner; a name
+        # that shows up in the email address is almost certainly right
+        if email and confidence < HIGH:
+            local = email.value.split("@")[0].lower()
+            if any(len(part) > 2 and part.lower() in local for part in name.split()):
+                confidence = HIGH
+        if best is None or confidence > best.confidence:
+            best = RuleField(name, confidence)
+    return best
+
+def _experience_years(text: str, today: Optional[date] = None) -> Optional[RuleField]:
+    spans = date_ranges(text)
+    if not spans:
+        return None
+    today = today or date.today()
+    now = today.year * 12 + today.month - 1
+    start = min(span[0] for span in spans)
+    end = max(min(span[1], now) for span in spans)
+    years = round((end - start) / 12)
+    return RuleField(str(years), MEDIUM) if years > 0 else None
+
+def pre_extract(text: str) -> Dict[str, RuleField]:
+    """Fields found in the (preprocessed) CV text, keyed like the extraction record."""
+    lines = text.split("\n")
+    found = {"email": _email(lines), "phone": _phone(lines)}
+    found["candidate_name"] = _name(lines, found["email"])
+    found["total_experience_years"] = _experience_years(text)
+    return {name: field for name, field in found.items() if field is not None}
+
+def confident(found: Dict[str, RuleField], threshold: float) -> Dict[str, str]:
+    """The values found with at least `threshold` confidence."""
+    return {name: field.value for name, field in found.items() if field.confidence >= threshold}
@@ -0,0 +1,155 @@
+# test_cv_core.py - Streamed JSON parsing, chunk merging and record validation
+# -----------------------------------------------------------------
+# STREAM_CASES are Gemini replies cut into chunks at awkward places; each
+# must parse to the same members as the whole reply. MERGE_CASES are the
+# experiences of a long CV's chunks and the entries they must join into.
+# The repair tests run CVExtractor against the benchmarks' canned model,
+# with some fields of the first reply broken.
+import json
+import pytest
+from benchmarks.corpus import FakeCVExtractor, FakeModel, FIELDS_RE, make_corpus
+from cv_core import MAX_REPAIR_FIELDS, RECORD_VALIDATOR, IncrementalJSONObject, merge_experiences
+
+# (chunks, members parsed, object closed)
+STREAM_CASES = [
+    (['{"candidate_name": "Jane Roe", "email": "jane@example.com"}'],
+     {"candidate_name": "Jane Roe", "email": "jane@example.com"}, True),
+    (['```json\n{"phone": "+971 50', ' 123 4567", "posi', 'tion": "DBA"}\n```'],
+     {"phone": "+971 50 123 4567", "position": "DBA"}, True),
+    (['{"intro_paragraph": "Says \\"hi\\", then {leaves}", "email": "a@b.c"}'],
+     {"intro_paragraph": 'Says "hi", then {leaves}', "email": "a@b.c"}, True),
+    (['{"intro_paragraph": "A \\', '"quoted\\', '" word, [', 'and] }", "phone": ""}'],
+     {"intro_paragraph": 'A "quoted" word, [and] }', "phone": ""}, True),
+    (['{"experiences": [{"company": "Initech", "responsibilities": ["a", "b, c"]}', ', {"company": "Globex"}]}'],
+     {"experiences": [{"company": "Initech", "responsibilities": ["a", "b, c"]}, {"company": "Globex"}]}, True),
+    (['{"path": "C:\\\\', 'temp", "email": "x@y.z"}'],
+     {"path": "C:\\temp", "email": "x@y.z"}, True),
+    (['{"candidate_name": "Jane", "email": broken, "phone": "1"}'],
+     {"candidate_name": "Jane", "phone": "1"}, True),
+    (['{"candidate_name": "Jane", "experiences": [{"company": "Ini'],
+     {"candidate_name": "Jane"}, False),
+    (['{"a": 1} trailing {"b": 2}'], {"a": 1}, True),
+]
+
+@pytest.mark.parametrize("chunks, members, closed", STREAM_CASES)
+def test_stream(chunks, members, closed):
+    parser = IncrementalJSONObject()
+    for chunk in chunks:
+        parser.feed(chunk)
+    assert parser.done is closed
+    assert parser.result(partial=True) == members
+
+@pytest.mark.parametrize("chunks, members, closed", [case for case in STREAM_CASES if case[2]])
+def test_stream_one_character_at_a_time(chunks, members, closed):
+    parser = IncrementalJSONObject()
+    for char in "".join(chunks):
+        parser.feed(char)
+    assert parser.result() == members
+
+def test_members_are_returned_by_the_feed_that_closes_them():
+    parser = IncrementalJSONObject()
+    assert parser.feed('{"candidate_name": "Ja') == []
+    assert parser.feed('ne", "position": "D') == [("candidate_name", "Jane")]
+    assert parser.feed('BA", "experiences": [') == [("position", "DBA")]
+    assert parser.feed(']}') == [("experiences", [])]
+
+def test_result_of_an_unclosed_object_needs_partial():
+    parser = IncrementalJSONObject()
+    parser.feed('{"candidate_name": "Jane",')
+    with pytest.raises(ValueError):
+        parser.result()
+    with pytest.raises(ValueError):
+        IncrementalJSONObject().result(partial=True)
+
+def test_matches_json_loads():
+    reply = json.dumps({"candidate_name": "Jane", "intro_paragraph": "Built {APIs}, \"fast\"\\n",
+                        "experiences": [{"company": "A, Location: B", "responsibilities": ["x]", "{y"]}]})
+    parser = IncrementalJSONObject()
+    for i in range(0, len(reply), 7):
+        parser.feed(reply[i:i + 7])
+    assert parser.result() == json.loads(reply)
+
+def exp(company, role, duration, *responsibilities):
+    return {"company": company, "role": role, "duration": duration,
+            "responsibilities": list(responsibilities)}
+
+# (experiences from the chunks, merged)
+MERGE_CASES = [
+    ([exp("Initech", "DBA", "Jul 2018 - Present", "a"), exp("Initech", "", "Sep 2015 - Jun 2018", "b")],
+     [exp("Initech", "DBA", "Sep 2015 - Present", "a", "b")]),
+    ([exp("Initech", "DBA", "Jan 2020 - Present", "a"), exp("INITECH, Location: Dubai", "Lead", "2019 - 2020", "b")],
+     [exp("INITECH, Location: Dubai", "DBA", "2019 - Present", "a", "b")]),
+    ([exp("Initech Ltd.", "", "Mar 2019 - Present"), exp("Initech Ltd", "DBA", "Jan 2017 - Feb 2019", "b")],
+     [exp("Initech Ltd.", "DBA", "Jan 2017 - Present", "b")]),
+    ([exp("Initech", "DBA", "Jan 2020 - Present", "a"), exp("Initech", "DBA", "three years", "b")],
+     [exp("Initech", "DBA", "Jan 2020 - Present", "a", "b")]),
+    ([exp("Initech", "DBA", "2020 - Present", "a"), exp("Globex", "Dev", "2016 - 2019", "b"),
+      exp("Initech", "Intern", "2014 - 2015", "c")],
+     [exp("Initech", "DBA", "2020 - Present", "a"), exp("Globex", "Dev", "2016 - 2019", "b"),
+      exp("Initech", "Intern", "2014 - 2015", "c")]),
+    ([exp("", "Consultant", "2019 - 2020", "a"), exp("", "Consultant", "2018 - 2019", "b")],
+     [exp("", "Consultant", "2019 - 2020", "a"), exp("", "Consultant", "2018 - 2019", "b")]),
+    ([], []),
+]
+
+@pytest.mark.parametrize("experiences, merged", MERGE_CASES)
+def test_merge_experiences(experiences, merged):
+    assert merge_experiences(experiences) == merged
+
+# (value, validated, problem)
+VALIDATE_CASES = [
+    ("total_experience_years", 11, "11", False),
+    ("total_experience_years", 7.5, "7.5", False),
+    ("technical_skills", "Python", ["Python"], False),
+    ("technical_skills", None, [], False),
+    ("certifications", ["OCP", None], ["OCP"], False),
+    ("email", {"work": "a@b.c"}, "", True),
+    ("experiences", "Initech", [], True),
+    ("language_skills", [], ["English - Fluent"], False),
+]
+
+@pytest.mark.parametrize("field, value, validated, problem", VALIDATE_CASES)
+def test_validate(field, value, validated, problem):
+    record, problems = RECORD_VALIDATOR.validate({field: value}, require=False)
+    assert record[field] == validated
+    assert (field in problems) is problem
+
+def test_validate_requires_fields_of_a_complete_reply():
+    assert RECORD_VALIDATOR.validate({"email": "a@b.c"}, require=False)[1] == []
+    assert "candidate_name" in RECORD_VALIDATOR.validate({"email": "a@b.c"})[1]
+
+class BrokenFirstReply(FakeModel):
+    """Breaks `broken` fields of every full reply; repairs get the right values."""
+
+    def __init__(self, records, broken):
+        super().__init__(records)
+        self.broken = broken
+
+    def _answer(self, prompt):
+        text = super()._answer(prompt)
+        if FIELDS_RE.search(prompt):
+            return text
+        record = json.loads(text[text.index("{"):text.rindex("}") + 1])
+        record.update((name, {"broken": True}) for name in self.broken)
+        return json.dumps(record)
+
+BROKEN_FIELDS = ["candidate_name", "position", "education", "phone", "email", "intro_paragraph"]
+
+@pytest.mark.parametrize("count", [1, MAX_REPAIR_FIELDS, MAX_REPAIR_FIELDS + 1])
+def test_repair_cap(count):
+    cv = make_corpus(1, formats=("txt",), max_pages=1, max_experiences=2, max_responsibilities=3)[0]
+    # rule_confidence above 1: every field is asked of the model
+    extractor = FakeCVExtractor([cv], stream=False, rule_confidence=2.0)
+    extractor.model = BrokenFirstReply(extractor.model.records, BROKEN_FIELDS[:count])
+    stats, reports = {}, []
+    data = extractor.extract(cv.source.getvalue().decode(), reports.append, use_cache=False, stats=stats)
+    if count <= MAX_REPAIR_FIELDS:
+        assert stats["repaired_fields"] == count
+        assert stats["gemini_requests"] == 2
+        assert data["email"] == cv.record["email"]
+        assert reports == []
+    else:
+        # Too broken to repair field by field, and not retried
+        assert "repaired_fields" not in stats
+        assert stats["gemini_requests"] == 1
+        assert reports == [f"⚠️ Extraction error: Unusable response: {count} fields missing or malformed"]
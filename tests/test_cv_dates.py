@@ -0,0 +1,52 @@
+# test_cv_dates.py - Duration normalization table
+# -----------------------------------------------------------------
+# CASES holds the duration formats seen in CVs and the template text each
+# must become. benchmarks/bench_dates.py checks the same table before
+# timing cv_dates.
+import pytest
+from cv_dates import format_date, format_duration, normalize_many
+
+# (duration, is first experience, expected)
+CASES = [
+    ("Sep-2015 - Present", True, "SEP 2015 - Present"),
+    ("Sep 2015 - Present", False, "SEP 2015 - Present"),
+    ("September 2015 - Present", False, "SEP 2015 - Present"),
+    ("01/2023 - Present", True, "JAN 2023 - Present"),
+    ("Dec-2020 - Sep-2022", False, "DEC 2020 - SEP 2022"),
+    ("09/2015 - 06/2018", False, "SEP 2015 - JUN 2018"),
+    ("9-2015 - 6-2018", False, "SEP 2015 - JUN 2018"),
+    ("October 2019 – Jun 2021", False, "OCT 2019 - JUN 2021"),
+    ("Mar 2019—Current", False, "MAR 2019 - Present"),
+    ("Sept. 2014 to Aug. 2016", False, "SEP 2014 - AUG 2016"),
+    ("January, 2010 - March, 2012", False, "JAN 2010 - MAR 2012"),
+    ("2015 - 2018", False, "2015 - 2018"),
+    ("2015-2018", False, "2015 - 2018"),
+    ("2019-Present", False, "2019 - Present"),
+    ("Sep-2015-Dec-2018", False, "SEP 2015 - DEC 2018"),
+    ("Nov'23 - Present", True, "NOV 2023 - Present"),
+    ("Nov’23 – Mar’24", False, "NOV 2023 - MAR 2024"),
+    ("Nov'98 - Feb'01", False, "NOV 1998 - FEB 2001"),
+    ("Jan 2020 to till date", False, "JAN 2020 - Present"),
+    ("Jan 2020 till date", False, "JAN 2020 - Present"),
+    ("Jan 2020 - Till Date", False, "JAN 2020 - Present"),
+    ("Jan 2020 to date", False, "JAN 2020 - Present"),
+    ("Jun 2021", True, "JUN 2021 - Present"),
+    ("Jun 2021", False, "JUN 2021"),
+    ("Present", True, "Present"),
+    ("", True, ""),
+    ("3 years", True, "3 years"),
+    ("Summer 2015 - 2016", False, "Summer 2015 - 2016"),
+]
+
+@pytest.mark.parametrize("duration, first, expected", CASES)
+def test_format_duration(duration, first, expected):
+    assert format_duration(duration, first) == expected
+
+def test_format_duration_uncached_matches_cached():
+    format_date.cache_clear()
+    format_duration.cache_clear()
+    assert [format_duration(duration, first) for duration, first, _ in CASES] == [
+        expected for _, _, expected in CASES]
+
+def test_normalize_many_treats_only_the_first_as_current():
+    assert normalize_many(["Jun 2021", "Jun 2021"]) == ["JUN 2021 - Present", "JUN 2021"]
@@ -0,0 +1,67 @@
+# test_cv_preprocess.py - Splitting long CVs into header and experience chunks
+# -----------------------------------------------------------------
+# CV is a cleaned CV with three jobs. Chunks must be cut between jobs only,
+# and the header must keep every other section plus each job's first lines.
+import pytest
+from cv_preprocess import split_cv_sections
+
+CV = """JANE ROE
+Oracle DBA
+jane@example.com
+
+PROFESSIONAL SUMMARY
+DBA with 10 years.
+
+WORK EXPERIENCE
+
+Initech, Location: Dubai
+Senior DBA | Jan 2020 - Present
+- Led upgrades
+- Project: Billing migration | Mar 2021 - Jun 2022
+- Ran drills
+
+Globex
+DBA | Mar 2015 - Dec 2019
+- Tuned queries
+
+Contoso
+Junior DBA | 2012 - 2015
+- Backups
+
+EDUCATION
+BSc Computer Science
+
+SKILLS
+SQL, Oracle"""
+
+INITECH = """Initech, Location: Dubai
+Senior DBA | Jan 2020 - Present
+- Led upgrades
+- Project: Billing migration | Mar 2021 - Jun 2022
+- Ran drills"""
+GLOBEX = "Globex\nDBA | Mar 2015 - Dec 2019\n- Tuned queries"
+CONTOSO = "Contoso\nJunior DBA | 2012 - 2015\n- Backups"
+
+# (chunk tokens, chunks)
+SPLIT_CASES = [
+    (10000, ["\n\n".join([INITECH, GLOBEX, CONTOSO])]),
+    (40, [INITECH, GLOBEX + "\n\n" + CONTOSO]),
+    (20, [INITECH, GLOBEX, CONTOSO]),
+    (1, [INITECH, GLOBEX, CONTOSO]),  # a job longer than a chunk stays whole
+]
+
+@pytest.mark.parametrize("chunk_tokens, chunks", SPLIT_CASES)
+def test_split_cv_sections(chunk_tokens, chunks):
+    assert split_cv_sections(CV, chunk_tokens)[1] == chunks
+
+def test_header_keeps_other_sections_and_job_headings():
+    header = split_cv_sections(CV, 20)[0]
+    assert header.startswith("JANE ROE\nOracle DBA\njane@example.com\n\nPROFESSIONAL SUMMARY")
+    assert header.endswith("EDUCATION\nBSc Computer Science\n\nSKILLS\nSQL, Oracle")
+    assert "Senior DBA | Jan 2020 - Present\n- Led upgrades" in header
+    assert "DBA | Mar 2015 - Dec 2019" in header
+    assert "Ran drills" not in header
+
+def test_cv_without_an_experience_section_is_not_split():
+    text = "JANE ROE\n\nSKILLS\nSQL"
+    assert split_cv_sections(text, 10) == (text, [])
@@ -0,0 +1,152 @@
+# test_cv_resilience.py - Retry classification, deadlines and the circuit breaker
+# -----------------------------------------------------------------
+# RETRY_CASES lists the errors a Gemini call can raise and whether
+# ResilientCaller tries again after each. The caller tests run plain
+# functions as attempts, with no backoff delay.
+import threading, time
+import pytest
+import requests
+from google.api_core import exceptions
+from cv_resilience import (CallDeadlineExceeded, CircuitBreaker, CircuitOpenError, DeadlineExceeded,
+                           ResilientCaller, is_outage, is_retryable)
+
+# (error, retried, counts towards the breaker)
+RETRY_CASES = [
+    (DeadlineExceeded("attempt"), True, True),
+    (CallDeadlineExceeded("call"), True, False),
+    (TimeoutError(), True, True),
+    (ConnectionError(), True, True),
+    (exceptions.TooManyRequests("429"), True, True),
+    (exceptions.InternalServerError("500"), True, True),
+    (exceptions.BadGateway("502"), True, True),
+    (exceptions.ServiceUnavailable("503"), True, True),
+    (exceptions.GatewayTimeout("504"), True, True),
+    (requests.ConnectionError(), True, True),
+    (requests.Timeout(), True, True),
+    (exceptions.BadRequest("400"), False, False),
+    (exceptions.PermissionDenied("403"), False, False),
+    (ValueError("Unusable response: 6 fields missing or malformed"), False, False),
+    (KeyError("experiences"), False, False),
+]
+
+@pytest.mark.parametrize("error, retried, outage", RETRY_CASES)
+def test_retry_classification(error, retried, outage):
+    assert is_retryable(error) is retried
+    assert is_outage(error) is outage
+
+def failing(*errors, result="ok"):
+    """An attempt raising `errors` in turn, then returning `result`."""
+    calls = []
+
+    def attempt(cancelled):
+        calls.append(cancelled)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return attempt, calls
+
+def test_transient_errors_are_retried():
+    attempt, calls = failing(exceptions.ServiceUnavailable("503"), ConnectionError())
+    stats = {}
+    assert ResilientCaller(attempts=3, base_delay=0).call(attempt, stats) == "ok"
+    assert len(calls) == 3
+    assert stats == {"retries": 2}
+
+def test_malformed_output_is_not_retried():
+    attempt, calls = failing(ValueError("Unusable response"))
+    with pytest.raises(ValueError):
+        ResilientCaller(attempts=3, base_delay=0).call(attempt)
+    assert len(calls) == 1
+
+def test_last_error_is_raised_once_attempts_run_out():
+    attempt, calls = failing(*[exceptions.TooManyRequests("429")] * 3)
+    with pytest.raises(exceptions.TooManyRequests):
+        ResilientCaller(attempts=2, base_delay=0).call(attempt)
+    assert len(calls) == 2
+
+def test_attempt_timeout_cancels_the_attempt():
+    seen = []
+
+    def attempt(cancelled):
+        seen.append(cancelled)
+        cancelled.wait(5)
+        return "late"
+    caller = ResilientCaller(attempts=1, attempt_timeout=0.1, deadline=5)
+    with pytest.raises(DeadlineExceeded) as raised:
+        caller.call(attempt)
+    assert not isinstance(raised.value, CallDeadlineExceeded)
+    assert seen[0].is_set()
+
+def test_call_deadline_bounds_all_attempts():
+    def attempt(cancelled):
+        cancelled.wait(5)
+    caller = ResilientCaller(attempts=5, attempt_timeout=1, deadline=0.3, base_delay=0)
+    began = time.monotonic()
+    with pytest.raises(CallDeadlineExceeded):
+        caller.call(attempt)
+    assert time.monotonic() - began < 1
+
+def test_breaker_opens_after_consecutive_outages():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    caller = ResilientCaller(attempts=1, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(exceptions.ServiceUnavailable):
+            caller.call(failing(exceptions.ServiceUnavailable("503"))[0])
+    assert breaker.state == CircuitBreaker.OPEN
+    attempt, calls = failing()
+    with pytest.raises(CircuitOpenError):
+        caller.call(attempt)
+    assert calls == []
+
+def test_errors_that_are_not_outages_leave_the_breaker_closed():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    caller = ResilientCaller(attempts=1, breaker=breaker)
+    with pytest.raises(exceptions.BadRequest):
+        caller.call(failing(exceptions.BadRequest("400"))[0])
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_breaker_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # the trial is still running
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=0.05)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.06)
+    caller = ResilientCaller(attempts=1, breaker=breaker)
+    with pytest.raises(exceptions.ServiceUnavailable):
+        caller.call(failing(exceptions.ServiceUnavailable("503"))[0])
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+def test_trial_ending_in_a_non_outage_error_frees_the_next_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    caller = ResilientCaller(attempts=1, breaker=breaker)
+    with pytest.raises(ValueError):
+        caller.call(failing(ValueError("Unusable response"))[0])
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert caller.call(failing()[0]) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_concurrent_retry_counts_are_not_lost():
+    caller = ResilientCaller(attempts=2, base_delay=0, max_workers=8,
+                             breaker=CircuitBreaker(failure_threshold=100))
+    stats = {}
+    threads = [threading.Thread(target=caller.call, args=(failing(ConnectionError())[0], stats))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stats == {"retries": 8}
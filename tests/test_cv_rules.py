@@ -0,0 +1,75 @@
+# test_cv_rules.py - Local pre-extraction and its confidence threshold
+# -----------------------------------------------------------------
+# CASES are CV openings with the fields pre_extract must find in them and
+# their confidence. Only fields at or above the threshold may be left out
+# of the prompt, so a guess (a banner line read as the name, a bare number
+# read as the phone) must stay below the default of 0.9.
+import pytest
+from benchmarks.corpus import FIELDS_RE, FakeCVExtractor, FakeModel, make_corpus
+from cv_rules import HIGH, LOW, MEDIUM, confident, pre_extract
+
+CONTACT_BLOCK = "Jane Roe\nOracle DBA\njane.roe@example.com\n+971 50 123 4567\n\nInitech | Jan 2015 - Dec 2020"
+BANNER_FIRST = "ACME STAFFING\nJane Roe\nj.r@example.com\n0501234567"
+LABELLED = "Name: Jane Roe\nMobile: 050 123 4567\nEmail: a@example.com, b@example.org"
+
+# (text, {field: (value, confidence)})
+CASES = [
+    (CONTACT_BLOCK, {"candidate_name": ("Jane Roe", HIGH), "email": ("jane.roe@example.com", HIGH),
+                     "phone": ("+971 50 123 4567", HIGH), "total_experience_years": ("6", MEDIUM)}),
+    (BANNER_FIRST, {"candidate_name": ("ACME STAFFING", MEDIUM), "email": ("j.r@example.com", HIGH),
+                    "phone": ("0501234567", MEDIUM)}),
+    (LABELLED, {"candidate_name": ("Jane Roe", HIGH), "email": ("a@example.com", MEDIUM),
+                "phone": ("050 123 4567", HIGH)}),
+    ("Senior Oracle DBA\nno contacts here", {"candidate_name": ("no contacts here", LOW)}),
+    ("", {}),
+]
+
+@pytest.mark.parametrize("text, fields", CASES)
+def test_pre_extract(text, fields):
+    found = pre_extract(text)
+    assert {name: (field.value, field.confidence) for name, field in found.items()} == fields
+
+# (text, threshold, fields left out of the prompt)
+THRESHOLD_CASES = [
+    (CONTACT_BLOCK, 0.9, {"candidate_name", "email", "phone"}),
+    (CONTACT_BLOCK, 0.7, {"candidate_name", "email", "phone", "total_experience_years"}),
+    (CONTACT_BLOCK, 1.0, set()),
+    (BANNER_FIRST, 0.9, {"email"}),
+    (LABELLED, 0.9, {"candidate_name", "phone"}),
+    ("Senior Oracle DBA\nno contacts here", 0.4, {"candidate_name"}),
+    ("Senior Oracle DBA\nno contacts here", 0.9, set()),
+]
+
+@pytest.mark.parametrize("text, threshold, skipped", THRESHOLD_CASES)
+def test_confidence_threshold(text, threshold, skipped):
+    assert set(confident(pre_extract(text), threshold)) == skipped
+
+class RecordingModel(FakeModel):
+    """FakeModel that keeps the fields each prompt asked for (None: all)."""
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.asked = []
+
+    def _answer(self, prompt):
+        fields = FIELDS_RE.search(prompt)
+        self.asked.append(fields.group(1).split(", ") if fields else None)
+        return super()._answer(prompt)
+
+@pytest.mark.parametrize("threshold", [0.9, 2.0])
+def test_extractor_skips_only_confident_fields(threshold):
+    cv = make_corpus(1, formats=("txt",), max_pages=1, max_experiences=2, max_responsibilities=3)[0]
+    text = cv.source.getvalue().decode()
+    extractor = FakeCVExtractor([cv], stream=False, rule_confidence=threshold)
+    extractor.model = RecordingModel(extractor.model.records)
+    stats = {}
+    data = extractor.extract(text, use_cache=False, stats=stats)
+    skipped = set(confident(pre_extract(text), threshold))
+    assert stats.get("rule_fields", 0) == len(skipped)
+    assert len(extractor.model.asked) == 1
+    asked = extractor.model.asked[0]
+    if skipped:
+        assert skipped.isdisjoint(asked)
+    else:
+        assert asked is None
+    assert data["email"] == cv.record["email"]